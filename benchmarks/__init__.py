@@ -0,0 +1 @@
+"""Benchmarks of the GitHub Custom integration."""
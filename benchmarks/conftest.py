@@ -0,0 +1,74 @@
+"""pytest fixtures and options of the benchmarks."""
+import json
+
+import pytest
+
+RESULTS_KEY = pytest.StashKey[list]()
+
+
+def pytest_addoption(parser):
+    """Add the options of the fake GitHub API and where to write the results."""
+    group = parser.getgroup("github_custom benchmarks")
+    group.addoption(
+        "--repo-counts",
+        default="1,100,1000,5000",
+        help="Comma separated numbers of repos to benchmark.",
+    )
+    group.addoption(
+        "--latency",
+        type=float,
+        default=0.05,
+        help="Seconds the fake GitHub API takes to answer a request.",
+    )
+    group.addoption(
+        "--error-rate",
+        type=float,
+        default=0.0,
+        help="Share of requests the fake GitHub API fails with a 502.",
+    )
+    group.addoption(
+        "--benchmark-json",
+        default=None,
+        help="Write the results as JSON to this path to track them over time.",
+    )
+
+
+def pytest_configure(config):
+    """Collect the results of every benchmark."""
+    config.stash[RESULTS_KEY] = []
+
+
+def pytest_generate_tests(metafunc):
+    """Benchmark every number of repos picked on the command line."""
+    if "repo_count" in metafunc.fixturenames:
+        counts = metafunc.config.getoption("--repo-counts").split(",")
+        metafunc.parametrize("repo_count", [int(count) for count in counts])
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations):
+    """Enable custom integrations defined in the test dir."""
+    yield
+
+
+@pytest.fixture
+def benchmark_results(request):
+    """Return the list the results of a benchmark are appended to."""
+    return request.config.stash[RESULTS_KEY]
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    """Report the results in a table and optionally as JSON."""
+    results = config.stash[RESULTS_KEY]
+    if not results:
+        return
+    columns = list(results[0])
+    terminalreporter.section("github_custom benchmarks")
+    terminalreporter.write_line("  ".join(f"{column:>18}" for column in columns))
+    for result in results:
+        terminalreporter.write_line(
+            "  ".join(f"{result[column]:>18}" for column in columns)
+        )
+    if path := config.getoption("--benchmark-json"):
+        with open(path, "w") as file:
+            json.dump(results, file, indent=2)
@@ -0,0 +1,146 @@
+"""A local stand-in for the GitHub API to benchmark the integration against."""
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+import hashlib
+import json
+import random
+import time
+from typing import Any
+
+from aiohttp import web
+
+
+class FakeGitHub:
+    """Serves the GraphQL and REST endpoints the integration uses.
+
+    Every request is delayed by `latency` seconds and fails with a 502 with a
+    probability of `error_rate`. Responses carry rate limit headers that count
+    down from `rate_limit` per resource, and REST responses an ETag so
+    conditional requests are answered with a free 304. `calls` counts the
+    requests per kind.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit: int = 5000,
+        seed: int = 0,
+    ) -> None:
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.calls: Counter[str] = Counter()
+        self._remaining: Counter[str] = Counter()
+        self._reset = int(time.time()) + 3600
+        self._random = random.Random(seed)
+        self._runner: web.AppRunner | None = None
+        self.url = ""
+        self.app = web.Application()
+        self.app.router.add_post("/graphql", self.graphql)
+        self.app.router.add_get(
+            "/repos/{owner}/{name}/traffic/{kind:clones|views}", self.traffic
+        )
+
+    async def start(self) -> None:
+        """Start serving on a free port of the loopback interface."""
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.url = f"http://127.0.0.1:{port}"
+
+    async def stop(self) -> None:
+        """Stop serving."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def reset_calls(self) -> None:
+        """Start counting the requests of a new cycle."""
+        self.calls.clear()
+
+    async def _respond(
+        self, request: web.Request, resource: str, kind: str, payload: Any
+    ) -> web.Response:
+        """Answer a request as GitHub would, charging it to `resource`."""
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self._random.random() < self.error_rate:
+            self.calls["error"] += 1
+            return web.Response(status=502)
+        body = json.dumps(payload).encode()
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'  # nosec
+        if request.method == "GET" and request.headers.get("if-none-match") == etag:
+            # Conditional requests that match are not charged.
+            self.calls["not_modified"] += 1
+            return web.Response(status=304, headers=self._headers(resource, etag))
+        self.calls[kind] += 1
+        self._remaining[resource] += 1
+        return web.Response(
+            body=body,
+            content_type="application/json",
+            headers=self._headers(resource, etag),
+        )
+
+    def _headers(self, resource: str, etag: str) -> dict[str, str]:
+        return {
+            "etag": etag,
+            "x-ratelimit-limit": str(self.rate_limit),
+            "x-ratelimit-remaining": str(
+                max(self.rate_limit - self._remaining[resource], 0)
+            ),
+            "x-ratelimit-reset": str(self._reset),
+            "x-ratelimit-resource": resource,
+        }
+
+    async def graphql(self, request: web.Request) -> web.Response:
+        """Resolve the aliased repositories of a query."""
+        variables = (await request.json()).get("variables", {})
+        data = {
+            f"repo{index}": repository(
+                variables[f"owner{index}"], variables[f"name{index}"]
+            )
+            for index in range(len(variables) // 2)
+        }
+        return await self._respond(request, "graphql", "graphql", {"data": data})
+
+    async def traffic(self, request: web.Request) -> web.Response:
+        """Return the clones or views of a repo over the last two weeks."""
+        return await self._respond(
+            request, "core", "traffic", {"count": 100, "uniques": 10}
+        )
+
+
+def repository(owner: str, name: str) -> dict[str, Any]:
+    """Return the GraphQL fields of a repo the token can push to."""
+    return {
+        "name": name,
+        "forkCount": 10,
+        "stargazerCount": 100,
+        "viewerPermission": "WRITE",
+        "defaultBranchRef": {
+            "target": {
+                "oid": hashlib.sha1(name.encode()).hexdigest(),
+                "message": "Did a thing.",
+            }  # nosec
+        },
+        "issues": {
+            "totalCount": 5,
+            "nodes": [{"url": f"https://github.com/{owner}/{name}/issues/5"}],
+        },
+        "pullRequests": {
+            "totalCount": 2,
+            "nodes": [{"url": f"https://github.com/{owner}/{name}/pull/7"}],
+        },
+        "releases": {
+            "nodes": [
+                {
+                    "tagName": "v1.0.0",
+                    "url": f"https://github.com/{owner}/{name}/releases/v1.0.0",
+                }
+            ]
+        },
+    }
@@ -0,0 +1,147 @@
+"""Benchmarks of what the integration costs per number of watched repos.
+
+Run them against the local fake GitHub API with:
+
+    pytest benchmarks --no-cov --benchmark-json=results.json
+"""
+import asyncio
+import os
+import time
+
+from homeassistant.const import CONF_ACCESS_TOKEN
+import pytest
+import pytest_asyncio
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from benchmarks.fake_github import FakeGitHub
+from custom_components.github_custom.client import async_create_client
+from custom_components.github_custom.const import CONF_REPOS, DOMAIN
+from custom_components.github_custom.coordinator import TTL_OPTIONS
+
+# Interval at which the event loop lag and the memory are sampled.
+LAG_SAMPLE_INTERVAL = 0.01
+
+
+def rss_mb() -> float:
+    """Return the current resident set size of the process in MiB."""
+    with open("/proc/self/statm", encoding="ascii") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+class RunMonitor:
+    """Samples how late the event loop wakes up a sleeping task and the memory.
+
+    The resident set size is sampled around the run rather than read from the
+    high-water mark of the process, which never resets, so each run reports the
+    memory it grew by on its own.
+    """
+
+    def __init__(self) -> None:
+        self.max_lag = 0.0
+        self.start_rss_mb = self.peak_rss_mb = rss_mb()
+        self._task = None
+
+    @property
+    def rss_growth_mb(self) -> float:
+        """Return how much the resident set size grew at most during the run."""
+        return self.peak_rss_mb - self.start_rss_mb
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self.peak_rss_mb = max(self.peak_rss_mb, rss_mb())
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(LAG_SAMPLE_INTERVAL)
+            self.max_lag = max(self.max_lag, loop.time() - start - LAG_SAMPLE_INTERVAL)
+            self.peak_rss_mb = max(self.peak_rss_mb, rss_mb())
+
+
+@pytest_asyncio.fixture
+async def fake_github(request, socket_enabled):
+    """Serve the fake GitHub API for the duration of a benchmark."""
+    github = FakeGitHub(
+        latency=request.config.getoption("--latency"),
+        error_rate=request.config.getoption("--error-rate"),
+    )
+    await github.start()
+    yield github
+    await github.stop()
+
+
+@pytest.mark.asyncio
+async def test_update_cycle(hass, fake_github, benchmark_results, repo_count):
+    """Set up an entry watching `repo_count` repos and run a full update cycle.
+
+    The repo counts are picked with `--repo-counts`.
+    """
+    repos = [
+        {"path": f"owner{index // 100}/repo{index}", "name": f"Repo {index}"}
+        for index in range(repo_count)
+    ]
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={CONF_ACCESS_TOKEN: "access-token", CONF_REPOS: repos},
+        # Expire every group so each cycle refetches everything.
+        options={
+            CONF_REPOS: repos,
+            **{option: 0 for option, _ in TTL_OPTIONS.values()},
+        },
+    )
+    config_entry.add_to_hass(hass)
+
+    def create_client(hass, access_token, tokens=None, base_url=None):
+        # Every request goes to the fake GitHub API, GraphQL queries included.
+        return async_create_client(hass, access_token, tokens, fake_github.url)
+
+    monitor = RunMonitor()
+    monitor.start()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(
+            "custom_components.github_custom.async_create_client", create_client
+        )
+        start = time.perf_counter()
+        assert await hass.config_entries.async_setup(config_entry.entry_id)
+        await hass.async_block_till_done()
+        setup_time = time.perf_counter() - start
+        setup_calls = sum(fake_github.calls.values())
+
+        # Steady state: the traffic is unchanged and answered with 304s.
+        coordinator = hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
+        fake_github.reset_calls()
+        start = time.perf_counter()
+        await coordinator.async_refresh()
+        cycle_time = time.perf_counter() - start
+    await monitor.stop()
+
+    benchmark_results.append(
+        {
+            "repos": repo_count,
+            "available": len(coordinator.data or {}),
+            "setup_s": round(setup_time, 3),
+            "setup_calls": setup_calls,
+            "cycle_s": round(cycle_time, 3),
+            "cycle_calls": sum(fake_github.calls.values()),
+            "cycle_charged": sum(
+                count
+                for kind, count in fake_github.calls.items()
+                if kind != "not_modified"
+            ),
+            "rss_growth_mb": round(monitor.rss_growth_mb, 1),
+            "max_loop_lag_ms": round(monitor.max_lag * 1000, 1),
+        }
+    )
+    assert repo_count == sum(
+        entity_id.startswith("sensor.repo_")
+        for entity_id in hass.states.async_entity_ids("sensor")
+    )
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
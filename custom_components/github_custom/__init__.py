@@ -1,15 +1,76 @@
 """GitHub Custom Component."""
-import asyncio
 import logging
 
 from homeassistant import config_entries, core
-from homeassistant.const import Platform
+from homeassistant.const import CONF_ACCESS_TOKEN, CONF_URL, CONF_WEBHOOK_ID, Platform
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.storage import Store
+import voluptuous as vol
 
-from .const import DOMAIN
+from .client import (
+    DATA_MAX_CONCURRENT_REQUESTS,
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
+    api_url,
+    async_create_client,
+)
+from .const import (
+    CONF_ACCESS_TOKENS,
+    CONF_DISCOVER,
+    CONF_EVENTS,
+    CONF_HOT_REPOS,
+    CONF_MAX_CONCURRENT_REQUESTS,
+    CONF_MAX_STALENESS,
+    CONF_REPOS,
+    CONF_WEBHOOK,
+    CONF_WEBHOOK_SECRET,
+    DOMAIN,
+    SIGNAL_REPOS_ADDED,
+)
+from .coordinator import (
+    DATA_SEEDS,
+    STORAGE_VERSION,
+    TTL_OPTIONS,
+    GitHubDataUpdateCoordinator,
+    max_staleness_from_config,
+    ttls_from_config,
+)
+from .discovery import RepoDiscovery, parse_owners
+from .sensor import async_remove_repo_entities
+from .services import async_setup_services
+from .webhook import async_delete_github_webhooks, async_setup_webhook
 
 _LOGGER = logging.getLogger(__name__)
 
 PLATFORMS = [Platform.SENSOR]
+# Options applied to the running coordinator without reloading the entry.
+INCREMENTAL_OPTIONS = {
+    CONF_REPOS,
+    CONF_HOT_REPOS,
+    CONF_MAX_STALENESS,
+    *(option for option, _ in TTL_OPTIONS.values()),
+}
+# Keys of the entry data that hold the running objects rather than options.
+RUNTIME_KEYS = {
+    "coordinator",
+    "unsub_discovery",
+    "unsub_options_update_listener",
+    "unsub_webhook",
+}
+
+CONFIG_SCHEMA = vol.Schema(
+    {
+        DOMAIN: vol.Schema(
+            {
+                vol.Optional(
+                    CONF_MAX_CONCURRENT_REQUESTS,
+                    default=DEFAULT_MAX_CONCURRENT_REQUESTS,
+                ): cv.positive_int
+            }
+        )
+    },
+    extra=vol.ALLOW_EXTRA,
+)
 
 
 async def async_setup_entry(
@@ -18,6 +79,44 @@ async def async_setup_entry(
     """Set up platform from a ConfigEntry."""
     hass.data.setdefault(DOMAIN, {})
     hass_data = dict(entry.data)
+    # Update our config to include new repos and remove those that have been removed.
+    if entry.options:
+        hass_data.update(entry.options)
+    # A single coordinator fetches every repo of this entry on behalf of the sensors.
+    github = async_create_client(
+        hass,
+        hass_data[CONF_ACCESS_TOKEN],
+        hass_data.get(CONF_ACCESS_TOKENS),
+        api_url(hass_data.get(CONF_URL)),
+    )
+    owners = parse_owners(hass_data.get(CONF_DISCOVER, ""))
+    coordinator = GitHubDataUpdateCoordinator(
+        hass,
+        github,
+        hass_data[CONF_REPOS],
+        ttls_from_config(hass_data),
+        _async_get_store(hass, entry),
+        discover=bool(owners),
+        hot_paths=hass_data.get(CONF_HOT_REPOS, []),
+        events=hass_data.get(CONF_EVENTS, False),
+        max_staleness=max_staleness_from_config(hass_data),
+        webhook=hass_data.get(CONF_WEBHOOK, False),
+    )
+    # Come up with the last snapshot, or the repos validated by the config flow, and
+    # refresh in the background. Only block on GitHub when there is nothing to
+    # restore.
+    seed = hass.data.get(DATA_SEEDS, {}).pop(hass_data[CONF_ACCESS_TOKEN], None)
+    if not await coordinator.async_restore(seed):
+        await coordinator.async_config_entry_first_refresh()
+    hass_data["coordinator"] = coordinator
+    if hass_data.get(CONF_WEBHOOK):
+        # Let GitHub push events to us, polling becomes a consistency check.
+        hass_data["unsub_webhook"] = async_setup_webhook(
+            hass,
+            coordinator,
+            hass_data[CONF_WEBHOOK_ID],
+            hass_data[CONF_WEBHOOK_SECRET],
+        )
     # Registers update listener to update config entry when options are updated.
     unsub_options_update_listener = entry.add_update_listener(options_update_listener)
     # Store a reference to the unsubscribe function to cleanup if an entry is unloaded.
@@ -26,14 +125,73 @@ async def async_setup_entry(
 
     # Forward the setup to the sensor platform.
     await hass.config_entries.async_forward_entry_setups(entry, ["sensor"])
+    if owners:
+        # Watch every repo of some organizations and users on top of the
+        # configured ones, once the sensor platform is ready to add their sensors.
+        discovery = RepoDiscovery(hass, entry.entry_id, coordinator, owners)
+        hass_data["unsub_discovery"] = discovery.async_start()
     return True
 
 
+@core.callback
+def _async_get_store(
+    hass: core.HomeAssistant, entry: config_entries.ConfigEntry
+) -> Store:
+    """Return the store holding the snapshot of the repos of a config entry."""
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}")
+
+
 async def options_update_listener(
     hass: core.HomeAssistant, config_entry: config_entries.ConfigEntry
 ):
-    """Handle options update."""
-    await hass.config_entries.async_reload(config_entry.entry_id)
+    """Apply the changed options to the running entry.
+
+    Repos, hot repos, refresh intervals and the staleness limit are applied as a
+    diff, only the sensors of added and removed repos are touched. Changing the
+    tokens, discovery or webhook reloads the entry.
+    """
+    entry_data = hass.data[DOMAIN][config_entry.entry_id]
+    coordinator: GitHubDataUpdateCoordinator = entry_data["coordinator"]
+    config = {**config_entry.data, **config_entry.options}
+    changed = {
+        key
+        for key in config.keys() | entry_data.keys() - RUNTIME_KEYS
+        if config.get(key) != entry_data.get(key)
+    }
+    if changed - INCREMENTAL_OPTIONS:
+        if entry_data.get(CONF_WEBHOOK) and not config.get(CONF_WEBHOOK):
+            # Stop GitHub from delivering events to the webhook that goes away.
+            await async_delete_github_webhooks(
+                hass,
+                coordinator.github,
+                coordinator.permissions,
+                entry_data[CONF_WEBHOOK_ID],
+            )
+        await hass.config_entries.async_reload(config_entry.entry_id)
+        return
+
+    coordinator.ttls = ttls_from_config(config)
+    coordinator.max_staleness = max_staleness_from_config(config)
+    coordinator.hot_paths = set(config.get(CONF_HOT_REPOS, []))
+    watched = {repo["path"]: repo for repo in entry_data[CONF_REPOS]}
+    repos = {repo["path"]: repo for repo in config[CONF_REPOS]}
+    entry_data.update(config)
+    for key in changed - config.keys():
+        entry_data.pop(key)
+
+    if removed := watched.keys() - repos.keys():
+        coordinator.async_remove_paths(removed)
+        async_remove_repo_entities(hass, removed)
+    if added := [repo for path, repo in repos.items() if path not in watched]:
+        # Repos that were discovered already have a sensor.
+        new = [repo for repo in added if coordinator.path_for(repo["path"]) is None]
+        coordinator.async_add_paths((repo["path"] for repo in added), False)
+        async_dispatcher_send(
+            hass, SIGNAL_REPOS_ADDED.format(config_entry.entry_id), new
+        )
+    # Fetch the added repos and the groups that expired with shorter intervals,
+    # ahead of the polls of the other entries.
+    await coordinator.async_refresh_ahead()
 
 
 async def async_unload_entry(
@@ -45,11 +203,49 @@ async def async_unload_entry(
         entry_data = hass.data[DOMAIN].pop(entry.entry_id)
         # Remove options_update_listener.
         entry_data["unsub_options_update_listener"]()
+        # Unregister the webhook.
+        if unsub_webhook := entry_data.get("unsub_webhook"):
+            unsub_webhook()
+        # Stop discovering repos.
+        if unsub_discovery := entry_data.get("unsub_discovery"):
+            unsub_discovery()
+        # Release the callers of the refresh service waiting on this entry.
+        entry_data["coordinator"].async_cancel_batch()
+        # Give back the room the repos of the entry kept in the cache.
+        entry_data["coordinator"].async_release_cache()
+        # Persist the latest snapshot for the next setup.
+        await entry_data["coordinator"].async_save()
 
     return unload_ok
 
 
+async def async_remove_entry(
+    hass: core.HomeAssistant, entry: config_entries.ConfigEntry
+) -> None:
+    """Remove the webhooks and the snapshot of a config entry that was deleted."""
+    store = _async_get_store(hass, entry)
+    config = {**entry.data, **entry.options}
+    if config.get(CONF_WEBHOOK) and (stored := await store.async_load()) is not None:
+        github = async_create_client(
+            hass,
+            config[CONF_ACCESS_TOKEN],
+            config.get(CONF_ACCESS_TOKENS),
+            api_url(config.get(CONF_URL)),
+        )
+        await async_delete_github_webhooks(
+            hass, github, stored["permissions"], config[CONF_WEBHOOK_ID]
+        )
+    await store.async_remove()
+
+
 async def async_setup(hass: core.HomeAssistant, config: dict) -> bool:
     """Set up the GitHub Custom component from yaml configuration."""
     hass.data.setdefault(DOMAIN, {})
+    # Limits the requests in flight to each host across every config entry and yaml
+    # platform.
+    conf = config.get(DOMAIN, {})
+    hass.data[DATA_MAX_CONCURRENT_REQUESTS] = conf.get(
+        CONF_MAX_CONCURRENT_REQUESTS, DEFAULT_MAX_CONCURRENT_REQUESTS
+    )
+    async_setup_services(hass)
     return True
@@ -0,0 +1,146 @@
+"""Circuit breakers backing off from failing repos and hosts."""
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta
+import random
+from typing import Any
+
+from aiohttp import ClientError
+import gidgethub
+from homeassistant import core
+from homeassistant.core import callback
+
+from .const import BASE_API_URL
+
+# Key in hass.data holding the breaker shared by every client of a host.
+DATA_BREAKERS = "github_custom_breakers"
+STATE_CLOSED = "closed"
+STATE_HALF_OPEN = "half_open"
+STATE_OPEN = "open"
+# Consecutive failures that open the breaker.
+FAILURE_THRESHOLD = 3
+# Backoff after the breaker opens, doubled on each failed probe up to the max.
+BASE_BACKOFF = timedelta(minutes=1)
+MAX_BACKOFF = timedelta(hours=6)
+# Up to this fraction of the backoff is added at random, so repos that failed
+# together are not probed together.
+BACKOFF_JITTER = 0.2
+# Time after which a probe that never reported back no longer blocks the next.
+PROBE_TIMEOUT = timedelta(minutes=1)
+
+
+def is_host_error(err: Exception) -> bool:
+    """Return whether an error is the fault of the host rather than a repo."""
+    if isinstance(err, (ClientError, asyncio.TimeoutError)):
+        return True
+    return isinstance(err, gidgethub.HTTPException) and err.status_code >= 500
+
+
+def is_rate_limit_error(err: Exception) -> bool:
+    """Return whether an error is a primary or secondary rate limit of the token.
+
+    The REST API answers with a 403 or 429, so does the GraphQL API for secondary
+    limits while its primary limit is a 200 with a `RATE_LIMITED` error.
+    """
+    if isinstance(err, gidgethub.RateLimitExceeded):
+        return True
+    if isinstance(err, gidgethub.QueryError):
+        return any(
+            error.get("type") == "RATE_LIMITED"
+            for error in err.response.get("errors", [])
+        )
+    return (
+        isinstance(err, (gidgethub.HTTPException, gidgethub.BadGraphQLRequest))
+        and err.status_code in (403, 429)
+        and "rate limit" in str(err).lower()
+    )
+
+
+class CircuitBreaker:
+    """Stops requests to something that keeps failing.
+
+    The breaker opens after `threshold` consecutive failures and stays open for
+    an exponential backoff with jitter. Once the backoff is over, the breaker is
+    half-open: a single probe is let through, the breaker closes when it succeeds
+    and opens for twice as long when it fails.
+
+    The last error is kept with the number of times in a row it happened, so the
+    same error can be logged once rather than on every failure.
+    """
+
+    def __init__(self, threshold: int = FAILURE_THRESHOLD) -> None:
+        self.threshold = threshold
+        self.failures = 0
+        self.opened_until: datetime | None = None
+        self.last_error: str | None = None
+        self.repeated = 0
+        self._probe_started: datetime | None = None
+
+    def state(self, now: datetime) -> str:
+        """Return whether the breaker is closed, open or half-open."""
+        if self.opened_until is None:
+            return STATE_CLOSED
+        if self.opened_until <= now:
+            return STATE_HALF_OPEN
+        return STATE_OPEN
+
+    def allow(self, now: datetime) -> bool:
+        """Return whether a request may be made, half-open lets a single probe."""
+        state = self.state(now)
+        if state == STATE_CLOSED:
+            return True
+        if state == STATE_OPEN or (
+            self._probe_started is not None
+            and now - self._probe_started < PROBE_TIMEOUT
+        ):
+            return False
+        self._probe_started = now
+        return True
+
+    def record_success(self) -> int:
+        """Close the breaker, returns the number of failures it recovered from."""
+        failures = self.failures
+        self.failures = 0
+        self.opened_until = None
+        self.last_error = None
+        self.repeated = 0
+        self._probe_started = None
+        return failures
+
+    def record_failure(self, now: datetime, error: str) -> bool:
+        """Record a failure, returns whether its error differs from the last one."""
+        self.failures += 1
+        self._probe_started = None
+        if self.failures >= self.threshold:
+            backoff = min(
+                BASE_BACKOFF * 2 ** (self.failures - self.threshold), MAX_BACKOFF
+            )
+            self.opened_until = now + backoff * (1 + BACKOFF_JITTER * random.random())
+        if error == self.last_error:
+            self.repeated += 1
+            return False
+        self.last_error = error
+        self.repeated = 1
+        return True
+
+    def as_dict(self, now: datetime) -> dict[str, Any]:
+        """Return the state of the breaker in a form that can be serialized."""
+        return {
+            "state": self.state(now),
+            "failures": self.failures,
+            "opened_until": self.opened_until and self.opened_until.isoformat(),
+            "last_error": self.last_error,
+            "repeated": self.repeated,
+        }
+
+
+@callback
+def async_get_breaker(
+    hass: core.HomeAssistant, base_url: str = BASE_API_URL
+) -> CircuitBreaker:
+    """Return the breaker of the requests made by every client of a host."""
+    breakers: dict[str, CircuitBreaker] = hass.data.setdefault(DATA_BREAKERS, {})
+    if base_url not in breakers:
+        breakers[base_url] = CircuitBreaker()
+    return breakers[base_url]
@@ -0,0 +1,116 @@
+"""Conditional request cache for the GitHub REST API."""
+from __future__ import annotations
+
+from collections import OrderedDict
+from collections.abc import Hashable, Iterator, MutableMapping
+from typing import Any, Optional, Tuple
+
+from homeassistant import core
+from homeassistant.core import callback
+
+# Key in hass.data holding the caches shared by every client using the same token.
+DATA_CACHES = "github_custom_caches"
+# Number of URLs kept per cache before the least recently used is evicted, on top
+# of the URLs reserved for the repos watched by the coordinators.
+DEFAULT_CACHE_SIZE = 4096
+
+# The (etag, last-modified, parsed body, next page URL) tuple stored by gidgethub.
+CacheEntry = Tuple[Optional[str], Optional[str], Any, Optional[str]]
+
+
+class GitHubCache(MutableMapping[str, CacheEntry]):
+    """LRU cache of ETags and parsed response bodies keyed by URL.
+
+    Passed as the `cache` of a `GitHubAPI`, which sends the cached ETag as
+    `If-None-Match` and returns the cached body when GitHub answers with a
+    `304 Not Modified`. Those responses don't count against the rate limit.
+
+    The cache grows with the URLs its users reserve, e.g. the coordinators for
+    the repos they watch, so that polling more URLs than a fixed size doesn't
+    evict every entry before it is requested again.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE) -> None:
+        self.base_size = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._reserved: dict[Hashable, int] = {}
+
+    @property
+    def maxsize(self) -> int:
+        """Return the number of URLs kept before evicting the least recently used."""
+        return self.base_size + sum(self._reserved.values())
+
+    def reserve(self, owner: Hashable, size: int) -> None:
+        """Reserve room for `size` URLs on behalf of `owner`, 0 releases it."""
+        if size:
+            self._reserved[owner] = size
+        else:
+            self._reserved.pop(owner, None)
+        self._evict()
+
+    def _evict(self) -> None:
+        """Evict the least recently used URLs until the cache fits its size."""
+        maxsize = self.maxsize
+        while len(self._entries) > maxsize:
+            self._entries.popitem(last=False)
+
+    def __getitem__(self, url: str) -> CacheEntry:
+        try:
+            entry = self._entries[url]
+        except KeyError:
+            self.misses += 1
+            raise
+        self._entries.move_to_end(url)
+        # Assume the entry is still fresh, __setitem__ corrects this if GitHub
+        # returns a new body instead of a 304.
+        self.hits += 1
+        return entry
+
+    def __setitem__(self, url: str, entry: CacheEntry) -> None:
+        if url in self._entries:
+            self.hits -= 1
+            self.misses += 1
+        self._entries[url] = entry
+        self._entries.move_to_end(url)
+        self._evict()
+
+    def __delitem__(self, url: str) -> None:
+        del self._entries[url]
+
+    def __contains__(self, url: object) -> bool:
+        # Membership tests must not be counted as cache lookups.
+        return url in self._entries
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_ratio(self) -> float:
+        """Return the ratio of requests answered from the cache."""
+        if total := self.hits + self.misses:
+            return self.hits / total
+        return 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the size and hit ratio of the cache in a serializable form."""
+        return {
+            "size": len(self),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hit_ratio, 3),
+        }
+
+
+@callback
+def async_get_cache(hass: core.HomeAssistant, access_token: str) -> GitHubCache:
+    """Return the cache shared by every client using `access_token`."""
+    caches: dict[str, GitHubCache] = hass.data.setdefault(DATA_CACHES, {})
+    if access_token not in caches:
+        caches[access_token] = GitHubCache()
+    return caches[access_token]
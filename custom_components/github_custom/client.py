@@ -0,0 +1,403 @@
+"""GitHub API client used by the integration."""
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from collections.abc import Mapping, MutableMapping
+import copy
+from datetime import datetime, timedelta
+import json
+import logging
+import time
+from typing import Any
+from urllib.parse import urlsplit
+
+import aiohttp
+from gidgethub.aiohttp import GitHubAPI
+from gidgethub.sansio import RateLimit
+from homeassistant import core
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
+from homeassistant.core import Event, callback
+import homeassistant.util.dt as dt_util
+import homeassistant.util.ssl as ssl_util
+
+from .breaker import CircuitBreaker, async_get_breaker
+from .cache import GitHubCache, async_get_cache
+from .const import BASE_API_URL
+from .request_queue import RequestQueue
+from .stats import RequestStats, async_get_stats, endpoint_for
+
+_LOGGER = logging.getLogger(__name__)
+
+# Key in hass.data holding the clients shared by every config entry.
+DATA_CLIENTS = "github_custom_clients"
+# Key in hass.data holding the configured limit of requests in flight per host.
+DATA_MAX_CONCURRENT_REQUESTS = "github_custom_max_concurrent_requests"
+# Key in hass.data holding the request queue of every host.
+DATA_QUEUES = "github_custom_queues"
+# Key in hass.data holding the session of every host.
+DATA_SESSIONS = "github_custom_sessions"
+DEFAULT_MAX_CONCURRENT_REQUESTS = 10
+# Seconds idle connections are kept alive, longer than the default 15s so they
+# survive between two refreshes of the coordinator.
+KEEPALIVE_TIMEOUT = 75
+# Seconds the resolved addresses of a host are cached.
+DNS_CACHE_TTL = 300
+# GitHub asks to wait at least a minute after hitting a secondary rate limit that
+# doesn't come with a Retry-After header.
+SECONDARY_RATE_LIMIT_BACKOFF = timedelta(minutes=1)
+
+
+class HostUnavailableError(aiohttp.ClientConnectionError):
+    """Raised instead of sending a request while the breaker of a host is open."""
+
+
+class GitHubClient(GitHubAPI):
+    """GitHubAPI that limits requests in flight and tracks rate limits.
+
+    The request queue is shared by every client of a host, so hundreds of repos
+    fetched concurrently don't open hundreds of connections, and a slow GitHub
+    Enterprise instance can't hold the slots of github.com. Interactive requests
+    skip ahead of the scheduled polls waiting for a slot.
+
+    gidgethub only keeps the rate limit of the last response, while the REST,
+    GraphQL and search APIs each have their own budget. The client keeps the rate
+    limit of every resource, the number of requests that were charged against it
+    and until when GitHub asked us to back off. The latency, size and outcome of
+    every request are recorded to `stats`.
+
+    Requests can be spread over a pool of `tokens`, each request is sent with the
+    token that has the most budget left for its resource. A token that ran out of
+    budget, or that GitHub asked to back off, is left out until it may be used
+    again. `rate_limits` then holds the budget of the whole pool and
+    `token_rate_limits` the budget of each token.
+
+    Requests fail fast with `HostUnavailableError` while the `breaker` of the
+    host is open, i.e. after consecutive connection errors and server errors.
+    Each distinct error is logged once.
+
+    The `X-Poll-Interval` GitHub sends with the event feeds is kept per path in
+    `poll_intervals`.
+
+    Identical requests without side effects that are in flight at the same time
+    share a single round-trip, e.g. the traffic of a repo watched by two config
+    entries that refresh together.
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        *args: Any,
+        queue: RequestQueue,
+        stats: RequestStats | None = None,
+        tokens: list[str] | None = None,
+        breaker: CircuitBreaker | None = None,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(session, *args, **kwargs)
+        self.queue = queue
+        self.stats = stats or RequestStats()
+        self.breaker = breaker or CircuitBreaker()
+        self.tokens = tokens or [self.oauth_token]
+        self.token_rate_limits: dict[str, dict[str, RateLimit]] = {
+            token: {} for token in self.tokens
+        }
+        self.requests_charged: Counter[str] = Counter()
+        # Until when each token is left out of each resource's rotation.
+        self._blocked: dict[tuple[str, str], datetime] = {}
+        self._in_flight: dict[tuple, asyncio.Future] = {}
+        # Seconds GitHub asks to wait between polls of a path, e.g. an event feed.
+        self.poll_intervals: dict[str, int] = {}
+
+    @property
+    def cache(self) -> GitHubCache | None:
+        """Return the cache of the conditional requests of the client."""
+        return self._cache if isinstance(self._cache, GitHubCache) else None
+
+    def with_cache(self, cache: MutableMapping[str, Any] | None) -> GitHubClient:
+        """Return a client sharing everything with this one but the cache.
+
+        The requests of both take turns in the same queue and are charged to the
+        same rate limits.
+        """
+        client = copy.copy(self)
+        client._cache = cache
+        return client
+
+    @property
+    def graphql_url(self) -> str:
+        """Return the GraphQL endpoint of the host."""
+        if self.base_url.endswith("/api/v3"):
+            # GitHub Enterprise serves GraphQL next to the v3 REST API.
+            return f"{self.base_url.removesuffix('/v3')}/graphql"
+        return f"{self.base_url}/graphql"
+
+    async def graphql(self, query: str, **variables: Any) -> Any:
+        """Query the GraphQL endpoint of the host."""
+        return await super().graphql(query, endpoint=self.graphql_url, **variables)
+
+    @property
+    def rate_limits(self) -> dict[str, RateLimit]:
+        """Return the budget of every resource summed over the tokens."""
+        resources: dict[str, list[RateLimit]] = {}
+        for rate_limits in self.token_rate_limits.values():
+            for resource, rate_limit in rate_limits.items():
+                resources.setdefault(resource, []).append(rate_limit)
+        return {
+            resource: RateLimit(
+                limit=sum(rate_limit.limit for rate_limit in rate_limits),
+                remaining=sum(rate_limit.remaining for rate_limit in rate_limits),
+                reset_epoch=max(
+                    rate_limit.reset_datetime.timestamp() for rate_limit in rate_limits
+                ),
+            )
+            for resource, rate_limits in resources.items()
+        }
+
+    @property
+    def retry_after(self) -> datetime | None:
+        """Return until when every token of a resource has to back off."""
+        now = dt_util.utcnow()
+        blocked: dict[str, list[datetime]] = {}
+        for (token, resource), until in self._blocked.items():
+            if until > now:
+                blocked.setdefault(resource, []).append(until)
+        return max(
+            (
+                min(untils)
+                for untils in blocked.values()
+                if len(untils) == len(self.tokens)
+            ),
+            default=None,
+        )
+
+    def _pick_token(self, resource: str) -> str:
+        """Return the token with the most budget left for `resource`."""
+        now = dt_util.utcnow()
+        available = [
+            token
+            for token in self.tokens
+            if self._blocked.get((token, resource), now) <= now
+        ] or self.tokens
+
+        def remaining(token: str) -> float:
+            if (rate_limit := self.token_rate_limits[token].get(resource)) is None:
+                # Tokens that were not used yet have their whole budget.
+                return float("inf")
+            return rate_limit.remaining
+
+        return max(available, key=remaining)
+
+    async def _request(
+        self, method: str, url: str, headers: Mapping[str, str], body: bytes = b""
+    ) -> tuple[int, Mapping[str, str], bytes]:
+        if not is_read_only(method, url, body):
+            return await self._send(method, url, headers, body)
+        key = (method, url, tuple(sorted(headers.items())), body)
+        if (future := self._in_flight.get(key)) is None:
+            future = self._in_flight[key] = asyncio.ensure_future(
+                self._send(method, url, headers, body)
+            )
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.stats.record_coalesced(method, url)
+        # A waiter that is cancelled doesn't cancel the request of the others.
+        return await asyncio.shield(future)
+
+    async def _send(
+        self, method: str, url: str, headers: Mapping[str, str], body: bytes
+    ) -> tuple[int, Mapping[str, str], bytes]:
+        """Send a request with the token that has the most budget left."""
+        if not self.breaker.allow(dt_util.utcnow()):
+            raise HostUnavailableError(
+                f"{self.base_url} is unavailable until {self.breaker.opened_until}"
+            )
+        token = self._pick_token(resource_for(url))
+        if len(self.tokens) > 1:
+            headers = {**headers, "authorization": f"token {token}"}
+        queued = time.monotonic()
+        async with self.queue:
+            started = time.monotonic()
+            try:
+                status, response_headers, response_body = await super()._request(
+                    method, url, headers, body
+                )
+            except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+                self.stats.record(
+                    method, url, None, time.monotonic() - started, started - queued
+                )
+                self._record_host_failure(repr(err))
+                raise
+        self.stats.record(
+            method,
+            url,
+            status,
+            time.monotonic() - started,
+            started - queued,
+            len(response_body),
+        )
+        self._record_rate_limit(token, status, response_headers, response_body)
+        if status >= 500:
+            self._record_host_failure(
+                f"{status} response to {endpoint_for(method, url)}"
+            )
+        elif failures := self.breaker.record_success():
+            _LOGGER.info(
+                "%s is available again after %d failures", self.base_url, failures
+            )
+        if "x-poll-interval" in response_headers:
+            path = urlsplit(url).path.removeprefix(urlsplit(self.base_url).path)
+            self.poll_intervals[path] = int(response_headers["x-poll-interval"])
+        return status, response_headers, response_body
+
+    def _record_host_failure(self, error: str) -> None:
+        """Record a failure of the host, each distinct error is logged once."""
+        if self.breaker.record_failure(dt_util.utcnow(), error):
+            _LOGGER.warning("Error requesting %s: %s", self.base_url, error)
+        else:
+            _LOGGER.debug(
+                "Error requesting %s repeated %d times: %s",
+                self.base_url,
+                self.breaker.repeated,
+                error,
+            )
+
+    def _record_rate_limit(
+        self, token: str, status: int, headers: Mapping[str, str], body: bytes
+    ) -> None:
+        """Record the rate limit details of a response to a token."""
+        resource = headers.get("x-ratelimit-resource", "core")
+        rate_limit = RateLimit.from_http(headers)
+        if rate_limit is not None:
+            self.token_rate_limits[token][resource] = rate_limit
+            if rate_limit.remaining == 0:
+                # Out of budget, wait for it to reset.
+                self._blocked[token, resource] = rate_limit.reset_datetime
+        # Conditional requests answered with a 304 are free.
+        if status != 304:
+            self.requests_charged[resource] += 1
+        if status not in (403, 429):
+            return
+        if "retry-after" in headers:
+            self._blocked[token, resource] = dt_util.utcnow() + timedelta(
+                seconds=int(headers["retry-after"])
+            )
+        elif b"secondary rate limit" in body:
+            self._blocked[token, resource] = (
+                dt_util.utcnow() + SECONDARY_RATE_LIMIT_BACKOFF
+            )
+
+
+def resource_for(url: str) -> str:
+    """Return the rate limit resource a request to `url` is charged against."""
+    path = urlsplit(url).path
+    if path.endswith("/graphql"):
+        return "graphql"
+    if "/search/" in path:
+        return "search"
+    return "core"
+
+
+def is_read_only(method: str, url: str, body: bytes) -> bool:
+    """Return whether a request has no side effects, so it can be shared."""
+    if method == "GET":
+        return True
+    if method != "POST" or resource_for(url) != "graphql":
+        return False
+    query = json.loads(body or b"{}").get("query", "")
+    return not query.lstrip().startswith("mutation")
+
+
+def api_url(url: str | None) -> str:
+    """Return the API URL of a GitHub host, e.g. `https://ghe.example.com/api/v3`.
+
+    `url` is the URL of github.com or of a GitHub Enterprise instance, the
+    default is github.com.
+    """
+    if not url:
+        return BASE_API_URL
+    url = url.rstrip("/")
+    if urlsplit(url).hostname in ("github.com", "api.github.com"):
+        return BASE_API_URL
+    if url.endswith("/api/v3"):
+        return url
+    return f"{url}/api/v3"
+
+
+@callback
+def async_get_queue(
+    hass: core.HomeAssistant, base_url: str = BASE_API_URL
+) -> RequestQueue:
+    """Return the queue limiting concurrent requests to a host."""
+    queues: dict[str, RequestQueue] = hass.data.setdefault(DATA_QUEUES, {})
+    if base_url not in queues:
+        queues[base_url] = RequestQueue(
+            hass.data.get(DATA_MAX_CONCURRENT_REQUESTS, DEFAULT_MAX_CONCURRENT_REQUESTS)
+        )
+    return queues[base_url]
+
+
+@callback
+def async_get_session(
+    hass: core.HomeAssistant, base_url: str = BASE_API_URL
+) -> aiohttp.ClientSession:
+    """Return the session of a host, with a connection pool of its own.
+
+    Connections are kept alive between refreshes and the addresses of the host
+    are cached. The session is closed when Home Assistant stops.
+    """
+    sessions: dict[str, aiohttp.ClientSession] = hass.data.setdefault(DATA_SESSIONS, {})
+    if base_url not in sessions:
+        connector = aiohttp.TCPConnector(
+            ssl=ssl_util.get_default_context(),
+            limit=hass.data.get(
+                DATA_MAX_CONCURRENT_REQUESTS, DEFAULT_MAX_CONCURRENT_REQUESTS
+            ),
+            keepalive_timeout=KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=DNS_CACHE_TTL,
+        )
+        session = sessions[base_url] = aiohttp.ClientSession(connector=connector)
+
+        async def _async_close_session(event: Event) -> None:
+            """Close the session of the host."""
+            await session.close()
+
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_CLOSE, _async_close_session)
+    return sessions[base_url]
+
+
+@callback
+def async_create_client(
+    hass: core.HomeAssistant,
+    access_token: str,
+    tokens: list[str] | None = None,
+    base_url: str = BASE_API_URL,
+) -> GitHubClient:
+    """Return the client of a token on the host with the API at `base_url`.
+
+    Requests are spread over `access_token` and the additional `tokens`. Clients
+    are shared by the config entries, platforms and flows using the same tokens,
+    so their identical requests can be coalesced. Each host has its own session,
+    request queue, stats, breaker and rate limits.
+    """
+    tokens = list(dict.fromkeys([access_token, *(tokens or [])]))
+    clients: dict[tuple, GitHubClient] = hass.data.setdefault(DATA_CLIENTS, {})
+    key = (base_url, *tokens)
+    if key not in clients:
+        clients[key] = GitHubClient(
+            async_get_session(hass, base_url),
+            "requester",
+            oauth_token=access_token,
+            cache=async_get_cache(hass, access_token),
+            base_url=base_url,
+            queue=async_get_queue(hass, base_url),
+            stats=async_get_stats(hass, base_url),
+            tokens=tokens,
+            breaker=async_get_breaker(hass, base_url),
+        )
+    return clients[key]
+
+
+def token_label(token: str) -> str:
+    """Return a label telling tokens apart without revealing them."""
+    return f"…{token[-4:]}"
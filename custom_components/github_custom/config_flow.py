@@ -1,21 +1,52 @@
+import asyncio
 from copy import deepcopy
+from fnmatch import fnmatch
 import logging
+import re
+import secrets
 from typing import Any, Dict, Optional
 
-from gidgethub import BadRequest
-from gidgethub.aiohttp import GitHubAPI
+from aiohttp import ClientError
+from gidgethub import BadRequest, GitHubException
 from homeassistant import config_entries, core
-from homeassistant.const import CONF_ACCESS_TOKEN, CONF_NAME, CONF_PATH, CONF_URL
+from homeassistant.components import webhook
+from homeassistant.const import (
+    CONF_ACCESS_TOKEN,
+    CONF_NAME,
+    CONF_PATH,
+    CONF_URL,
+    CONF_WEBHOOK_ID,
+)
 from homeassistant.core import callback
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
 import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers.entity_registry import (
     async_entries_for_config_entry,
     async_get,
 )
+from homeassistant.helpers.selector import TextSelector, TextSelectorConfig
 import voluptuous as vol
 
-from .const import CONF_REPOS, DOMAIN
+from .client import GitHubClient, api_url, async_create_client
+from .const import (
+    BASE_API_URL,
+    CONF_ACCESS_TOKENS,
+    CONF_DISCOVER,
+    CONF_EVENTS,
+    CONF_HOT_REPOS,
+    CONF_MAX_STALENESS,
+    CONF_REPOS,
+    CONF_WEBHOOK,
+    CONF_WEBHOOK_SECRET,
+    DOMAIN,
+)
+from .coordinator import (
+    DATA_SEEDS,
+    DEFAULT_MAX_STALENESS,
+    TTL_OPTIONS,
+    GitHubDataUpdateCoordinator,
+)
+from .discovery import parse_owners
+from .request_queue import PRIORITY_INTERACTIVE, request_context
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -29,38 +60,110 @@ REPO_SCHEMA = vol.Schema(
         vol.Optional("add_another"): cv.boolean,
     }
 )
+BULK_SCHEMA = vol.Schema(
+    {vol.Required(CONF_REPOS): TextSelector(TextSelectorConfig(multiline=True))}
+)
+
+# Matches the repo paths that are globs to expand e.g. `owner/*`.
+GLOB = re.compile(r"[*?[]")
 
 OPTIONS_SHCEMA = vol.Schema({vol.Optional(CONF_NAME, default="foo"): cv.string})
 
 
-async def validate_path(path: str, access_token: str, hass: core.HassJob) -> None:
-    """Validates a GitHub repo path.
+async def validate_path(
+    path: str, access_token: str, hass: core.HassJob, url: Optional[str] = None
+) -> None:
+    """Validates a GitHub repo path on the host at `url`, github.com by default.
 
-    Raises a ValueError if the path is invalid.
+    Raises a ValueError if the path is invalid. The request skips ahead of the
+    polls waiting for the host.
     """
     if len(path.split("/")) != 2:
         raise ValueError
-    session = async_get_clientsession(hass)
-    gh = GitHubAPI(session, "requester", oauth_token=access_token)
+    gh = async_create_client(hass, access_token, base_url=api_url(url))
     try:
-        await gh.getitem(f"repos/{path}")
+        with request_context(PRIORITY_INTERACTIVE):
+            await gh.getitem(f"repos/{path}")
     except BadRequest:
         raise ValueError
 
 
-async def validate_auth(access_token: str, hass: core.HomeAssistant) -> None:
-    """Validates a GitHub access token.
+async def validate_auth(
+    access_token: str, hass: core.HomeAssistant, url: Optional[str] = None
+) -> None:
+    """Validates a GitHub access token on the host at `url`, github.com by default.
 
-    Raises a ValueError if the auth token is invalid.
+    Raises a ValueError if the auth token is invalid. The request skips ahead of
+    the polls waiting for the host.
     """
-    session = async_get_clientsession(hass)
-    gh = GitHubAPI(session, "requester", oauth_token=access_token)
+    gh = async_create_client(hass, access_token, base_url=api_url(url))
     try:
-        await gh.getitem("repos/home-assistant/core")
+        with request_context(PRIORITY_INTERACTIVE):
+            if gh.base_url == BASE_API_URL:
+                await gh.getitem("repos/home-assistant/core")
+            else:
+                # GitHub Enterprise instances don't have the repo.
+                await gh.getitem("user")
     except BadRequest:
         raise ValueError
 
 
+def parse_list(text: str) -> list[str]:
+    """Split a pasted list of repo paths or tokens by lines, spaces or commas."""
+    return list(dict.fromkeys(item for item in re.split(r"[\s,]+", text) if item))
+
+
+async def expand_glob(pattern: str, github: GitHubClient) -> list[str]:
+    """Return the paths of the repos of an owner matching a glob e.g. `owner/*`.
+
+    No repos match when the owner doesn't exist.
+    """
+    owner, name = pattern.split("/")
+    try:
+        try:
+            # Includes the private repos of an organization the token can see.
+            repos = [
+                repo
+                async for repo in github.getiter(f"/orgs/{owner}/repos?per_page=100")
+            ]
+        except BadRequest:
+            repos = [
+                repo
+                async for repo in github.getiter(f"/users/{owner}/repos?per_page=100")
+            ]
+    except (ClientError, GitHubException):
+        return []
+    return [repo["full_name"] for repo in repos if fnmatch(repo["name"], name)]
+
+
+async def validate_paths(
+    paths: list[str], coordinator: GitHubDataUpdateCoordinator
+) -> tuple[list[str], list[str]]:
+    """Validates a list of GitHub repo paths and owner globs.
+
+    Globs are expanded and every repo is fetched concurrently by the coordinator,
+    which keeps what it fetched. Returns the valid repo paths and the paths and
+    globs that are invalid. The requests skip ahead of the polls waiting for the
+    host.
+    """
+    invalid = [path for path in paths if len(path.split("/")) != 2]
+    patterns = [path for path in paths if path not in invalid and GLOB.search(path)]
+    repo_paths = [path for path in paths if path not in invalid + patterns]
+    with request_context(PRIORITY_INTERACTIVE):
+        expanded = await asyncio.gather(
+            *(expand_glob(pattern, coordinator.github) for pattern in patterns)
+        )
+        for pattern, matches in zip(patterns, expanded):
+            if not matches:
+                invalid.append(pattern)
+            else:
+                repo_paths.extend(matches)
+        repo_paths = list(dict.fromkeys(repo_paths))
+        failed = await coordinator.async_fetch_repos(repo_paths)
+    valid = [path for path in repo_paths if path not in failed]
+    return valid, invalid + [path for path in repo_paths if path in failed]
+
+
 class GithubCustomConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Github Custom config flow."""
 
@@ -71,15 +174,19 @@ class GithubCustomConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         errors: Dict[str, str] = {}
         if user_input is not None:
             try:
-                await validate_auth(user_input[CONF_ACCESS_TOKEN], self.hass)
+                await validate_auth(
+                    user_input[CONF_ACCESS_TOKEN], self.hass, user_input.get(CONF_URL)
+                )
             except ValueError:
                 errors["base"] = "auth"
             if not errors:
                 # Input is valid, set data.
                 self.data = user_input
                 self.data[CONF_REPOS] = []
-                # Return the form of the next step.
-                return await self.async_step_repo()
+                # Let the user add repos one by one or paste a list of them.
+                return self.async_show_menu(
+                    step_id="repos", menu_options=["repo", "bulk"]
+                )
 
         return self.async_show_form(
             step_id="user", data_schema=AUTH_SCHEMA, errors=errors
@@ -92,7 +199,10 @@ class GithubCustomConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             # Validate the path.
             try:
                 await validate_path(
-                    user_input[CONF_PATH], self.data[CONF_ACCESS_TOKEN], self.hass
+                    user_input[CONF_PATH],
+                    self.data[CONF_ACCESS_TOKEN],
+                    self.hass,
+                    self.data.get(CONF_URL),
                 )
             except ValueError:
                 errors["base"] = "invalid_path"
@@ -117,6 +227,44 @@ class GithubCustomConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             step_id="repo", data_schema=REPO_SCHEMA, errors=errors
         )
 
+    async def async_step_bulk(self, user_input: Optional[Dict[str, Any]] = None):
+        """Step in config flow to add many repos at once."""
+        errors: Dict[str, str] = {}
+        placeholders = {"paths": ""}
+        if user_input is not None:
+            access_token = self.data[CONF_ACCESS_TOKEN]
+            coordinator = GitHubDataUpdateCoordinator(
+                self.hass,
+                async_create_client(
+                    self.hass, access_token, base_url=api_url(self.data.get(CONF_URL))
+                ),
+                [],
+            )
+            valid, invalid = await validate_paths(
+                parse_list(user_input[CONF_REPOS]), coordinator
+            )
+            if invalid or not valid:
+                errors["base"] = "invalid_paths"
+                placeholders["paths"] = ", ".join(invalid)
+
+            if not errors:
+                self.data[CONF_REPOS].extend(
+                    {"path": path, "name": path} for path in valid
+                )
+                # The config entry starts from the repos fetched to validate them
+                # rather than fetching them all over again.
+                self.hass.data.setdefault(DATA_SEEDS, {})[
+                    access_token
+                ] = coordinator.stored_data()
+                return self.async_create_entry(title="GitHub Custom", data=self.data)
+
+        return self.async_show_form(
+            step_id="bulk",
+            data_schema=BULK_SCHEMA,
+            errors=errors,
+            description_placeholders=placeholders,
+        )
+
     @staticmethod
     @callback
     def async_get_options_flow(config_entry):
@@ -138,29 +286,40 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
         # Grab all configured repos from the entity registry so we can populate the
         # multi-select dropdown that will allow a user to remove a repo.
         entity_registry = async_get(self.hass)
-        entries = async_entries_for_config_entry(
-            entity_registry, self.config_entry.entry_id
-        )
+        # Only repos have no entity category, unlike the rate limit sensors.
+        entries = [
+            entry
+            for entry in async_entries_for_config_entry(
+                entity_registry, self.config_entry.entry_id
+            )
+            if entry.entity_category is None
+        ]
         # Default value for our multi-select.
         all_repos = {e.entity_id: e.original_name for e in entries}
         repo_map = {e.entity_id: e for e in entries}
+        # Repos that can be pinned to the hot tier, keyed by path.
+        all_paths = {e.unique_id: e.original_name for e in entries}
 
         if user_input is not None:
-            updated_repos = deepcopy(self.config_entry.data[CONF_REPOS])
+            # The configured repos keyed by path, the options hold the repos as
+            # they were last changed.
+            repos = {
+                repo["path"]: repo
+                for repo in deepcopy(
+                    self.config_entry.options.get(
+                        CONF_REPOS, self.config_entry.data[CONF_REPOS]
+                    )
+                )
+            }
+            # Discovered repos can be pinned but not removed here.
+            discovered = all_paths.keys() - repos.keys()
 
-            # Remove any unchecked repos.
-            removed_entities = [
-                entity_id
-                for entity_id in repo_map.keys()
-                if entity_id not in user_input["repos"]
-            ]
-            for entity_id in removed_entities:
-                # Unregister from HA
-                entity_registry.async_remove(entity_id)
-                # Remove from our configured repos.
-                entry = repo_map[entity_id]
-                entry_path = entry.unique_id
-                updated_repos = [e for e in updated_repos if e["path"] != entry_path]
+            # Remove any unchecked repos, their sensors are removed once the
+            # options are saved.
+            selected = set(user_input["repos"])
+            for entity_id, entry in repo_map.items():
+                if entity_id not in selected:
+                    repos.pop(entry.unique_id, None)
 
             if user_input.get(CONF_PATH):
                 # Validate the path.
@@ -168,26 +327,77 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                     CONF_ACCESS_TOKEN
                 ]
                 try:
-                    await validate_path(user_input[CONF_PATH], access_token, self.hass)
+                    await validate_path(
+                        user_input[CONF_PATH],
+                        access_token,
+                        self.hass,
+                        self.config_entry.data.get(CONF_URL),
+                    )
                 except ValueError:
                     errors["base"] = "invalid_path"
 
                 if not errors:
                     # Add the new repo.
-                    updated_repos.append(
-                        {
-                            "path": user_input[CONF_PATH],
-                            "name": user_input.get(CONF_NAME, user_input[CONF_PATH]),
-                        }
+                    repos[user_input[CONF_PATH]] = {
+                        "path": user_input[CONF_PATH],
+                        "name": user_input.get(CONF_NAME, user_input[CONF_PATH]),
+                    }
+
+            try:
+                parse_owners(user_input.get(CONF_DISCOVER, ""))
+            except ValueError:
+                errors["base"] = "invalid_owners"
+
+            # Validate the additional tokens.
+            tokens = parse_list(user_input.get(CONF_ACCESS_TOKENS, ""))
+            results = await asyncio.gather(
+                *(
+                    validate_auth(
+                        token, self.hass, self.config_entry.data.get(CONF_URL)
                     )
+                    for token in tokens
+                ),
+                return_exceptions=True,
+            )
+            if any(isinstance(result, ValueError) for result in results):
+                errors["base"] = "auth"
 
             if not errors:
+                options = {
+                    CONF_REPOS: list(repos.values()),
+                    **{
+                        option: user_input[option]
+                        for option, _ in TTL_OPTIONS.values()
+                        if option in user_input
+                    },
+                }
+                if CONF_MAX_STALENESS in user_input:
+                    options[CONF_MAX_STALENESS] = user_input[CONF_MAX_STALENESS]
+                if user_input.get(CONF_DISCOVER):
+                    options[CONF_DISCOVER] = user_input[CONF_DISCOVER]
+                if hot_paths := [
+                    path
+                    for path in user_input.get(CONF_HOT_REPOS, [])
+                    if path in repos or path in discovered
+                ]:
+                    options[CONF_HOT_REPOS] = hot_paths
+                if tokens:
+                    options[CONF_ACCESS_TOKENS] = tokens
+                if user_input.get(CONF_EVENTS):
+                    options[CONF_EVENTS] = True
+                if user_input.get(CONF_WEBHOOK):
+                    # Keep the webhook GitHub already knows about.
+                    current = self.config_entry.options
+                    options[CONF_WEBHOOK] = True
+                    options[CONF_WEBHOOK_ID] = current.get(
+                        CONF_WEBHOOK_ID, webhook.async_generate_id()
+                    )
+                    options[CONF_WEBHOOK_SECRET] = current.get(
+                        CONF_WEBHOOK_SECRET, secrets.token_hex(32)
+                    )
                 # Value of data will be set on the options property of our config_entry
                 # instance.
-                return self.async_create_entry(
-                    title="",
-                    data={CONF_REPOS: updated_repos},
-                )
+                return self.async_create_entry(title="", data=options)
 
         options_schema = vol.Schema(
             {
@@ -196,6 +406,51 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                 ),
                 vol.Optional(CONF_PATH): cv.string,
                 vol.Optional(CONF_NAME): cv.string,
+                # Repos always polled every minute, whatever their activity.
+                vol.Optional(
+                    CONF_HOT_REPOS,
+                    default=[
+                        path
+                        for path in self.config_entry.options.get(CONF_HOT_REPOS, [])
+                        if path in all_paths
+                    ],
+                ): cv.multi_select(all_paths),
+                # Organizations and users to watch every repo of.
+                vol.Optional(
+                    CONF_DISCOVER,
+                    default=self.config_entry.options.get(CONF_DISCOVER, ""),
+                ): cv.string,
+                # Tokens to spread the requests over, one per line.
+                vol.Optional(
+                    CONF_ACCESS_TOKENS,
+                    default="\n".join(
+                        self.config_entry.options.get(CONF_ACCESS_TOKENS, [])
+                    ),
+                ): TextSelector(TextSelectorConfig(multiline=True)),
+                # Refresh only the groups changed by the events of the repos.
+                vol.Optional(
+                    CONF_EVENTS,
+                    default=self.config_entry.options.get(CONF_EVENTS, False),
+                ): cv.boolean,
+                vol.Optional(
+                    CONF_WEBHOOK,
+                    default=self.config_entry.options.get(CONF_WEBHOOK, False),
+                ): cv.boolean,
+                # Minutes after which each group of attributes is refetched.
+                **{
+                    vol.Optional(
+                        option, default=self.config_entry.options.get(option, default)
+                    ): cv.positive_int
+                    for option, default in TTL_OPTIONS.values()
+                },
+                # Minutes a group that fails to refresh is served from its last
+                # good value.
+                vol.Optional(
+                    CONF_MAX_STALENESS,
+                    default=self.config_entry.options.get(
+                        CONF_MAX_STALENESS, DEFAULT_MAX_STALENESS
+                    ),
+                ): cv.positive_int,
             }
         )
         return self.async_show_form(
@@ -3,6 +3,7 @@ DOMAIN = "github_custom"
 ATTR_CLONES = "clones"
 ATTR_CLONES_UNIQUE = "clones_unique"
 ATTR_FORKS = "forks"
+ATTR_GROUPS = "groups"
 ATTR_LATEST_COMMIT_MESSAGE = "latest_commit_message"
 ATTR_LATEST_COMMIT_SHA = "latest_commit_sha"
 ATTR_LATEST_OPEN_ISSUE_URL = "latest_open_issue_url"
@@ -12,10 +13,38 @@ ATTR_LATEST_RELEASE_URL = "latest_release_url"
 ATTR_OPEN_ISSUES = "open_issues"
 ATTR_OPEN_PULL_REQUESTS = "open_pull_requests"
 ATTR_PATH = "path"
+ATTR_REPOSITORIES = "repositories"
+ATTR_STALE_GROUPS = "stale_groups"
 ATTR_STARGAZERS = "stargazers"
 ATTR_VIEWS = "views"
 ATTR_VIEWS_UNIQUE = "views_unique"
 
 BASE_API_URL = "https://api.github.com"
 
+# Sent with the repos added to a config entry for the sensor platform to add their
+# sensors.
+SIGNAL_REPOS_ADDED = "github_custom_repos_added_{}"
+
+CONF_ACCESS_TOKENS = "access_tokens"
+CONF_DISCOVER = "discover"
+CONF_EVENTS = "poll_events"
+CONF_HOT_REPOS = "hot_repositories"
+CONF_MAX_CONCURRENT_REQUESTS = "max_concurrent_requests"
+CONF_MAX_STALENESS = "max_staleness"
 CONF_REPOS = "repositories"
+CONF_TTL_COMMITS = "ttl_commits"
+CONF_TTL_ISSUES = "ttl_issues"
+CONF_TTL_RELEASES = "ttl_releases"
+CONF_TTL_REPO = "ttl_repo"
+CONF_TTL_TRAFFIC = "ttl_traffic"
+CONF_WEBHOOK = "webhook"
+CONF_WEBHOOK_SECRET = "webhook_secret"
+
+SERVICE_REFRESH = "refresh"
+
+# Groups of attributes that are refreshed together.
+GROUP_COMMITS = "commits"
+GROUP_ISSUES = "issues"
+GROUP_RELEASES = "releases"
+GROUP_REPO = "repo"
+GROUP_TRAFFIC = "traffic"
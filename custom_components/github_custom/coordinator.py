@@ -0,0 +1,1043 @@
+"""Data update coordinator for the GitHub Custom integration."""
+from __future__ import annotations
+
+import asyncio
+from collections import Counter, defaultdict
+from collections.abc import Iterable, Iterator, Mapping
+from datetime import datetime, timedelta
+import logging
+import random
+from typing import Any
+
+from aiohttp import ClientError
+import gidgethub
+from gidgethub.sansio import RateLimit
+from homeassistant import core
+from homeassistant.const import ATTR_NAME
+from homeassistant.core import CALLBACK_TYPE, callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+import homeassistant.util.dt as dt_util
+
+from .breaker import CircuitBreaker, is_host_error, is_rate_limit_error
+from .cache import GitHubCache
+from .client import GitHubClient
+from .const import (
+    ATTR_CLONES,
+    ATTR_CLONES_UNIQUE,
+    ATTR_FORKS,
+    ATTR_LATEST_COMMIT_MESSAGE,
+    ATTR_LATEST_COMMIT_SHA,
+    ATTR_LATEST_OPEN_ISSUE_URL,
+    ATTR_LATEST_OPEN_PULL_REQUEST_URL,
+    ATTR_LATEST_RELEASE_TAG,
+    ATTR_LATEST_RELEASE_URL,
+    ATTR_OPEN_ISSUES,
+    ATTR_OPEN_PULL_REQUESTS,
+    ATTR_STALE_GROUPS,
+    ATTR_STARGAZERS,
+    ATTR_VIEWS,
+    ATTR_VIEWS_UNIQUE,
+    CONF_MAX_STALENESS,
+    CONF_TTL_COMMITS,
+    CONF_TTL_ISSUES,
+    CONF_TTL_RELEASES,
+    CONF_TTL_REPO,
+    CONF_TTL_TRAFFIC,
+    DOMAIN,
+    GROUP_COMMITS,
+    GROUP_ISSUES,
+    GROUP_RELEASES,
+    GROUP_REPO,
+    GROUP_TRAFFIC,
+)
+from .events import EventFeeds
+from .models import RepoSnapshot
+from .request_queue import PRIORITY_REFRESH, request_context
+from .scheduler import (
+    INITIAL_ACTIVITY,
+    MIN_SCAN_INTERVAL,
+    TIER_WARM,
+    assign_tiers,
+    compute_update_interval,
+    decayed_activity,
+    tier_ttl,
+)
+from .traffic import TrafficHistory, async_import_traffic
+
+_LOGGER = logging.getLogger(__name__)
+# Time between updating data from GitHub
+SCAN_INTERVAL = timedelta(minutes=10)
+# Repositories are packed in GraphQL queries up to a number of connections, each
+# selecting a single node. Repositories with every group expired select four
+# connections, 50 of them fit a query which keeps it well below GitHub's node
+# limit and the 10 second query timeout. Cheaper selections pack more repos per
+# query, up to GRAPHQL_MAX_REPOS.
+GRAPHQL_MAX_CONNECTIONS = 200
+GRAPHQL_MAX_REPOS = 100
+# Attribute groups in the order their attributes are exposed.
+GROUPS = (GROUP_REPO, GROUP_TRAFFIC, GROUP_COMMITS, GROUP_ISSUES, GROUP_RELEASES)
+# Option holding the minutes after which a group is refetched, with its default.
+# Traffic is aggregated by GitHub per day and releases rarely change, while
+# commits, issues and pull requests change minutes apart.
+TTL_OPTIONS = {
+    GROUP_REPO: (CONF_TTL_REPO, 30),
+    GROUP_TRAFFIC: (CONF_TTL_TRAFFIC, 360),
+    GROUP_COMMITS: (CONF_TTL_COMMITS, 10),
+    GROUP_ISSUES: (CONF_TTL_ISSUES, 10),
+    GROUP_RELEASES: (CONF_TTL_RELEASES, 60),
+}
+# Sources the groups of a repo are fetched from, each with its own breaker: the
+# traffic from the REST API and every other group from GraphQL.
+SOURCE_GRAPHQL = "graphql"
+SOURCE_TRAFFIC = "traffic"
+SOURCES = (SOURCE_GRAPHQL, SOURCE_TRAFFIC)
+# REST URLs requested per repo, its clones, views and event feed, which the cache
+# of the client keeps room for.
+URLS_PER_REPO = 3
+# Viewer permissions that grant access to the traffic endpoints.
+PUSH_PERMISSIONS = ("ADMIN", "MAINTAIN", "WRITE")
+# Groups kept up to date by webhook events for repos that push them to us, or by
+# polling the event feeds of the repos. Those are only polled as a consistency
+# check.
+PUSHED_GROUPS = (GROUP_REPO, GROUP_COMMITS, GROUP_ISSUES, GROUP_RELEASES)
+PUSHED_GROUPS_TTL = timedelta(hours=6)
+# Groups that expired while Home Assistant was stopped are refetched at a random
+# time within this window after startup, so all repos don't burst at boot.
+STARTUP_JITTER = timedelta(minutes=5)
+# Key in hass.data holding the repos validated by the config flow per access token,
+# used as the first snapshot of the config entry created with them.
+DATA_SEEDS = "github_custom_seeds"
+# Key in hass.data holding the groups fetched by the coordinators of each host,
+# shared by the config entries and yaml platforms watching the same repos.
+DATA_SHARED_GROUPS = "github_custom_shared_groups"
+# Groups another coordinator fetched this recently are reused rather than
+# requested again.
+SHARED_GROUPS_TTL = timedelta(minutes=5)
+# Calls to refresh repos within this delay are fetched together.
+REFRESH_BATCH_DELAY = timedelta(seconds=2)
+# Minutes a group that fails to refresh is served from its last good value
+# before its attributes become unknown.
+DEFAULT_MAX_STALENESS = 60
+# Delay to coalesce the writes of the snapshot store.
+STORAGE_SAVE_DELAY = 60
+STORAGE_VERSION = 1
+
+# Fields selected by the GraphQL query for every group but traffic, which is only
+# available from the REST API.
+GROUP_FIELDS = {
+    GROUP_REPO: """
+  name
+  forkCount
+  stargazerCount
+  viewerPermission""",
+    GROUP_COMMITS: """
+  defaultBranchRef {
+    target {
+      ... on Commit {
+        oid
+        message
+      }
+    }
+  }""",
+    GROUP_ISSUES: """
+  issues(states: OPEN, first: 1, orderBy: {field: CREATED_AT, direction: DESC}) {
+    totalCount
+    nodes {
+      url
+    }
+  }
+  pullRequests(
+    states: OPEN, first: 1, orderBy: {field: CREATED_AT, direction: DESC}
+  ) {
+    totalCount
+    nodes {
+      url
+    }
+  }""",
+    GROUP_RELEASES: """
+  releases(first: 1, orderBy: {field: CREATED_AT, direction: DESC}) {
+    nodes {
+      tagName
+      url
+    }
+  }""",
+}
+
+# Connections selected by the fields of each group.
+GROUP_CONNECTIONS = {GROUP_COMMITS: 1, GROUP_ISSUES: 2, GROUP_RELEASES: 1}
+
+
+def source_of(group: str) -> str:
+    """Return the source a group is fetched from."""
+    return SOURCE_TRAFFIC if group == GROUP_TRAFFIC else SOURCE_GRAPHQL
+
+
+def chunked(paths: list[str], size: int) -> Iterator[list[str]]:
+    """Yield successive chunks of `size` paths."""
+    for index in range(0, len(paths), size):
+        yield paths[index : index + size]
+
+
+def chunk_size(groups: frozenset[str]) -> int:
+    """Return the number of repos to pack in a query selecting `groups`."""
+    connections = sum(GROUP_CONNECTIONS.get(group, 0) for group in groups)
+    return min(GRAPHQL_MAX_REPOS, GRAPHQL_MAX_CONNECTIONS // max(connections, 1))
+
+
+def ttls_from_config(config: Mapping[str, Any]) -> dict[str, timedelta]:
+    """Return the time to live of every group from the config entry options."""
+    return {
+        group: timedelta(minutes=config.get(option, default))
+        for group, (option, default) in TTL_OPTIONS.items()
+    }
+
+
+def max_staleness_from_config(config: Mapping[str, Any]) -> timedelta:
+    """Return how long groups may fail to refresh from the config entry options."""
+    return timedelta(minutes=config.get(CONF_MAX_STALENESS, DEFAULT_MAX_STALENESS))
+
+
+def build_repositories_query(
+    paths: list[str], groups: frozenset[str] = frozenset(GROUPS)
+) -> tuple[str, dict[str, str]]:
+    """Build a single GraphQL query selecting every repository in `paths`.
+
+    Each repository is aliased as `repo<index>` so the results can be mapped back
+    to the path they were requested for. Owners and names are passed as variables
+    rather than interpolated into the query. Only the fields of `groups` are
+    selected.
+    """
+    definitions = []
+    selections = []
+    variables = {}
+    for index, path in enumerate(paths):
+        owner, name = path.split("/")
+        variables[f"owner{index}"] = owner
+        variables[f"name{index}"] = name
+        definitions.append(f"$owner{index}: String!, $name{index}: String!")
+        selections.append(
+            f"  repo{index}: repository(owner: $owner{index}, name: $name{index}) "
+            "{ ...RepositoryFields }"
+        )
+    fields = "".join(GROUP_FIELDS[group] for group in GROUP_FIELDS if group in groups)
+    query = (
+        f"query({', '.join(definitions)}) {{\n"
+        + "\n".join(selections)
+        + "\n}\n"
+        + f"fragment RepositoryFields on Repository {{{fields}\n}}\n"
+    )
+    return query, variables
+
+
+def parse_repository(repository: dict[str, Any]) -> dict[str, dict[str, Any]]:
+    """Convert a GraphQL repository result into the attributes of each group."""
+    groups: dict[str, dict[str, Any]] = {}
+    if "name" in repository:
+        groups[GROUP_REPO] = {
+            ATTR_FORKS: repository["forkCount"],
+            ATTR_NAME: repository["name"],
+            ATTR_STARGAZERS: repository["stargazerCount"],
+        }
+    if "defaultBranchRef" in repository:
+        groups[GROUP_COMMITS] = {}
+        # Empty repositories have no default branch.
+        if branch := repository["defaultBranchRef"]:
+            groups[GROUP_COMMITS] = {
+                ATTR_LATEST_COMMIT_MESSAGE: branch["target"]["message"],
+                ATTR_LATEST_COMMIT_SHA: branch["target"]["oid"],
+            }
+    if "issues" in repository:
+        groups[GROUP_ISSUES] = {
+            ATTR_OPEN_ISSUES: repository["issues"]["totalCount"],
+            ATTR_OPEN_PULL_REQUESTS: repository["pullRequests"]["totalCount"],
+        }
+        if issues := repository["issues"]["nodes"]:
+            groups[GROUP_ISSUES][ATTR_LATEST_OPEN_ISSUE_URL] = issues[0]["url"]
+        if pulls := repository["pullRequests"]["nodes"]:
+            groups[GROUP_ISSUES][ATTR_LATEST_OPEN_PULL_REQUEST_URL] = pulls[0]["url"]
+    if "releases" in repository:
+        groups[GROUP_RELEASES] = {}
+        if releases := repository["releases"]["nodes"]:
+            groups[GROUP_RELEASES] = {
+                ATTR_LATEST_RELEASE_URL: releases[0]["url"],
+                ATTR_LATEST_RELEASE_TAG: releases[0]["tagName"],
+            }
+    return groups
+
+
+@callback
+def async_get_shared_groups(
+    hass: core.HomeAssistant, base_url: str
+) -> dict[tuple[str, str], tuple[datetime, dict[str, Any]]]:
+    """Return the groups fetched by every coordinator of a host.
+
+    They are keyed by repo and group, with when they were fetched.
+    """
+    shared: dict[str, dict] = hass.data.setdefault(DATA_SHARED_GROUPS, {})
+    return shared.setdefault(base_url, {})
+
+
+class GitHubDataUpdateCoordinator(DataUpdateCoordinator[dict[str, RepoSnapshot]]):
+    """Fetches the data for every watched repo of a config entry.
+
+    The data is a mapping of repo path to the snapshot of that repo. Repos that
+    could not be retrieved are missing from the mapping.
+
+    Attributes are fetched in groups that each have their own time to live. An
+    update only refetches the groups that expired, the attributes of the other
+    groups are served from the previous updates. With `events`, the event feeds
+    of the repos are polled instead and only the groups an event changed are
+    refetched.
+
+    Groups fetched within `SHARED_GROUPS_TTL` by the coordinator of another entry
+    or yaml platform on the same host are reused instead of requested again.
+
+    A group that fails to refresh keeps its last good value and is retried on the
+    next update, the rest of the snapshot still updates. Once a group failed for
+    longer than `max_staleness` its attributes are left out, the repo only becomes
+    unavailable when that group is the repo group.
+    """
+
+    def __init__(
+        self,
+        hass: core.HomeAssistant,
+        github: GitHubClient,
+        repos: list[dict[str, str]],
+        ttls: dict[str, timedelta] | None = None,
+        store: Store | None = None,
+        discover: bool = False,
+        hot_paths: Iterable[str] = (),
+        events: bool = False,
+        max_staleness: timedelta | None = None,
+        webhook: bool = False,
+    ) -> None:
+        super().__init__(hass, _LOGGER, name=DOMAIN, update_interval=SCAN_INTERVAL)
+        self.github = github
+        self._store = store
+        self.paths = [repo["path"] for repo in repos]
+        self.ttls = ttls or ttls_from_config({})
+        # When each group of each repo was fetched and the attributes it returned.
+        self._groups: dict[
+            str, dict[str, tuple[datetime, dict[str, Any]]]
+        ] = defaultdict(dict)
+        # Groups of each repo that an event changed since they were fetched.
+        self._invalidated: dict[str, set[str]] = defaultdict(set)
+        # When each group of each repo that fails to refresh first failed.
+        self._stale: dict[str, dict[str, datetime]] = defaultdict(dict)
+        self.max_staleness = max_staleness or max_staleness_from_config({})
+        # The permission of the token on each repo, pushing is needed to see the
+        # traffic and admin to create webhooks.
+        self.permissions: dict[str, str] = {}
+        # Repos whose events are pushed to us by a webhook.
+        self.webhook = webhook
+        self.pushed_paths: set[str] = set()
+        # The sensor of each repo, notified of the events pushed to that repo.
+        self._path_listeners: dict[str, CALLBACK_TYPE] = {}
+        # Repos watched because they were discovered rather than configured.
+        self.discover = discover
+        self.discovered_paths: set[str] = set()
+        # Requests charged per rate limit resource by the last update.
+        self.cycle_cost: Counter[str] = Counter()
+        # How often the snapshot of each repo changes and when that was last
+        # recorded, which sets the tier the repo is polled in. Repos pinned as hot
+        # are always polled in the hot tier.
+        self.activity: dict[str, tuple[float, datetime]] = {}
+        self.hot_paths = set(hot_paths)
+        self.tiers: dict[str, str] = {}
+        # The daily traffic of each repo, written to the long-term statistics.
+        self.traffic_history: dict[str, TrafficHistory] = {}
+        # The breakers of the sources of the repos that failed, per repo and
+        # source. Sources that keep failing are backed off from rather than
+        # requested on every update, without holding up the other source.
+        self.breakers: dict[tuple[str, str], CircuitBreaker] = {}
+        # The event feeds of the repos that don't push their events to us.
+        self.event_feeds = EventFeeds(github) if events else None
+        self._path_index = {path.lower(): path for path in self.paths}
+        # The refresh the calls of the current batch wait for.
+        self._batch: asyncio.Future[None] | None = None
+        self._unsub_batch: CALLBACK_TYPE | None = None
+        # Priority of the requests of the next update, None for a scheduled poll.
+        self._priority: int | None = None
+        self._update_lock = asyncio.Lock()
+        self._shared_groups = async_get_shared_groups(hass, github.base_url)
+        self._async_reserve_cache()
+
+    async def async_restore(self, seed: dict[str, Any] | None = None) -> bool:
+        """Restore the last snapshot saved to the store.
+
+        A `seed` snapshot, e.g. from validating the repos in the config flow, is
+        restored instead when given. Returns True when repos were restored, their
+        sensors can then be set up with real state right away while the expired
+        groups are refetched in the background.
+        """
+        stored = seed
+        if stored is None and self._store is not None:
+            stored = await self._store.async_load()
+        if stored is None:
+            return False
+        now = dt_util.utcnow()
+        if self.discover:
+            self.async_add_paths(stored.get("discovered_paths", []))
+        paths = set(self.paths)
+        self.permissions.update(
+            (path, permission)
+            for path, permission in stored["permissions"].items()
+            if path in paths
+        )
+        if self.webhook:
+            # Repos only push their events while the webhook is on.
+            self.pushed_paths.update(
+                path for path in stored["pushed_paths"] if path in paths
+            )
+        for path, groups in stored.get("invalidated", {}).items():
+            if path in paths:
+                self._invalidated[path].update(groups)
+        for path, (value, updated) in stored.get("activity", {}).items():
+            if path in paths:
+                self.activity[path] = (value, dt_util.parse_datetime(updated))
+        for path, history in stored.get("traffic", {}).items():
+            if path in paths:
+                self.traffic_history[path] = TrafficHistory.from_dict(history)
+        if self.event_feeds is not None:
+            # Events that happened while stopped invalidate their groups.
+            self.event_feeds.last_ids.update(
+                (path, last_id)
+                for path, last_id in stored.get("events", {}).items()
+                if path in paths
+            )
+        self._update_tiers(now)
+        for path, groups in stored["groups"].items():
+            if path not in paths:
+                continue
+            for group, (fetched, attrs) in groups.items():
+                fetched_at = dt_util.parse_datetime(fetched)
+                self._groups[path][group] = (fetched_at, attrs)
+                if (expires := self._expires(path, group)) <= now:
+                    # Shift the fetch time so the group expires at a random time
+                    # within the startup window.
+                    jitter = STARTUP_JITTER * random.random()
+                    self._groups[path][group] = (
+                        fetched_at + (now - expires) + jitter,
+                        attrs,
+                    )
+        data = {
+            path: self._snapshot(path)
+            for path in self.paths
+            if GROUP_REPO in self._groups[path]
+        }
+        if not data:
+            return False
+        self._update_interval_from_rate_limits(Counter())
+        if any(self._expired_groups(path, now) for path in self.paths):
+            # Repos and groups missing from the snapshot are fetched right away.
+            self.update_interval = MIN_SCAN_INTERVAL
+        self.async_set_updated_data(data)
+        return True
+
+    async def async_save(self) -> None:
+        """Save the snapshot right away, e.g. before the entry is unloaded."""
+        if self._store is not None:
+            await self._store.async_save(self.stored_data())
+
+    @callback
+    def _async_save(self) -> None:
+        """Save the snapshot of every repo to the store."""
+        if self._store is not None:
+            self._store.async_delay_save(self.stored_data, STORAGE_SAVE_DELAY)
+
+    def stored_data(self) -> dict[str, Any]:
+        """Return the snapshot of every repo to save to the store."""
+        return {
+            "groups": {
+                path: {
+                    group: [fetched.isoformat(), attrs]
+                    for group, (fetched, attrs) in groups.items()
+                }
+                for path, groups in self._groups.items()
+            },
+            "permissions": self.permissions,
+            "pushed_paths": sorted(self.pushed_paths),
+            "invalidated": {
+                path: sorted(groups)
+                for path, groups in self._invalidated.items()
+                if groups
+            },
+            "discovered_paths": sorted(self.discovered_paths),
+            "activity": {
+                path: [value, updated.isoformat()]
+                for path, (value, updated) in self.activity.items()
+            },
+            "traffic": {
+                path: history.as_dict()
+                for path, history in self.traffic_history.items()
+            },
+            "events": self.event_feeds.last_ids if self.event_feeds else {},
+        }
+
+    @callback
+    def async_add_paths(self, paths: Iterable[str], discovered: bool = True) -> None:
+        """Watch repos, they are fetched on the next update.
+
+        Configured repos that were already watched because they were discovered
+        are no longer counted as discovered.
+        """
+        for path in paths:
+            if (watched := self.path_for(path)) is not None:
+                if not discovered:
+                    self.discovered_paths.discard(watched)
+                continue
+            self.paths.append(path)
+            self._path_index[path.lower()] = path
+            if discovered:
+                self.discovered_paths.add(path)
+        self._async_reserve_cache()
+
+    @callback
+    def async_remove_paths(self, paths: Iterable[str]) -> None:
+        """Stop watching repos and forget what was fetched for them."""
+        removed = set(paths)
+        self.paths = [path for path in self.paths if path not in removed]
+        self._async_reserve_cache()
+        for path in removed:
+            self._path_index.pop(path.lower(), None)
+            self._groups.pop(path, None)
+            self._invalidated.pop(path, None)
+            self._stale.pop(path, None)
+            self.permissions.pop(path, None)
+            self.pushed_paths.discard(path)
+            self.discovered_paths.discard(path)
+            self.activity.pop(path, None)
+            self.traffic_history.pop(path, None)
+            self.tiers.pop(path, None)
+            for source in SOURCES:
+                self.breakers.pop((path, source), None)
+            if self.event_feeds is not None:
+                self.event_feeds.forget(path)
+            if self.data is not None:
+                self.data.pop(path, None)
+        self._async_save()
+
+    async def async_refresh_groups(
+        self, paths: Iterable[str], groups: Iterable[str]
+    ) -> None:
+        """Refetch groups of repos, e.g. when asked by the refresh service.
+
+        The groups expire right away. Calls within `REFRESH_BATCH_DELAY` are
+        merged into a single refresh, which skips ahead of the polls waiting for
+        the host. Returns once that refresh is done.
+        """
+        groups = set(groups)
+        for path in paths:
+            self._invalidated[path].update(groups)
+        if self._batch is None:
+            self._batch = self.hass.loop.create_future()
+            self._unsub_batch = async_call_later(
+                self.hass, REFRESH_BATCH_DELAY, self._async_refresh_batch
+            )
+        # A caller that is cancelled doesn't cancel the refresh of the others.
+        await asyncio.shield(self._batch)
+
+    async def _async_refresh_batch(self, now: datetime) -> None:
+        """Refresh the groups asked for by the calls of the batch."""
+        batch, self._batch, self._unsub_batch = self._batch, None, None
+        try:
+            await self.async_refresh_ahead()
+        finally:
+            if batch is not None and not batch.done():
+                batch.set_result(None)
+
+    async def async_refresh_ahead(self) -> None:
+        """Refresh right away, ahead of the polls waiting for the host.
+
+        The priority is only given to the requests of this refresh. Setting it
+        in the context of the caller would leak it into the timer of the next
+        scheduled refresh, which copies that context.
+        """
+        self._priority = PRIORITY_REFRESH
+        await self.async_refresh()
+
+    @callback
+    def _async_reserve_cache(self) -> None:
+        """Keep room in the cache of the client for the URLs of the repos."""
+        if isinstance(cache := self.github.cache, GitHubCache):
+            cache.reserve(self, len(self.paths) * URLS_PER_REPO)
+
+    @callback
+    def async_release_cache(self) -> None:
+        """Release the room kept in the cache, e.g. when the entry is unloaded."""
+        if isinstance(cache := self.github.cache, GitHubCache):
+            cache.reserve(self, 0)
+
+    @callback
+    def async_cancel_batch(self) -> None:
+        """Cancel the pending refresh, e.g. when the entry is unloaded."""
+        if self._unsub_batch is not None:
+            self._unsub_batch()
+        if self._batch is not None and not self._batch.done():
+            self._batch.set_result(None)
+        self._batch = self._unsub_batch = None
+
+    def path_for(self, full_name: str) -> str | None:
+        """Return the watched path of a repo from its GitHub full name."""
+        return self._path_index.get(full_name.lower())
+
+    def _expires(self, path: str, group: str) -> datetime | None:
+        """Return when a group of a repo expires, None if it was never fetched."""
+        if (cached := self._groups[path].get(group)) is None:
+            return None
+        if group in self._invalidated[path]:
+            return cached[0]
+        ttl = self.ttls[group]
+        if group in PUSHED_GROUPS and (
+            path in self.pushed_paths or self.event_feeds is not None
+        ):
+            ttl = max(ttl, PUSHED_GROUPS_TTL)
+        elif group != GROUP_TRAFFIC:
+            # Traffic is aggregated per day, polling it faster doesn't help.
+            ttl = tier_ttl(self.tiers.get(path, TIER_WARM), ttl)
+        return cached[0] + ttl
+
+    @callback
+    def _record_activity(self, path: str, now: datetime, changed: bool) -> None:
+        """Record whether the snapshot of a repo changed when it was fetched."""
+        if (recorded := self.activity.get(path)) is None:
+            self.activity[path] = (INITIAL_ACTIVITY, now)
+        elif changed:
+            self.activity[path] = (decayed_activity(*recorded, now) + 1, now)
+
+    def _record_failures(
+        self, paths: Iterable[str], source: str, now: datetime, error: str
+    ) -> None:
+        """Record repos whose source failed, each distinct error is logged once."""
+        new = []
+        for path in paths:
+            breaker = self.breakers.setdefault((path, source), CircuitBreaker())
+            if breaker.record_failure(now, error):
+                new.append(path)
+            else:
+                _LOGGER.debug(
+                    "Error retrieving %s repeated %d times: %s",
+                    path,
+                    breaker.repeated,
+                    error,
+                )
+        if new:
+            _LOGGER.warning(
+                "Error retrieving %s from GitHub: %s", ", ".join(new), error
+            )
+
+    def _record_success(self, path: str, source: str) -> None:
+        """Record a source of a repo that was retrieved, closing its breaker."""
+        if (breaker := self.breakers.pop((path, source), None)) is not None:
+            _LOGGER.info(
+                "Retrieved %s of %s again after %d failures",
+                source,
+                path,
+                breaker.record_success(),
+            )
+
+    def _polled_paths(self) -> list[str]:
+        """Return the repos whose event feed is polled."""
+        return [path for path in self.paths if path not in self.pushed_paths]
+
+    async def _async_poll_events(self, now: datetime) -> None:
+        """Expire the groups changed by the new events of the repos."""
+        assert self.event_feeds is not None
+        changed = await self.event_feeds.async_poll(self._polled_paths(), now)
+        for path, groups in changed.items():
+            _LOGGER.debug("Events of %s changed %s", path, sorted(groups))
+            self._invalidated[path].update(groups)
+
+    def _update_tiers(self, now: datetime) -> None:
+        """Move the repos between tiers from their activity."""
+        self.tiers = assign_tiers(
+            {
+                path: decayed_activity(*self.activity[path], now)
+                for path in self.paths
+                if path in self.activity
+            },
+            self.hot_paths,
+        )
+
+    def _expired_groups(self, path: str, now: datetime) -> frozenset[str]:
+        """Return the groups of a repo that need to be refetched."""
+        return frozenset(
+            group
+            for group in GROUPS
+            if not (
+                group == GROUP_TRAFFIC
+                and path in self.permissions
+                and self.permissions[path] not in PUSH_PERMISSIONS
+            )
+            and ((expires := self._expires(path, group)) is None or expires <= now)
+        )
+
+    def _snapshot(self, path: str) -> RepoSnapshot:
+        """Return the snapshot of a repo from all of its groups.
+
+        Groups that failed for longer than the staleness limit are left out, the
+        rest of the snapshot is still served.
+        """
+        now = dt_util.utcnow()
+        attrs: dict[str, Any] = {}
+        stale: dict[str, str] = {}
+        for group in GROUPS:
+            cached = self._groups[path].get(group)
+            if cached is None or self._too_stale(path, group, now):
+                continue
+            attrs.update(cached[1])
+            if group in self._stale.get(path, {}):
+                stale[group] = cached[0].isoformat()
+        if stale:
+            attrs[ATTR_STALE_GROUPS] = stale
+        return RepoSnapshot(path, **attrs)
+
+    def _too_stale(self, path: str, group: str, now: datetime) -> bool:
+        """Return whether a group failed for longer than the staleness limit."""
+        failed = self._stale.get(path, {}).get(group)
+        return failed is not None and now - failed > self.max_staleness
+
+    def _available(self, path: str, now: datetime) -> bool:
+        """Return whether the repo group of a repo was fetched and isn't too stale.
+
+        The other groups failing doesn't make the repo unavailable.
+        """
+        return GROUP_REPO in self._groups[path] and not self._too_stale(
+            path, GROUP_REPO, now
+        )
+
+    def _set_group(
+        self, path: str, group: str, now: datetime, attrs: dict[str, Any]
+    ) -> None:
+        """Keep the attributes of a group that were just fetched."""
+        self._groups[path][group] = (now, attrs)
+        self._invalidated[path].discard(group)
+        self._stale[path].pop(group, None)
+        self._shared_groups[path, group] = (now, attrs)
+
+    def _reuse_shared_groups(
+        self, path: str, groups: frozenset[str], now: datetime
+    ) -> frozenset[str]:
+        """Take the groups another coordinator fetched recently, returns the rest.
+
+        Only repos this coordinator retrieved itself before are reused, so the
+        token is known to see them. Groups an event or the user asked to refresh
+        are always requested.
+        """
+        if path not in self.permissions:
+            return groups
+        reused = set()
+        for group in groups - self._invalidated[path]:
+            if (
+                group == GROUP_TRAFFIC
+                and self.permissions[path] not in PUSH_PERMISSIONS
+            ):
+                continue
+            shared = self._shared_groups.get((path, group))
+            cached = self._groups[path].get(group)
+            if (
+                shared is not None
+                and now - shared[0] <= SHARED_GROUPS_TTL
+                and (cached is None or cached[0] < shared[0])
+            ):
+                self._set_group(path, group, shared[0], shared[1])
+                reused.add(group)
+        return groups - reused
+
+    def _prune_shared_groups(self, now: datetime) -> None:
+        """Forget the shared groups that are too old to be reused."""
+        for key in [
+            key
+            for key, (fetched, _) in self._shared_groups.items()
+            if now - fetched > SHARED_GROUPS_TTL
+        ]:
+            del self._shared_groups[key]
+
+    def _set_stale(self, path: str, groups: Iterable[str], now: datetime) -> None:
+        """Record groups of a repo that failed to refresh.
+
+        Only groups with a last good value to serve are stale, groups that were
+        never fetched are just retried.
+        """
+        cached = self._groups.get(path, {})
+        for group in groups:
+            if group in cached:
+                self._stale[path].setdefault(group, now)
+
+    @callback
+    def async_update_group(self, path: str, group: str, attrs: dict[str, Any]) -> None:
+        """Merge attributes pushed by a webhook into a group of a repo.
+
+        Only the sensor of that repo is notified, so an event costs the same no
+        matter how many repos are watched.
+        """
+        if group not in self._groups[path] or self.data is None:
+            # Wait for the group to be polled, the event only carries a change.
+            return
+        fetched, cached = self._groups[path][group]
+        self._groups[path][group] = (fetched, {**cached, **attrs})
+        self._record_activity(path, dt_util.utcnow(), {**cached, **attrs} != cached)
+        self.data[path] = self._snapshot(path)
+        self._async_save()
+        if (update_callback := self._path_listeners.get(path)) is not None:
+            update_callback()
+
+    @callback
+    def async_add_path_listener(
+        self, path: str, update_callback: CALLBACK_TYPE
+    ) -> CALLBACK_TYPE:
+        """Listen for the events pushed to a repo, returns a callback to stop."""
+        self._path_listeners[path] = update_callback
+
+        @callback
+        def remove_listener() -> None:
+            if self._path_listeners.get(path) is update_callback:
+                del self._path_listeners[path]
+
+        return remove_listener
+
+    def group_attrs(self, path: str, group: str) -> dict[str, Any]:
+        """Return the cached attributes of a group of a repo."""
+        if (cached := self._groups[path].get(group)) is None:
+            return {}
+        return cached[1]
+
+    async def _async_update_data(self) -> dict[str, RepoSnapshot]:
+        """Fetch the expired groups of all repos, one update at a time.
+
+        A refresh started while another one runs, e.g. by the refresh batch or
+        the options listener during a scheduled refresh, waits for it and then
+        fetches what is still expired.
+        """
+        async with self._update_lock:
+            return await self._async_update()
+
+    async def _async_update(self) -> dict[str, RepoSnapshot]:
+        """Fetch the expired groups of all repos.
+
+        Repos first move between the hot, warm and cold tiers from how often their
+        snapshot changed, which sets when their groups expire. When the event
+        feeds are polled, the groups changed by new events expire. Expired groups
+        another coordinator of the host fetched recently are reused. Groups whose
+        source has its breaker open for a repo are skipped until the backoff is
+        over. Repos that have the same groups expired are fetched together,
+        packed in GraphQL queries sized by what they select. Chunks are fetched
+        concurrently, the client's request queue bounds the number of requests
+        actually in flight. Groups that failed stay expired and are retried on the
+        next update. Once done, the interval until the next update is picked from
+        the requests this update cost, the budget left and when the next group
+        expires.
+        """
+        now = dt_util.utcnow()
+        self._update_tiers(now)
+        charged_before = self.github.requests_charged.copy()
+        priority, self._priority = self._priority, None
+        # Requests of this entry take turns with those of the other entries.
+        with request_context(priority, owner=self):
+            try:
+                if self.event_feeds is not None:
+                    await self._async_poll_events(now)
+                expired: dict[frozenset[str], list[str]] = defaultdict(list)
+                self._prune_shared_groups(now)
+                for path in self.paths:
+                    groups = self._expired_groups(path, now)
+                    if not (groups := self._reuse_shared_groups(path, groups, now)):
+                        continue
+                    blocked = {
+                        source
+                        for source in {source_of(group) for group in groups}
+                        if (breaker := self.breakers.get((path, source)))
+                        and not breaker.allow(now)
+                    }
+                    skipped = {group for group in groups if source_of(group) in blocked}
+                    self._set_stale(path, skipped, now)
+                    if groups := groups - skipped:
+                        expired[groups].append(path)
+                await asyncio.gather(
+                    *(
+                        self._async_fetch_chunk(chunk, groups, now)
+                        for groups, paths in expired.items()
+                        for chunk in chunked(paths, chunk_size(groups))
+                    )
+                )
+            finally:
+                self.cycle_cost = self.github.requests_charged - charged_before
+                self._update_tiers(now)
+                self._update_interval_from_rate_limits(self.cycle_cost)
+        data = {
+            path: self._snapshot(path)
+            for path in self.paths
+            if self._available(path, now)
+        }
+        if self.paths and not data:
+            raise UpdateFailed("Unable to retrieve any repository from GitHub")
+        self._async_save()
+        return data
+
+    async def async_fetch_repos(self, paths: list[str]) -> set[str]:
+        """Fetch every group but the traffic of `paths`, e.g. to validate them.
+
+        Chunks are fetched concurrently like in an update, the fetched groups are
+        kept for the snapshot. Returns the paths of the repos that could not be
+        fetched.
+        """
+        now = dt_util.utcnow()
+        groups = frozenset(GROUPS) - {GROUP_TRAFFIC}
+        failures = await asyncio.gather(
+            *(
+                self._async_fetch_chunk(chunk, groups, now)
+                for chunk in chunked(paths, chunk_size(groups))
+            )
+        )
+        return set().union(*failures)
+
+    def _update_interval_from_rate_limits(self, cycle_cost: dict[str, int]) -> None:
+        """Spread the remaining rate limit budget over the coming updates.
+
+        The next update doesn't happen before the next group expires, or the next
+        event feed is due.
+        """
+        now = dt_util.utcnow()
+        next_expiry = min(
+            (
+                expires - now
+                for path in self.paths
+                for group in GROUPS
+                if (expires := self._expires(path, group)) is not None
+            ),
+            default=SCAN_INTERVAL,
+        )
+        if self.event_feeds is not None and (paths := self._polled_paths()):
+            next_expiry = min(next_expiry, self.event_feeds.next_poll(paths, now) - now)
+        self.update_interval = max(
+            compute_update_interval(
+                self.github.rate_limits,
+                cycle_cost,
+                self.github.retry_after,
+                now,
+                next_expiry,
+            ),
+            next_expiry,
+            MIN_SCAN_INTERVAL,
+        )
+        _LOGGER.debug(
+            "Next update of %d repos in %s, cost %s",
+            len(self.paths),
+            self.update_interval,
+            dict(cycle_cost),
+        )
+
+    async def _async_fetch_chunk(
+        self, paths: list[str], groups: frozenset[str], now: datetime
+    ) -> set[str]:
+        """Fetch the expired groups of a chunk of repos.
+
+        Returns the paths of the repos that could not be fetched, the groups that
+        failed are recorded as stale. Failures of the host are recorded by the
+        breaker of the client and rate limits are waited out by the client, the
+        other failures are recorded by the breakers of the sources of the repos.
+        """
+        failed: set[str] = set()
+        if groups - {GROUP_TRAFFIC}:
+            query, variables = build_repositories_query(paths, groups)
+            errors: dict[str, str] = {}
+            rate_limited = False
+            try:
+                result = await self.github.graphql(query, **variables)
+            except gidgethub.QueryError as err:
+                # Missing or inaccessible repos are reported as errors alongside
+                # the data for the repos that could be resolved.
+                result = err.response.get("data") or {}
+                errors = {
+                    error["path"][0]: error["message"]
+                    for error in err.response.get("errors", [])
+                    if error.get("path")
+                }
+                # The repos that weren't returned because the budget ran out are
+                # not at fault.
+                rate_limited = is_rate_limit_error(err) or (
+                    isinstance(rate_limit := self.github.rate_limit, RateLimit)
+                    and rate_limit.remaining == 0
+                )
+                if rate_limited:
+                    _LOGGER.debug("Rate limited retrieving %s from GitHub", paths)
+            except (ClientError, gidgethub.GitHubException) as err:
+                if is_host_error(err) or is_rate_limit_error(err):
+                    _LOGGER.debug("Error retrieving %s from GitHub: %r", paths, err)
+                else:
+                    self._record_failures(paths, SOURCE_GRAPHQL, now, repr(err))
+                for path in paths:
+                    self._set_stale(path, groups, now)
+                return set(paths)
+
+            for index, path in enumerate(paths):
+                if (repository := result.get(f"repo{index}")) is None:
+                    failed.add(path)
+                    self._set_stale(path, groups, now)
+                    if rate_limited:
+                        continue
+                    self._record_failures(
+                        [path],
+                        SOURCE_GRAPHQL,
+                        now,
+                        errors.get(f"repo{index}", "Not returned"),
+                    )
+                    continue
+                self._record_success(path, SOURCE_GRAPHQL)
+                if "viewerPermission" in repository:
+                    self.permissions[path] = repository["viewerPermission"]
+                changed = False
+                for group, attrs in parse_repository(repository).items():
+                    if (cached := self._groups[path].get(group)) is not None:
+                        changed = changed or cached[1] != attrs
+                    self._set_group(path, group, now, attrs)
+                self._record_activity(path, now, changed)
+
+        if GROUP_TRAFFIC in groups:
+            traffic_paths = [
+                path
+                for path in paths
+                if path not in failed and self.permissions.get(path) in PUSH_PERMISSIONS
+            ]
+            traffic = await asyncio.gather(
+                *(self._async_fetch_traffic(path, now) for path in traffic_paths)
+            )
+            for path, attrs in zip(traffic_paths, traffic):
+                if attrs is None:
+                    failed.add(path)
+                    self._set_stale(path, [GROUP_TRAFFIC], now)
+                else:
+                    self._record_success(path, SOURCE_TRAFFIC)
+                    self._set_group(path, GROUP_TRAFFIC, now, attrs)
+        return failed
+
+    async def _async_fetch_traffic(
+        self, path: str, now: datetime
+    ) -> dict[str, Any] | None:
+        """Fetch the traffic of a repo, which is only available from the REST API.
+
+        The daily buckets are kept in the traffic history of the repo and the
+        days that are over are written to the long-term statistics.
+        """
+        try:
+            clones_data, views_data = await asyncio.gather(
+                self.github.getitem(f"/repos/{path}/traffic/clones"),
+                self.github.getitem(f"/repos/{path}/traffic/views"),
+            )
+        except (ClientError, gidgethub.GitHubException) as err:
+            if is_host_error(err) or is_rate_limit_error(err):
+                _LOGGER.debug("Error retrieving traffic of %s: %r", path, err)
+            else:
+                self._record_failures([path], SOURCE_TRAFFIC, now, repr(err))
+            return None
+        history = self.traffic_history.setdefault(path, TrafficHistory())
+        history.add(clones_data, views_data)
+        async_import_traffic(self.hass, path, history, dt_util.utcnow())
+        return {
+            ATTR_CLONES: clones_data["count"],
+            ATTR_CLONES_UNIQUE: clones_data["uniques"],
+            ATTR_VIEWS: views_data["count"],
+            ATTR_VIEWS_UNIQUE: views_data["uniques"],
+        }
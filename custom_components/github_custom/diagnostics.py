@@ -0,0 +1,87 @@
+"""Diagnostics support for the GitHub Custom integration."""
+from __future__ import annotations
+
+from collections import Counter
+from typing import Any
+
+from homeassistant import config_entries, core
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.const import CONF_ACCESS_TOKEN, CONF_WEBHOOK_ID
+import homeassistant.util.dt as dt_util
+
+from .client import token_label
+from .const import CONF_ACCESS_TOKENS, CONF_WEBHOOK_SECRET, DOMAIN
+from .coordinator import GitHubDataUpdateCoordinator
+
+TO_REDACT = {
+    CONF_ACCESS_TOKEN,
+    CONF_ACCESS_TOKENS,
+    CONF_WEBHOOK_ID,
+    CONF_WEBHOOK_SECRET,
+}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: core.HomeAssistant, entry: config_entries.ConfigEntry
+) -> dict[str, Any]:
+    """Return the state of the updates and the stats of the requests to GitHub."""
+    coordinator: GitHubDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id][
+        "coordinator"
+    ]
+    github = coordinator.github
+    now = dt_util.utcnow()
+    return {
+        "entry": {
+            "data": async_redact_data(entry.data, TO_REDACT),
+            "options": async_redact_data(entry.options, TO_REDACT),
+        },
+        "coordinator": {
+            "repos": len(coordinator.paths),
+            "repos_available": len(coordinator.data or {}),
+            "last_update_success": coordinator.last_update_success,
+            "update_interval": coordinator.update_interval.total_seconds(),
+            "cycle_cost": dict(coordinator.cycle_cost),
+            # Number of repos polled in each tier.
+            "tiers": dict(Counter(coordinator.tiers.values())),
+            # Number of repos serving each group from its last good value.
+            "stale_groups": dict(
+                Counter(
+                    group
+                    for snapshot in (coordinator.data or {}).values()
+                    for group in snapshot.stale_groups or {}
+                )
+            ),
+            # The breakers of the sources of the repos that failed.
+            "breakers": {
+                f"{path} {source}": breaker.as_dict(now)
+                for (path, source), breaker in sorted(coordinator.breakers.items())
+            },
+        },
+        "host_breaker": github.breaker.as_dict(now),
+        # Conditional requests answered from the cache of the token.
+        "cache": None if github.cache is None else github.cache.as_dict(),
+        # Requests in flight and waiting for the host, per priority.
+        "queue": github.queue.as_dict(),
+        "rate_limits": {
+            resource: {
+                "limit": rate_limit.limit,
+                "remaining": rate_limit.remaining,
+                "reset": rate_limit.reset_datetime.isoformat(),
+            }
+            for resource, rate_limit in github.rate_limits.items()
+        },
+        # The budget of each token of the pool, told apart by their last characters.
+        "tokens": {
+            token_label(token): {
+                resource: {
+                    "limit": rate_limit.limit,
+                    "remaining": rate_limit.remaining,
+                    "reset": rate_limit.reset_datetime.isoformat(),
+                }
+                for resource, rate_limit in rate_limits.items()
+            }
+            for token, rate_limits in github.token_rate_limits.items()
+        },
+        "retry_after": github.retry_after and github.retry_after.isoformat(),
+        "requests": github.stats.as_dict(),
+    }
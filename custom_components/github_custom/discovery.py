@@ -0,0 +1,137 @@
+"""Discovery of the repos of GitHub organizations and users."""
+from __future__ import annotations
+
+from collections.abc import AsyncIterator
+from datetime import datetime, timedelta
+import logging
+import re
+
+from aiohttp import ClientError
+import gidgethub
+from homeassistant import core
+from homeassistant.core import CALLBACK_TYPE, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.event import async_track_time_interval
+
+from .cache import CacheEntry
+from .client import GitHubClient
+from .const import SIGNAL_REPOS_ADDED
+from .coordinator import GitHubDataUpdateCoordinator
+from .sensor import async_remove_repo_entities
+
+_LOGGER = logging.getLogger(__name__)
+
+# Repos are rarely created or deleted, listing the repos of large organizations
+# takes a request per 100 repos.
+DISCOVERY_INTERVAL = timedelta(hours=1)
+# Endpoints listing the repos of each kind of owner, 100 per page being the most
+# GitHub returns.
+OWNER_URLS = {
+    "org": "/orgs/{}/repos?per_page=100",
+    "user": "/users/{}/repos?per_page=100",
+}
+
+
+def parse_owners(text: str) -> list[tuple[str, str]]:
+    """Parse the owners to discover the repos of, e.g. `org:esphome, user:octocat`.
+
+    Raises a ValueError if an owner isn't prefixed by `org:` or `user:`.
+    """
+    owners = []
+    for owner in re.split(r"[\s,]+", text):
+        if not owner:
+            continue
+        kind, _, name = owner.partition(":")
+        if kind not in OWNER_URLS or not name:
+            raise ValueError
+        owners.append((kind, name))
+    return owners
+
+
+async def async_iter_owner_repos(
+    github: GitHubClient, kind: str, name: str
+) -> AsyncIterator[str]:
+    """Yield the path of every repo of an owner.
+
+    Pages are requested one at a time following the `Link` header as they are
+    consumed, so only the paths are kept in memory.
+    """
+    async for repo in github.getiter(OWNER_URLS[kind].format(name)):
+        yield repo["full_name"]
+
+
+class RepoPagesCache(dict[str, CacheEntry]):
+    """Keeps the ETag and the repo paths of the pages listing the repos of owners.
+
+    Used as the cache of the client discovering repos, so pages that didn't
+    change are answered with a free `304 Not Modified` without the full bodies
+    of up to 100 repos each filling the cache shared with the coordinators.
+    """
+
+    def __setitem__(self, url: str, entry: CacheEntry) -> None:
+        etag, last_modified, data, more = entry
+        paths = [{"full_name": repo["full_name"]} for repo in data]
+        super().__setitem__(url, (etag, last_modified, paths, more))
+
+
+class RepoDiscovery:
+    """Watches every repo of some organizations and users.
+
+    The repos of the owners are listed on a slow interval and diffed against the
+    repos the coordinator watches. Sensors are added for new repos and removed
+    for repos that were deleted or transferred, without reloading the entry.
+    """
+
+    def __init__(
+        self,
+        hass: core.HomeAssistant,
+        entry_id: str,
+        coordinator: GitHubDataUpdateCoordinator,
+        owners: list[tuple[str, str]],
+    ) -> None:
+        self.hass = hass
+        self.entry_id = entry_id
+        self.coordinator = coordinator
+        self.owners = owners
+        self._github = coordinator.github.with_cache(RepoPagesCache())
+
+    @callback
+    def async_start(self) -> CALLBACK_TYPE:
+        """Discover repos now and then on an interval.
+
+        Returns a callback that stops discovering.
+        """
+        self.hass.async_create_task(self.async_discover())
+        return async_track_time_interval(
+            self.hass, self.async_discover, DISCOVERY_INTERVAL
+        )
+
+    async def async_discover(self, now: datetime | None = None) -> None:
+        """List the repos of every owner and watch the ones that changed."""
+        discovered: set[str] = set()
+        try:
+            for kind, name in self.owners:
+                async for path in async_iter_owner_repos(self._github, kind, name):
+                    discovered.add(path)
+        except (ClientError, gidgethub.GitHubException):
+            # Don't remove repos based on a partial listing.
+            _LOGGER.exception("Error discovering the repos of %s", self.owners)
+            return
+
+        removed = self.coordinator.discovered_paths - discovered
+        added = sorted(
+            path for path in discovered if self.coordinator.path_for(path) is None
+        )
+        if removed:
+            _LOGGER.debug("Repos no longer discovered: %s", sorted(removed))
+            self.coordinator.async_remove_paths(removed)
+            async_remove_repo_entities(self.hass, removed)
+        if added:
+            _LOGGER.debug("Discovered %d new repos", len(added))
+            self.coordinator.async_add_paths(added)
+            async_dispatcher_send(
+                self.hass,
+                SIGNAL_REPOS_ADDED.format(self.entry_id),
+                [{"path": path} for path in added],
+            )
+            await self.coordinator.async_request_refresh()
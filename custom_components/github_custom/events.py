@@ -0,0 +1,110 @@
+"""Delta polling of the events of the repos."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Iterable
+from datetime import datetime, timedelta
+import logging
+from typing import Any
+
+from aiohttp import ClientError
+import gidgethub
+
+from .client import GitHubClient
+from .const import GROUP_COMMITS, GROUP_ISSUES, GROUP_RELEASES, GROUP_REPO
+
+_LOGGER = logging.getLogger(__name__)
+
+# Groups of attributes changed by each type of event.
+EVENT_GROUPS = {
+    "ForkEvent": GROUP_REPO,
+    "IssuesEvent": GROUP_ISSUES,
+    "PublicEvent": GROUP_REPO,
+    "PullRequestEvent": GROUP_ISSUES,
+    "PushEvent": GROUP_COMMITS,
+    "ReleaseEvent": GROUP_RELEASES,
+    "WatchEvent": GROUP_REPO,
+}
+# Interval the feeds are polled at until GitHub sends an X-Poll-Interval.
+DEFAULT_POLL_INTERVAL = timedelta(seconds=60)
+# Events of a feed requested at once, more events than that between two polls
+# refetch every group.
+EVENTS_PER_PAGE = 30
+
+
+def events_url(path: str) -> str:
+    """Return the URL of the events of a repo."""
+    return f"/repos/{path}/events?per_page={EVENTS_PER_PAGE}"
+
+
+def groups_for(events: list[dict[str, Any]], last_id: int) -> set[str]:
+    """Return the groups changed by the events newer than `last_id`."""
+    new = [event for event in events if int(event["id"]) > last_id]
+    if len(new) == len(events) == EVENTS_PER_PAGE:
+        # Events may have been missed, refetch everything.
+        return set(EVENT_GROUPS.values())
+    return {
+        EVENT_GROUPS[event["type"]] for event in new if event["type"] in EVENT_GROUPS
+    }
+
+
+class EventFeeds:
+    """Polls the event feed of every repo for the groups that changed.
+
+    The feeds are requested with the ETag of the last response, GitHub answers a
+    feed without new events with a free `304 Not Modified`. Each feed is polled
+    no faster than the `X-Poll-Interval` GitHub asks for. Events newer than the
+    last one seen tell which groups of attributes have to be refetched.
+    """
+
+    def __init__(self, github: GitHubClient) -> None:
+        self.github = github
+        # Id of the newest event seen in the feed of each repo.
+        self.last_ids: dict[str, int] = {}
+        self._due: dict[str, datetime] = {}
+
+    def forget(self, path: str) -> None:
+        """Forget the feed of a repo that is no longer watched."""
+        self.last_ids.pop(path, None)
+        self._due.pop(path, None)
+
+    def next_poll(self, paths: Iterable[str], now: datetime) -> datetime:
+        """Return when the next feed of `paths` is due."""
+        return min((self._due.get(path, now) for path in paths), default=now)
+
+    async def async_poll(
+        self, paths: Iterable[str], now: datetime
+    ) -> dict[str, set[str]]:
+        """Poll the feeds that are due and return the groups changed per repo.
+
+        The first poll of a feed only records its newest event. Repos whose feed
+        couldn't be polled are left out.
+        """
+        due = [path for path in paths if self._due.get(path, now) <= now]
+        results = await asyncio.gather(
+            *(self._async_poll_feed(path, now) for path in due)
+        )
+        return {path: groups for path, groups in zip(due, results) if groups}
+
+    async def _async_poll_feed(self, path: str, now: datetime) -> set[str]:
+        """Poll the feed of a repo."""
+        url = events_url(path)
+        try:
+            events = await self.github.getitem(url)
+        except (ClientError, gidgethub.GitHubException) as err:
+            _LOGGER.debug("Error polling the events of %s: %s", path, err)
+            self._due[path] = now + DEFAULT_POLL_INTERVAL
+            return set()
+        interval = self.github.poll_intervals.get(url.split("?")[0])
+        self._due[path] = now + (
+            timedelta(seconds=interval) if interval else DEFAULT_POLL_INTERVAL
+        )
+        if not events:
+            self.last_ids.setdefault(path, 0)
+            return set()
+        newest = int(events[0]["id"])
+        if (last_id := self.last_ids.get(path)) is None:
+            self.last_ids[path] = newest
+            return set()
+        self.last_ids[path] = max(last_id, newest)
+        return groups_for(events, last_id)
@@ -0,0 +1,87 @@
+"""Models of the GitHub Custom integration."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.const import ATTR_NAME
+
+from .const import (
+    ATTR_CLONES,
+    ATTR_CLONES_UNIQUE,
+    ATTR_FORKS,
+    ATTR_LATEST_COMMIT_MESSAGE,
+    ATTR_LATEST_COMMIT_SHA,
+    ATTR_LATEST_OPEN_ISSUE_URL,
+    ATTR_LATEST_OPEN_PULL_REQUEST_URL,
+    ATTR_LATEST_RELEASE_TAG,
+    ATTR_LATEST_RELEASE_URL,
+    ATTR_OPEN_ISSUES,
+    ATTR_OPEN_PULL_REQUESTS,
+    ATTR_PATH,
+    ATTR_STALE_GROUPS,
+    ATTR_STARGAZERS,
+    ATTR_VIEWS,
+    ATTR_VIEWS_UNIQUE,
+)
+
+# Commit messages can be several KB long, only their start is kept.
+MAX_COMMIT_MESSAGE_LENGTH = 255
+
+
+class RepoSnapshot:
+    """The attributes of a repo, merged from all of its groups.
+
+    Thousands of snapshots can be kept in memory, slots keep each one compact.
+    Attributes that are not known yet are None. Groups that failed to refresh
+    and are served from their last good value are listed in `stale_groups` with
+    when that value was fetched. Snapshots compare equal when all
+    of their attributes do, so sensors can skip writing a state that didn't
+    change.
+    """
+
+    __slots__ = (
+        ATTR_PATH,
+        ATTR_FORKS,
+        ATTR_NAME,
+        ATTR_STARGAZERS,
+        ATTR_CLONES,
+        ATTR_CLONES_UNIQUE,
+        ATTR_VIEWS,
+        ATTR_VIEWS_UNIQUE,
+        ATTR_LATEST_COMMIT_MESSAGE,
+        ATTR_LATEST_COMMIT_SHA,
+        ATTR_OPEN_ISSUES,
+        ATTR_LATEST_OPEN_ISSUE_URL,
+        ATTR_OPEN_PULL_REQUESTS,
+        ATTR_LATEST_OPEN_PULL_REQUEST_URL,
+        ATTR_LATEST_RELEASE_TAG,
+        ATTR_LATEST_RELEASE_URL,
+        ATTR_STALE_GROUPS,
+    )
+
+    def __init__(self, path: str, **attrs: Any) -> None:
+        self.path = path
+        for attr in self.__slots__[1:]:
+            setattr(self, attr, attrs.get(attr))
+        if self.latest_commit_message is not None:
+            self.latest_commit_message = self.latest_commit_message[
+                :MAX_COMMIT_MESSAGE_LENGTH
+            ]
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, RepoSnapshot):
+            return NotImplemented
+        return all(
+            getattr(self, attr) == getattr(other, attr) for attr in self.__slots__
+        )
+
+    def __repr__(self) -> str:
+        return f"<RepoSnapshot {self.as_dict()}>"
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the attributes that are known."""
+        return {
+            attr: value
+            for attr in self.__slots__
+            if (value := getattr(self, attr)) is not None
+        }
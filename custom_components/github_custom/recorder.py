@@ -0,0 +1,30 @@
+"""Recorder platform of the GitHub Custom integration."""
+from __future__ import annotations
+
+from homeassistant import core
+from homeassistant.core import callback
+
+from .const import (
+    ATTR_CLONES,
+    ATTR_CLONES_UNIQUE,
+    ATTR_LATEST_COMMIT_MESSAGE,
+    ATTR_VIEWS,
+    ATTR_VIEWS_UNIQUE,
+)
+
+
+@callback
+def exclude_attributes(hass: core.HomeAssistant) -> set[str]:
+    """Return the attributes that are not recorded.
+
+    Commit messages are large and change with every commit, the sha already
+    records when the latest commit changed. The daily traffic is kept in the
+    long-term statistics instead of the 14 day totals.
+    """
+    return {
+        ATTR_CLONES,
+        ATTR_CLONES_UNIQUE,
+        ATTR_LATEST_COMMIT_MESSAGE,
+        ATTR_VIEWS,
+        ATTR_VIEWS_UNIQUE,
+    }
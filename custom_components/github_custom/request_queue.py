@@ -0,0 +1,157 @@
+"""Queue of the requests to a host, served by priority and fairly between entries."""
+from __future__ import annotations
+
+import asyncio
+from collections import Counter, OrderedDict, deque
+from collections.abc import Hashable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+import time
+from types import TracebackType
+from typing import Any
+
+# Priorities of the requests, lower is served first.
+PRIORITY_INTERACTIVE = 0
+PRIORITY_REFRESH = 1
+PRIORITY_POLL = 2
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_REFRESH: "refresh",
+    PRIORITY_POLL: "poll",
+}
+
+# The priority of the requests made in the current context and on behalf of whom,
+# e.g. the coordinator of a config entry. Tasks inherit them from where they were
+# created, so they reach the client through gidgethub.
+_PRIORITY: ContextVar[int] = ContextVar("github_custom_priority", default=PRIORITY_POLL)
+_OWNER: ContextVar[Hashable | None] = ContextVar("github_custom_owner", default=None)
+
+
+@contextmanager
+def request_context(
+    priority: int | None = None, owner: Hashable | None = None
+) -> Iterator[None]:
+    """Make the requests of the block with a priority or on behalf of an owner."""
+    tokens = []
+    if priority is not None:
+        tokens.append((_PRIORITY, _PRIORITY.set(priority)))
+    if owner is not None:
+        tokens.append((_OWNER, _OWNER.set(owner)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+class RequestQueue:
+    """Bounds the requests in flight to a host, like a semaphore.
+
+    Requests waiting for a slot are served by priority: interactive requests,
+    e.g. from the config flow, before refreshes asked for by the user, before
+    scheduled polls. Requests of the same priority are served round-robin
+    between their owners, so an entry polling thousands of repos doesn't hold
+    up the others. The priority and owner are taken from the context of the
+    request, see `request_context`.
+    """
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.in_flight = 0
+        # The waiters of every priority, per owner in round-robin order.
+        self._waiters: dict[int, OrderedDict[Hashable | None, deque[asyncio.Future]]]
+        self._waiters = {priority: OrderedDict() for priority in PRIORITY_NAMES}
+        self.max_depth = 0
+        self.served: Counter[int] = Counter()
+        self.wait_sums: Counter[int] = Counter()
+
+    @property
+    def depth(self) -> int:
+        """Return the number of requests waiting for a slot."""
+        return sum(
+            len(waiters)
+            for owners in self._waiters.values()
+            for waiters in owners.values()
+        )
+
+    async def acquire(self) -> None:
+        """Wait for a slot, in the order of the priority of the context."""
+        priority = _PRIORITY.get()
+        queued = time.monotonic()
+        if self.in_flight < self.limit and not self.depth:
+            self.in_flight += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            waiters = self._waiters[priority].setdefault(_OWNER.get(), deque())
+            waiters.append(future)
+            self.max_depth = max(self.max_depth, self.depth)
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.cancelled():
+                    self._remove(priority, future)
+                else:
+                    # The slot was handed over before the cancellation.
+                    self.release()
+                raise
+        self.served[priority] += 1
+        self.wait_sums[priority] += time.monotonic() - queued
+
+    def release(self) -> None:
+        """Free a slot and hand it over to the next waiter."""
+        self.in_flight -= 1
+        while self.in_flight < self.limit and (future := self._pop()) is not None:
+            future.set_result(None)
+            self.in_flight += 1
+
+    def _pop(self) -> asyncio.Future | None:
+        """Return the next waiter, rotating between the owners of a priority."""
+        for priority in sorted(self._waiters):
+            owners = self._waiters[priority]
+            while owners:
+                owner, waiters = next(iter(owners.items()))
+                future = waiters.popleft()
+                if waiters:
+                    owners.move_to_end(owner)
+                else:
+                    del owners[owner]
+                if not future.done():
+                    return future
+        return None
+
+    def _remove(self, priority: int, future: asyncio.Future) -> None:
+        """Remove a waiter that was cancelled."""
+        owners = self._waiters[priority]
+        for owner, waiters in list(owners.items()):
+            if future in waiters:
+                waiters.remove(future)
+                if not waiters:
+                    del owners[owner]
+                return
+
+    async def __aenter__(self) -> None:
+        await self.acquire()
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.release()
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the state of the queue in a form that can be serialized."""
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "priorities": {
+                name: {
+                    "requests": self.served[priority],
+                    "wait_sum": round(self.wait_sums[priority], 3),
+                }
+                for priority, name in PRIORITY_NAMES.items()
+            },
+        }
@@ -0,0 +1,109 @@
+"""Rate limit aware scheduling of GitHub updates."""
+from __future__ import annotations
+
+from collections.abc import Collection, Mapping
+from datetime import datetime, timedelta
+import math
+
+from gidgethub.sansio import RateLimit
+
+# Shortest interval polling speeds up to when there is plenty of budget left.
+MIN_SCAN_INTERVAL = timedelta(minutes=1)
+# Share of every budget kept in reserve for config flows and manual refreshes.
+RATE_LIMIT_RESERVE = 0.1
+
+# Polling tiers of the repos, from how often their snapshot changes.
+TIER_HOT = "hot"
+TIER_WARM = "warm"
+TIER_COLD = "cold"
+# Hot repos are refetched every minute and cold ones hourly, warm ones at the
+# configured intervals.
+HOT_TTL = MIN_SCAN_INTERVAL
+COLD_TTL = timedelta(hours=1)
+# Time constant the activity of a repo decays with, the activity is roughly the
+# number of changes over the last day.
+ACTIVITY_DECAY = timedelta(days=1)
+# Activity of a repo that was never seen changing, right between the tiers.
+INITIAL_ACTIVITY = 1.0
+# Repos changing about every two hours are hot, those that didn't change for
+# a couple of days are cold.
+HOT_ACTIVITY = 12.0
+COLD_ACTIVITY = 0.1
+# Most repos promoted to the hot tier by their activity, as many as fit a single
+# GraphQL query so hot polling costs at most one query a minute.
+MAX_HOT_REPOS = 100
+
+
+def compute_update_interval(
+    rate_limits: Mapping[str, RateLimit],
+    cycle_cost: Mapping[str, int],
+    retry_after: datetime | None,
+    now: datetime,
+    default: timedelta,
+) -> timedelta:
+    """Return the interval that spreads the remaining budget over its reset window.
+
+    `cycle_cost` is the number of requests an update cycle spent per rate limit
+    resource (core, graphql, search...). Every resource gets an interval that lets
+    the cycles evenly use up what is left of its budget until it resets, the
+    longest of those wins. When a budget can't afford another cycle the update
+    waits for it to reset, and a `Retry-After` from GitHub is always honoured.
+    """
+    if not cycle_cost:
+        return default
+    interval = MIN_SCAN_INTERVAL
+    for resource, cost in cycle_cost.items():
+        if (rate_limit := rate_limits.get(resource)) is None:
+            continue
+        window = max((rate_limit.reset_datetime - now).total_seconds(), 0)
+        budget = rate_limit.remaining - rate_limit.limit * RATE_LIMIT_RESERVE
+        if budget < cost:
+            resource_interval = timedelta(seconds=window)
+        else:
+            resource_interval = timedelta(seconds=window * cost / budget)
+        interval = max(interval, resource_interval)
+    if retry_after is not None:
+        interval = max(interval, retry_after - now)
+    return interval
+
+
+def decayed_activity(activity: float, updated: datetime, now: datetime) -> float:
+    """Return an activity recorded at `updated` decayed until `now`."""
+    elapsed = max((now - updated).total_seconds(), 0)
+    return activity * math.exp(-elapsed / ACTIVITY_DECAY.total_seconds())
+
+
+def assign_tiers(
+    activity: Mapping[str, float],
+    pinned: Collection[str],
+    max_hot: int = MAX_HOT_REPOS,
+) -> dict[str, str]:
+    """Return the polling tier of every repo from its decayed `activity`.
+
+    The `max_hot` most active repos above the hot threshold are hot, so is every
+    `pinned` repo. Repos below the cold threshold are cold, the others warm.
+    """
+    tiers = {
+        path: TIER_COLD if value < COLD_ACTIVITY else TIER_WARM
+        for path, value in activity.items()
+    }
+    busy = sorted(
+        (path for path, value in activity.items() if value >= HOT_ACTIVITY),
+        key=lambda path: activity[path],
+        reverse=True,
+    )
+    for path in busy[:max_hot]:
+        tiers[path] = TIER_HOT
+    for path in pinned:
+        if path in tiers:
+            tiers[path] = TIER_HOT
+    return tiers
+
+
+def tier_ttl(tier: str, ttl: timedelta) -> timedelta:
+    """Return the interval a group with a configured `ttl` is refetched at."""
+    if tier == TIER_HOT:
+        return min(ttl, HOT_TTL)
+    if tier == TIER_COLD:
+        return max(ttl, COLD_TTL)
+    return ttl
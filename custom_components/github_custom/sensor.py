@@ -1,58 +1,55 @@
 """GitHub sensor platform."""
 from __future__ import annotations
 
-from collections.abc import Callable
-from datetime import timedelta
+from collections.abc import Callable, Iterable
+from datetime import datetime
+import hashlib
+import json
 import logging
 from typing import Any
 
-from aiohttp import ClientError
-import gidgethub
-from gidgethub.aiohttp import GitHubAPI
 from homeassistant import config_entries, core
-from homeassistant.components.sensor import PLATFORM_SCHEMA
+from homeassistant.components.sensor import (
+    PLATFORM_SCHEMA,
+    SensorDeviceClass,
+    SensorEntity,
+    SensorStateClass,
+)
 from homeassistant.const import (
-    ATTR_NAME,
     CONF_ACCESS_TOKEN,
     CONF_NAME,
     CONF_PATH,
     CONF_URL,
+    EntityCategory,
+    Platform,
 )
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers import entity_registry as er
 import homeassistant.helpers.config_validation as cv
-from homeassistant.helpers.entity import Entity
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.typing import (
     ConfigType,
     DiscoveryInfoType,
 )
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
 import voluptuous as vol
 
-from .const import (
-    ATTR_CLONES,
-    ATTR_CLONES_UNIQUE,
-    ATTR_FORKS,
-    ATTR_LATEST_COMMIT_MESSAGE,
-    ATTR_LATEST_COMMIT_SHA,
-    ATTR_LATEST_OPEN_ISSUE_URL,
-    ATTR_LATEST_OPEN_PULL_REQUEST_URL,
-    ATTR_LATEST_RELEASE_TAG,
-    ATTR_LATEST_RELEASE_URL,
-    ATTR_OPEN_ISSUES,
-    ATTR_OPEN_PULL_REQUESTS,
-    ATTR_PATH,
-    ATTR_STARGAZERS,
-    ATTR_VIEWS,
-    ATTR_VIEWS_UNIQUE,
-    CONF_REPOS,
-    DOMAIN,
-)
+from .client import api_url, async_create_client, token_label
+from .const import ATTR_PATH, CONF_REPOS, DOMAIN, SIGNAL_REPOS_ADDED
+from .coordinator import STORAGE_VERSION, GitHubDataUpdateCoordinator
+from .models import RepoSnapshot
 
 _LOGGER = logging.getLogger(__name__)
-# Time between updating data from GitHub
-SCAN_INTERVAL = timedelta(minutes=10)
+# Rate limit resources the integration spends its budget on.
+RATE_LIMIT_RESOURCES = ("core", "graphql")
 
 REPO_SCHEMA = vol.Schema(
-    {vol.Required(CONF_PATH): cv.string, vol.Optional(CONF_NAME): cv.string}
+    {
+        vol.Required(CONF_PATH): vol.All(
+            cv.string, cv.matches_regex(r"^[^/\s]+/[^/\s]+$")
+        ),
+        vol.Optional(CONF_NAME): cv.string,
+    }
 )
 
 PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend(
@@ -71,13 +68,28 @@ async def async_setup_entry(
 ) -> None:
     """Setup sensors from a config entry created in the integrations UI."""
     config = hass.data[DOMAIN][config_entry.entry_id]
-    # Update our config to include new repos and remove those that have been removed.
-    if config_entry.options:
-        config.update(config_entry.options)
-    session = async_get_clientsession(hass)
-    github = GitHubAPI(session, "requester", oauth_token=config[CONF_ACCESS_TOKEN])
-    sensors = [GitHubRepoSensor(github, repo) for repo in config[CONF_REPOS]]
-    async_add_entities(sensors, update_before_add=True)
+    coordinator = config["coordinator"]
+    sensors = [GitHubRepoSensor(coordinator, repo) for repo in config[CONF_REPOS]]
+    sensors.extend(
+        GitHubRepoSensor(coordinator, {"path": path})
+        for path in sorted(coordinator.discovered_paths)
+    )
+    for resource in RATE_LIMIT_RESOURCES:
+        sensors.append(GitHubRateLimitSensor(coordinator, config_entry, resource))
+        sensors.append(GitHubRateLimitResetSensor(coordinator, config_entry, resource))
+    sensors.append(GitHubRequestsPerCycleSensor(coordinator, config_entry))
+    async_add_entities(sensors)
+
+    @core.callback
+    def async_add_repos(repos: list[dict[str, str]]) -> None:
+        """Add the sensors of repos added by the options or discovered."""
+        async_add_entities(GitHubRepoSensor(coordinator, repo) for repo in repos)
+
+    config_entry.async_on_unload(
+        async_dispatcher_connect(
+            hass, SIGNAL_REPOS_ADDED.format(config_entry.entry_id), async_add_repos
+        )
+    )
 
 
 async def async_setup_platform(
@@ -86,24 +98,65 @@ async def async_setup_platform(
     async_add_entities: Callable,
     discovery_info: DiscoveryInfoType | None = None,
 ) -> None:
-    """Set up the sensor platform."""
-    session = async_get_clientsession(hass)
-    github = GitHubAPI(session, "requester", oauth_token=config[CONF_ACCESS_TOKEN])
-    sensors = [GitHubRepoSensor(github, repo) for repo in config[CONF_REPOS]]
-    async_add_entities(sensors, update_before_add=True)
+    """Set up the sensor platform.
+
+    The sensors come up with the last snapshot of the same config, if any, and
+    are refreshed in the background.
+    """
+    github = async_create_client(
+        hass, config[CONF_ACCESS_TOKEN], base_url=api_url(config.get(CONF_URL))
+    )
+    coordinator = GitHubDataUpdateCoordinator(
+        hass, github, config[CONF_REPOS], store=_async_get_yaml_store(hass, config)
+    )
+    await coordinator.async_restore()
+    sensors = [GitHubRepoSensor(coordinator, repo) for repo in config[CONF_REPOS]]
+    async_add_entities(sensors)
+    hass.async_create_task(coordinator.async_refresh())
+
+
+@core.callback
+def _async_get_yaml_store(hass: core.HomeAssistant, config: ConfigType) -> Store:
+    """Return the store holding the snapshot of the repos of a yaml platform.
+
+    Platforms have no id, their store is keyed on a hash of their config.
+    """
+    key = json.dumps(
+        [
+            config.get(CONF_URL),
+            config[CONF_ACCESS_TOKEN],
+            sorted(repo[CONF_PATH] for repo in config[CONF_REPOS]),
+        ]
+    )
+    digest = hashlib.sha256(key.encode()).hexdigest()[:16]
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.yaml_{digest}")
+
+
+@core.callback
+def async_remove_repo_entities(hass: core.HomeAssistant, paths: Iterable[str]) -> None:
+    """Remove the sensors of repos that are no longer watched."""
+    registry = er.async_get(hass)
+    for path in paths:
+        if entity_id := registry.async_get_entity_id(Platform.SENSOR, DOMAIN, path):
+            registry.async_remove(entity_id)
 
 
-class GitHubRepoSensor(Entity):
-    """Representation of a GitHub Repo sensor."""
+class GitHubRepoSensor(CoordinatorEntity[GitHubDataUpdateCoordinator]):
+    """Representation of a GitHub Repo sensor.
 
-    def __init__(self, github: GitHubAPI, repo: dict[str, str]):
-        super().__init__()
-        self.github = github
+    The data of every repo is fetched by the shared coordinator, the sensor only
+    reads the snapshot of its own repo. The state is only written when that
+    snapshot or the availability changed, most updates leave most repos as they
+    were.
+    """
+
+    def __init__(
+        self, coordinator: GitHubDataUpdateCoordinator, repo: dict[str, str]
+    ) -> None:
+        super().__init__(coordinator)
         self.repo = repo["path"]
-        self.attrs: dict[str, Any] = {ATTR_PATH: self.repo}
         self._name = repo.get("name", self.repo)
-        self._state = None
-        self._available = True
+        self._written: tuple[RepoSnapshot | None, bool] | None = None
 
     @property
     def name(self) -> str:
@@ -118,75 +171,154 @@ class GitHubRepoSensor(Entity):
     @property
     def available(self) -> bool:
         """Return True if entity is available."""
-        return self._available
+        return super().available and self.snapshot is not None
+
+    @property
+    def snapshot(self) -> RepoSnapshot | None:
+        """Return the latest snapshot retrieved for this repo."""
+        return (self.coordinator.data or {}).get(self.repo)
 
     @property
     def state(self) -> str | None:
-        return self._state
+        # Set state to short commit sha.
+        if self.snapshot and (sha := self.snapshot.latest_commit_sha):
+            return sha[:7]
+        return None
 
     @property
     def extra_state_attributes(self) -> dict[str, Any]:
-        return self.attrs
-
-    async def async_update(self) -> None:
-        """Update all sensors."""
-        try:
-            repo_url = f"/repos/{self.repo}"
-            repo_data = await self.github.getitem(repo_url)
-            self.attrs[ATTR_FORKS] = repo_data["forks_count"]
-            self.attrs[ATTR_NAME] = repo_data["name"]
-            self.attrs[ATTR_STARGAZERS] = repo_data["stargazers_count"]
-
-            if repo_data["permissions"]["push"]:
-                clones_url = f"{repo_url}/traffic/clones"
-                clones_data = await self.github.getitem(clones_url)
-                self.attrs[ATTR_CLONES] = clones_data["count"]
-                self.attrs[ATTR_CLONES_UNIQUE] = clones_data["uniques"]
-
-                views_url = f"{repo_url}/traffic/views"
-                views_data = await self.github.getitem(views_url)
-                self.attrs[ATTR_VIEWS] = views_data["count"]
-                self.attrs[ATTR_VIEWS_UNIQUE] = views_data["uniques"]
-
-            commits_url = f"/repos/{self.repo}/commits"
-            commits_data = await self.github.getitem(commits_url)
-            latest_commit = commits_data[0]
-            self.attrs[ATTR_LATEST_COMMIT_MESSAGE] = latest_commit["commit"]["message"]
-            self.attrs[ATTR_LATEST_COMMIT_SHA] = latest_commit["sha"]
-
-            # Using the search api to fetch open PRs.
-            prs_url = f"/search/issues?q=repo:{self.repo}+state:open+is:pr"
-            prs_data = await self.github.getitem(prs_url)
-            self.attrs[ATTR_OPEN_PULL_REQUESTS] = prs_data["total_count"]
-            if prs_data and prs_data["items"]:
-                self.attrs[ATTR_LATEST_OPEN_PULL_REQUEST_URL] = prs_data["items"][0][
-                    "html_url"
-                ]
-
-            issues_url = f"/repos/{self.repo}/issues"
-            issues_data = await self.github.getitem(issues_url)
-            # GitHub issues include pull requests, so to just get the number of issues,
-            # we need to subtract the total number of pull requests from this total.
-            total_issues = repo_data["open_issues_count"]
-            self.attrs[ATTR_OPEN_ISSUES] = (
-                total_issues - self.attrs[ATTR_OPEN_PULL_REQUESTS]
-            )
-            if issues_data:
-                self.attrs[ATTR_LATEST_OPEN_ISSUE_URL] = issues_data[0]["html_url"]
-
-            releases_url = f"/repos/{self.repo}/releases"
-            releases_data = await self.github.getitem(releases_url)
-            if releases_data:
-                self.attrs[ATTR_LATEST_RELEASE_URL] = releases_data[0]["html_url"]
-                self.attrs[ATTR_LATEST_RELEASE_TAG] = releases_data[0][
-                    "html_url"
-                ].split("/")[-1]
-
-            # Set state to short commit sha.
-            self._state = latest_commit["sha"][:7]
-            self._available = True
-        except (ClientError, gidgethub.GitHubException):
-            self._available = False
-            _LOGGER.exception(
-                "Error retrieving data from GitHub for sensor %s", self.name
+        if self.snapshot is None:
+            return {ATTR_PATH: self.repo}
+        return self.snapshot.as_dict()
+
+    async def async_added_to_hass(self) -> None:
+        """Listen for the updates of every repo and the events of this one."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self.coordinator.async_add_path_listener(
+                self.repo, self._handle_coordinator_update
             )
+        )
+
+    @core.callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the state only if it changed since it was last written."""
+        if (self.snapshot, self.available) != self._written:
+            super()._handle_coordinator_update()
+
+    @core.callback
+    def async_write_ha_state(self) -> None:
+        """Write the state and remember what was written."""
+        self._written = (self.snapshot, self.available)
+        super().async_write_ha_state()
+
+
+class GitHubIntegrationSensor(
+    CoordinatorEntity[GitHubDataUpdateCoordinator], SensorEntity
+):
+    """Base of the sensors reporting on the integration rather than a repo."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    def __init__(
+        self,
+        coordinator: GitHubDataUpdateCoordinator,
+        config_entry: config_entries.ConfigEntry,
+        key: str,
+        name: str,
+    ) -> None:
+        super().__init__(coordinator)
+        self._attr_unique_id = f"{config_entry.entry_id}_{key}"
+        self._attr_name = f"{config_entry.title} {name}"
+
+
+class GitHubRateLimitSensor(GitHubIntegrationSensor):
+    """Requests left in the rate limit budget of a resource."""
+
+    _attr_native_unit_of_measurement = "requests"
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    def __init__(
+        self,
+        coordinator: GitHubDataUpdateCoordinator,
+        config_entry: config_entries.ConfigEntry,
+        resource: str,
+    ) -> None:
+        super().__init__(
+            coordinator,
+            config_entry,
+            f"rate_limit_{resource}_remaining",
+            f"{resource} rate limit remaining",
+        )
+        self.resource = resource
+
+    @property
+    def native_value(self) -> int | None:
+        if rate_limit := self.coordinator.github.rate_limits.get(self.resource):
+            return rate_limit.remaining
+        return None
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        github = self.coordinator.github
+        if rate_limit := github.rate_limits.get(self.resource):
+            return {
+                "limit": rate_limit.limit,
+                # Requests left to each token of the pool.
+                "tokens": {
+                    token_label(token): rate_limits[self.resource].remaining
+                    for token, rate_limits in github.token_rate_limits.items()
+                    if self.resource in rate_limits
+                },
+            }
+        return {}
+
+
+class GitHubRateLimitResetSensor(GitHubIntegrationSensor):
+    """When the rate limit budget of a resource resets."""
+
+    _attr_device_class = SensorDeviceClass.TIMESTAMP
+
+    def __init__(
+        self,
+        coordinator: GitHubDataUpdateCoordinator,
+        config_entry: config_entries.ConfigEntry,
+        resource: str,
+    ) -> None:
+        super().__init__(
+            coordinator,
+            config_entry,
+            f"rate_limit_{resource}_reset",
+            f"{resource} rate limit reset",
+        )
+        self.resource = resource
+
+    @property
+    def native_value(self) -> datetime | None:
+        if rate_limit := self.coordinator.github.rate_limits.get(self.resource):
+            return rate_limit.reset_datetime
+        return None
+
+
+class GitHubRequestsPerCycleSensor(GitHubIntegrationSensor):
+    """Requests charged by the last update, per resource in the attributes."""
+
+    _attr_native_unit_of_measurement = "requests"
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    def __init__(
+        self,
+        coordinator: GitHubDataUpdateCoordinator,
+        config_entry: config_entries.ConfigEntry,
+    ) -> None:
+        super().__init__(
+            coordinator, config_entry, "requests_per_cycle", "requests per cycle"
+        )
+
+    @property
+    def native_value(self) -> int:
+        return sum(self.coordinator.cycle_cost.values())
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        return dict(self.coordinator.cycle_cost)
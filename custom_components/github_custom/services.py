@@ -0,0 +1,80 @@
+"""Services of the GitHub Custom integration."""
+from __future__ import annotations
+
+import asyncio
+from collections import defaultdict
+
+from homeassistant import core
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.core import ServiceCall, callback
+from homeassistant.exceptions import HomeAssistantError
+import homeassistant.helpers.config_validation as cv
+import homeassistant.helpers.entity_registry as er
+import voluptuous as vol
+
+from .const import ATTR_GROUPS, ATTR_REPOSITORIES, DOMAIN, SERVICE_REFRESH
+from .coordinator import GROUPS, GitHubDataUpdateCoordinator
+
+REFRESH_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_ENTITY_ID): cv.entity_ids,
+        vol.Optional(ATTR_REPOSITORIES): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(ATTR_GROUPS, default=list(GROUPS)): vol.All(
+            cv.ensure_list, [vol.In(GROUPS)]
+        ),
+    }
+)
+
+
+@callback
+def async_setup_services(hass: core.HomeAssistant) -> None:
+    """Register the services of the integration."""
+
+    async def async_refresh(call: ServiceCall) -> None:
+        """Refetch groups of the repos of some sensors or paths, or of every repo.
+
+        The repos are refreshed by the coordinator of each config entry watching
+        them, calls made together are merged into a single refresh per entry.
+        Returns once the data landed.
+        """
+        coordinators: dict[str, GitHubDataUpdateCoordinator] = {
+            entry_id: entry_data["coordinator"]
+            for entry_id, entry_data in hass.data.get(DOMAIN, {}).items()
+            if "coordinator" in entry_data
+        }
+        targets: dict[str, set[str]] = defaultdict(set)
+        registry = er.async_get(hass)
+        for entity_id in call.data.get(ATTR_ENTITY_ID, []):
+            entry = registry.async_get(entity_id)
+            if (
+                entry is None
+                or (coordinator := coordinators.get(entry.config_entry_id or ""))
+                is None
+                or (path := coordinator.path_for(entry.unique_id)) is None
+            ):
+                raise HomeAssistantError(f"{entity_id} is not the sensor of a repo")
+            targets[entry.config_entry_id].add(path)
+        for repository in call.data.get(ATTR_REPOSITORIES, []):
+            watched = False
+            for entry_id, coordinator in coordinators.items():
+                if (path := coordinator.path_for(repository)) is not None:
+                    targets[entry_id].add(path)
+                    watched = True
+            if not watched:
+                raise HomeAssistantError(f"{repository} is not watched")
+        if ATTR_ENTITY_ID not in call.data and ATTR_REPOSITORIES not in call.data:
+            for entry_id, coordinator in coordinators.items():
+                targets[entry_id].update(coordinator.paths)
+
+        await asyncio.gather(
+            *(
+                coordinators[entry_id].async_refresh_groups(
+                    paths, call.data[ATTR_GROUPS]
+                )
+                for entry_id, paths in targets.items()
+            )
+        )
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_REFRESH, async_refresh, schema=REFRESH_SCHEMA
+    )
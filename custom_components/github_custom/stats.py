@@ -0,0 +1,126 @@
+"""Instrumentation of the requests made to GitHub."""
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections import defaultdict
+import re
+from typing import Any
+from urllib.parse import urlsplit
+
+from homeassistant import core
+from homeassistant.core import callback
+
+from .const import BASE_API_URL
+
+# Key in hass.data holding the stats shared by every client of a host.
+DATA_STATS = "github_custom_stats"
+# Upper bounds in seconds of the buckets of the latency histograms, the last
+# bucket counts the requests slower than all of them.
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Path segments replaced by a placeholder so the requests of every repo, owner
+# and page are counted against a single endpoint.
+ENDPOINT_PATTERNS = (
+    # The prefix of the GitHub Enterprise APIs.
+    (re.compile(r"^/api(/v3)?(?=/)"), ""),
+    (re.compile(r"^/repos/[^/]+/[^/]+"), "/repos/{owner}/{repo}"),
+    (re.compile(r"^/orgs/[^/]+"), "/orgs/{org}"),
+    (re.compile(r"^/users/[^/]+"), "/users/{user}"),
+)
+
+
+def endpoint_for(method: str, url: str) -> str:
+    """Return the endpoint a request was made to, e.g. `GET /repos/{owner}/{repo}`."""
+    path = urlsplit(url).path
+    for pattern, placeholder in ENDPOINT_PATTERNS:
+        path = pattern.sub(placeholder, path)
+    return f"{method} {path}"
+
+
+class EndpointStats:
+    """Counters and latency histogram of the requests made to an endpoint."""
+
+    def __init__(self) -> None:
+        self.requests = 0
+        # Requests that shared the response of an identical one in flight.
+        self.coalesced = 0
+        self.not_modified = 0
+        self.errors = 0
+        self.bytes_received = 0
+        self.latency_sum = 0.0
+        # Time spent waiting for a free slot of the shared request queue.
+        self.wait_sum = 0.0
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def record(
+        self, status: int | None, latency: float, wait: float, size: int
+    ) -> None:
+        """Record a request, `status` is None when no response was received."""
+        self.requests += 1
+        if status == 304:
+            self.not_modified += 1
+        elif status is None or status >= 400:
+            self.errors += 1
+        self.bytes_received += size
+        self.latency_sum += latency
+        self.wait_sum += wait
+        self.latency_buckets[bisect_left(LATENCY_BUCKETS, latency)] += 1
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the stats in a form that can be serialized to JSON."""
+        return {
+            "requests": self.requests,
+            "coalesced": self.coalesced,
+            "not_modified": self.not_modified,
+            "errors": self.errors,
+            "bytes_received": self.bytes_received,
+            "latency_sum": round(self.latency_sum, 3),
+            "wait_sum": round(self.wait_sum, 3),
+            "latency_histogram": {
+                **{
+                    f"le_{bound}": count
+                    for bound, count in zip(LATENCY_BUCKETS, self.latency_buckets)
+                },
+                "le_inf": self.latency_buckets[-1],
+            },
+        }
+
+
+class RequestStats:
+    """Stats of the requests made to GitHub per endpoint."""
+
+    def __init__(self) -> None:
+        self.endpoints: defaultdict[str, EndpointStats] = defaultdict(EndpointStats)
+
+    def record(
+        self,
+        method: str,
+        url: str,
+        status: int | None,
+        latency: float,
+        wait: float = 0.0,
+        size: int = 0,
+    ) -> None:
+        """Record a request made to `url`."""
+        self.endpoints[endpoint_for(method, url)].record(status, latency, wait, size)
+
+    def record_coalesced(self, method: str, url: str) -> None:
+        """Record a request to `url` that shared the response of another one."""
+        self.endpoints[endpoint_for(method, url)].coalesced += 1
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the stats of every endpoint."""
+        return {
+            endpoint: stats.as_dict()
+            for endpoint, stats in sorted(self.endpoints.items())
+        }
+
+
+@callback
+def async_get_stats(
+    hass: core.HomeAssistant, base_url: str = BASE_API_URL
+) -> RequestStats:
+    """Return the stats of the requests made by every client of a host."""
+    stats: dict[str, RequestStats] = hass.data.setdefault(DATA_STATS, {})
+    if base_url not in stats:
+        stats[base_url] = RequestStats()
+    return stats[base_url]
@@ -0,0 +1,172 @@
+"""Daily traffic history of the repos, imported as long-term statistics."""
+from __future__ import annotations
+
+from array import array
+from collections.abc import Iterator
+from datetime import datetime, timezone
+import hashlib
+from typing import Any
+
+from homeassistant import core
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import async_add_external_statistics
+from homeassistant.core import callback
+from homeassistant.util import slugify
+import homeassistant.util.dt as dt_util
+
+from .const import (
+    ATTR_CLONES,
+    ATTR_CLONES_UNIQUE,
+    ATTR_VIEWS,
+    ATTR_VIEWS_UNIQUE,
+    DOMAIN,
+)
+
+# Metrics of every day, in the order they are stored in the buffer.
+TRAFFIC_METRICS = (ATTR_VIEWS, ATTR_VIEWS_UNIQUE, ATTR_CLONES, ATTR_CLONES_UNIQUE)
+# GitHub returns the traffic of the last 14 days.
+TRAFFIC_DAYS = 14
+SECONDS_PER_DAY = 86400
+
+
+def day_of(timestamp: str) -> int:
+    """Return the day since the epoch of a bucket timestamp from GitHub."""
+    return int(dt_util.parse_datetime(timestamp).timestamp()) // SECONDS_PER_DAY
+
+
+def statistic_id(path: str, metric: str) -> str:
+    """Return the id of the statistic of a metric of a repo.
+
+    Slugs alone collide, e.g. `a/b-c` and `a-b/c`, a short hash of the path
+    tells those apart. Paths differing only in case are the same repo.
+    """
+    owner, _, name = path.partition("/")
+    digest = hashlib.sha256(path.lower().encode()).hexdigest()[:8]
+    return f"{DOMAIN}:{slugify(owner)}_{slugify(name)}_{digest}_{metric}"
+
+
+class TrafficHistory:
+    """Ring buffer of the daily traffic of a repo.
+
+    Each day takes one slot per metric of a flat array of unsigned ints, so the
+    buckets of hundreds of repos fit in a few kilobytes. Days older than the
+    buffer are dropped as new ones come in. `imported` is the last day written
+    to the long-term statistics and `sums` the running total of every metric up
+    to that day.
+    """
+
+    __slots__ = ("_buckets", "newest", "imported", "sums")
+
+    def __init__(self) -> None:
+        self._buckets = array("L", [0]) * (TRAFFIC_DAYS * len(TRAFFIC_METRICS))
+        # Day since the epoch of the newest bucket, None until one is recorded.
+        self.newest: int | None = None
+        self.imported: int | None = None
+        self.sums = [0] * len(TRAFFIC_METRICS)
+
+    def _slot(self, day: int, metric: int) -> int:
+        """Return the index of a metric of a day in the buffer."""
+        return (day % TRAFFIC_DAYS) * len(TRAFFIC_METRICS) + metric
+
+    def record(self, day: int, metric: str, count: int) -> None:
+        """Record the count of a metric on a day."""
+        if self.newest is None or day > self.newest:
+            # Clear the slots of the days the buffer moves past.
+            start = day - TRAFFIC_DAYS if self.newest is None else self.newest
+            for cleared in range(max(start, day - TRAFFIC_DAYS) + 1, day + 1):
+                for index in range(len(TRAFFIC_METRICS)):
+                    self._buckets[self._slot(cleared, index)] = 0
+            self.newest = day
+        elif day <= self.newest - TRAFFIC_DAYS:
+            return
+        self._buckets[self._slot(day, TRAFFIC_METRICS.index(metric))] = count
+
+    def add(self, clones: dict[str, Any], views: dict[str, Any]) -> None:
+        """Record the daily buckets of the traffic endpoints of GitHub."""
+        for data, key, count, unique in (
+            (views, "views", ATTR_VIEWS, ATTR_VIEWS_UNIQUE),
+            (clones, "clones", ATTR_CLONES, ATTR_CLONES_UNIQUE),
+        ):
+            for bucket in data.get(key, []):
+                day = day_of(bucket["timestamp"])
+                self.record(day, count, bucket["count"])
+                self.record(day, unique, bucket["uniques"])
+
+    def days(self) -> Iterator[tuple[int, tuple[int, ...]]]:
+        """Yield every day in the buffer with its metrics, oldest first."""
+        if self.newest is None:
+            return
+        for day in range(self.newest - TRAFFIC_DAYS + 1, self.newest + 1):
+            slot = self._slot(day, 0)
+            yield day, tuple(self._buckets[slot : slot + len(TRAFFIC_METRICS)])
+
+    def pop_completed(
+        self, today: int
+    ) -> list[tuple[int, tuple[int, ...], tuple[int, ...]]]:
+        """Return the completed days that were not imported yet.
+
+        Each day comes with its metrics and the running sums up to that day.
+        Today's buckets still change, they are only returned once the day is
+        over. The days are marked as imported.
+        """
+        completed = []
+        for day, counts in self.days():
+            if day >= today or (self.imported is not None and day <= self.imported):
+                continue
+            self.sums = [total + count for total, count in zip(self.sums, counts)]
+            self.imported = day
+            completed.append((day, counts, tuple(self.sums)))
+        return completed
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the history in a form that can be saved to the store."""
+        return {
+            "newest": self.newest,
+            "buckets": self._buckets.tolist(),
+            "imported": self.imported,
+            "sums": self.sums,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> TrafficHistory:
+        """Return a history saved to the store."""
+        history = cls()
+        history.newest = data["newest"]
+        history._buckets = array("L", data["buckets"])
+        history.imported = data["imported"]
+        history.sums = data["sums"]
+        return history
+
+
+@callback
+def async_import_traffic(
+    hass: core.HomeAssistant, path: str, history: TrafficHistory, now: datetime
+) -> None:
+    """Write the completed days of a repo to the long-term statistics.
+
+    Every metric is a statistic with the count of each day as its state and the
+    running total as its sum. Each day is only written once.
+    """
+    if "recorder" not in hass.config.components:
+        return
+    completed = history.pop_completed(int(now.timestamp()) // SECONDS_PER_DAY)
+    if not completed:
+        return
+    statistics: list[list[StatisticData]] = [[] for _ in TRAFFIC_METRICS]
+    for day, counts, sums in completed:
+        start = datetime.fromtimestamp(day * SECONDS_PER_DAY, timezone.utc)
+        for index, (count, total) in enumerate(zip(counts, sums)):
+            statistics[index].append(StatisticData(start=start, state=count, sum=total))
+    for index, metric in enumerate(TRAFFIC_METRICS):
+        async_add_external_statistics(
+            hass,
+            StatisticMetaData(
+                has_mean=False,
+                has_sum=True,
+                name=f"{path} {metric.replace('_', ' ')}",
+                source=DOMAIN,
+                statistic_id=statistic_id(path, metric),
+                unit_of_measurement=None,
+            ),
+            statistics[index],
+        )
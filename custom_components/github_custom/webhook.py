@@ -0,0 +1,290 @@
+"""Webhook push mode for the GitHub Custom integration."""
+from __future__ import annotations
+
+from functools import partial
+from http import HTTPStatus
+import logging
+from typing import Any
+
+from aiohttp import ClientError
+from aiohttp.web import Request, Response
+import gidgethub
+from gidgethub import routing, sansio
+from homeassistant import core
+from homeassistant.components import webhook
+from homeassistant.const import ATTR_NAME
+from homeassistant.core import CALLBACK_TYPE, callback
+from homeassistant.helpers.network import NoURLAvailableError
+
+from .client import GitHubClient
+from .const import (
+    ATTR_FORKS,
+    ATTR_LATEST_COMMIT_MESSAGE,
+    ATTR_LATEST_COMMIT_SHA,
+    ATTR_LATEST_OPEN_ISSUE_URL,
+    ATTR_LATEST_OPEN_PULL_REQUEST_URL,
+    ATTR_LATEST_RELEASE_TAG,
+    ATTR_LATEST_RELEASE_URL,
+    ATTR_OPEN_ISSUES,
+    ATTR_OPEN_PULL_REQUESTS,
+    ATTR_STARGAZERS,
+    DOMAIN,
+    GROUP_COMMITS,
+    GROUP_ISSUES,
+    GROUP_RELEASES,
+    GROUP_REPO,
+)
+from .coordinator import GitHubDataUpdateCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+# Events the webhooks created on GitHub subscribe to.
+WEBHOOK_EVENTS = ["fork", "issues", "pull_request", "push", "release", "star"]
+
+router = routing.Router()
+
+
+def _admin_paths(permissions: dict[str, str]) -> list[str]:
+    """Return the repos the token can create webhooks on."""
+    return [path for path, permission in permissions.items() if permission == "ADMIN"]
+
+
+def _count(
+    coordinator: GitHubDataUpdateCoordinator, path: str, attr: str, delta: int
+) -> int | None:
+    """Return a cached open count of a repo changed by `delta`."""
+    if (count := coordinator.group_attrs(path, GROUP_ISSUES).get(attr)) is None:
+        return None
+    return max(count + delta, 0)
+
+
+@router.register("push")
+async def push_event(
+    event: sansio.Event, coordinator: GitHubDataUpdateCoordinator, path: str
+) -> None:
+    """Update the latest commit when the default branch is pushed to."""
+    default_branch = f"refs/heads/{event.data['repository']['default_branch']}"
+    if event.data["ref"] != default_branch or not event.data.get("head_commit"):
+        return
+    coordinator.async_update_group(
+        path,
+        GROUP_COMMITS,
+        {
+            ATTR_LATEST_COMMIT_MESSAGE: event.data["head_commit"]["message"],
+            ATTR_LATEST_COMMIT_SHA: event.data["head_commit"]["id"],
+        },
+    )
+
+
+@router.register("issues", action="opened")
+@router.register("pull_request", action="opened")
+async def opened_event(
+    event: sansio.Event, coordinator: GitHubDataUpdateCoordinator, path: str
+) -> None:
+    """Count a newly opened issue or pull request and make it the latest one."""
+    if event.event == "issues":
+        count_attr, url_attr = ATTR_OPEN_ISSUES, ATTR_LATEST_OPEN_ISSUE_URL
+        url = event.data["issue"]["html_url"]
+    else:
+        count_attr, url_attr = (
+            ATTR_OPEN_PULL_REQUESTS,
+            ATTR_LATEST_OPEN_PULL_REQUEST_URL,
+        )
+        url = event.data["pull_request"]["html_url"]
+    attrs: dict[str, Any] = {url_attr: url}
+    if (count := _count(coordinator, path, count_attr, 1)) is not None:
+        attrs[count_attr] = count
+    coordinator.async_update_group(path, GROUP_ISSUES, attrs)
+
+
+@router.register("issues", action="reopened")
+@router.register("issues", action="closed")
+@router.register("pull_request", action="reopened")
+@router.register("pull_request", action="closed")
+async def state_changed_event(
+    event: sansio.Event, coordinator: GitHubDataUpdateCoordinator, path: str
+) -> None:
+    """Count an issue or pull request that was closed or reopened."""
+    count_attr = (
+        ATTR_OPEN_ISSUES if event.event == "issues" else ATTR_OPEN_PULL_REQUESTS
+    )
+    delta = 1 if event.data["action"] == "reopened" else -1
+    if (count := _count(coordinator, path, count_attr, delta)) is not None:
+        coordinator.async_update_group(path, GROUP_ISSUES, {count_attr: count})
+
+
+@router.register("release", action="published")
+async def release_event(
+    event: sansio.Event, coordinator: GitHubDataUpdateCoordinator, path: str
+) -> None:
+    """Make a newly published release the latest one."""
+    coordinator.async_update_group(
+        path,
+        GROUP_RELEASES,
+        {
+            ATTR_LATEST_RELEASE_URL: event.data["release"]["html_url"],
+            ATTR_LATEST_RELEASE_TAG: event.data["release"]["tag_name"],
+        },
+    )
+
+
+@router.register("fork")
+@router.register("star")
+async def repository_event(
+    event: sansio.Event, coordinator: GitHubDataUpdateCoordinator, path: str
+) -> None:
+    """Update the stars and forks, both are included in the repository."""
+    repository = event.data["repository"]
+    coordinator.async_update_group(
+        path,
+        GROUP_REPO,
+        {
+            ATTR_FORKS: repository["forks_count"],
+            ATTR_NAME: repository["name"],
+            ATTR_STARGAZERS: repository["stargazers_count"],
+        },
+    )
+
+
+async def async_handle_webhook(
+    coordinator: GitHubDataUpdateCoordinator,
+    secret: str,
+    hass: core.HomeAssistant,
+    webhook_id: str,
+    request: Request,
+) -> Response:
+    """Verify the signature of an event and apply it to its repo."""
+    body = await request.read()
+    try:
+        event = sansio.Event.from_http(request.headers, body, secret=secret)
+    except gidgethub.ValidationFailure:
+        _LOGGER.warning("Received a GitHub event with an invalid signature")
+        return Response(status=HTTPStatus.UNAUTHORIZED)
+    except gidgethub.BadRequest as err:
+        return Response(status=err.status_code)
+
+    full_name = event.data.get("repository", {}).get("full_name", "")
+    if (path := coordinator.path_for(full_name)) is None:
+        # Ping events and events of repos that aren't watched.
+        return Response(status=HTTPStatus.OK)
+    coordinator.pushed_paths.add(path)
+    await router.dispatch(event, coordinator, path)
+    return Response(status=HTTPStatus.OK)
+
+
+@callback
+def async_setup_webhook(
+    hass: core.HomeAssistant,
+    coordinator: GitHubDataUpdateCoordinator,
+    webhook_id: str,
+    secret: str,
+) -> CALLBACK_TYPE:
+    """Register the webhook receiving the events of a config entry.
+
+    Webhooks are created on GitHub in the background for every repo the token
+    is an admin of, and for the repos added later, e.g. in the options or by
+    discovery, once an update fetched their permission. Returns a callback
+    unregistering the webhook.
+    """
+    webhook.async_register(
+        hass,
+        DOMAIN,
+        "GitHub Custom",
+        webhook_id,
+        partial(async_handle_webhook, coordinator, secret),
+    )
+    created: set[str] = set()
+
+    @callback
+    def async_create_new_webhooks() -> None:
+        """Create webhooks on the admin repos that don't have one yet."""
+        # Repos that are removed and added again are checked again.
+        created.intersection_update(coordinator.permissions)
+        if paths := [
+            path
+            for path in _admin_paths(coordinator.permissions)
+            if path not in created
+        ]:
+            created.update(paths)
+            hass.async_create_task(
+                async_create_github_webhooks(
+                    hass, coordinator, webhook_id, secret, paths
+                )
+            )
+
+    async_create_new_webhooks()
+    unsub_listener = coordinator.async_add_listener(async_create_new_webhooks)
+
+    @callback
+    def async_unregister() -> None:
+        """Stop creating webhooks and unregister the webhook."""
+        unsub_listener()
+        webhook.async_unregister(hass, webhook_id)
+
+    return async_unregister
+
+
+async def async_create_github_webhooks(
+    hass: core.HomeAssistant,
+    coordinator: GitHubDataUpdateCoordinator,
+    webhook_id: str,
+    secret: str,
+    paths: list[str],
+) -> None:
+    """Create a webhook on repos the token is an admin of, unless they have one."""
+    try:
+        url = webhook.async_generate_url(hass, webhook_id)
+    except NoURLAvailableError:
+        _LOGGER.warning(
+            "Unable to create GitHub webhooks, Home Assistant has no external URL"
+        )
+        return
+    for path in paths:
+        try:
+            async for hook in coordinator.github.getiter(
+                f"/repos/{path}/hooks?per_page=100"
+            ):
+                if hook["config"].get("url") == url:
+                    break
+            else:
+                await coordinator.github.post(
+                    f"/repos/{path}/hooks",
+                    data={
+                        "name": "web",
+                        "active": True,
+                        "events": WEBHOOK_EVENTS,
+                        "config": {
+                            "url": url,
+                            "content_type": "json",
+                            "secret": secret,
+                        },
+                    },
+                )
+        except (ClientError, gidgethub.GitHubException):
+            _LOGGER.exception("Error creating GitHub webhook for %s", path)
+            continue
+        coordinator.pushed_paths.add(path)
+
+
+async def async_delete_github_webhooks(
+    hass: core.HomeAssistant,
+    github: GitHubClient,
+    permissions: dict[str, str],
+    webhook_id: str,
+) -> None:
+    """Delete the webhooks created on GitHub, e.g. when push mode is turned off."""
+    try:
+        url = webhook.async_generate_url(hass, webhook_id)
+    except NoURLAvailableError:
+        _LOGGER.warning(
+            "Unable to delete GitHub webhooks, Home Assistant has no external URL"
+        )
+        return
+    for path in _admin_paths(permissions):
+        try:
+            async for hook in github.getiter(f"/repos/{path}/hooks?per_page=100"):
+                if hook["config"].get("url") == url:
+                    await github.delete(f"/repos/{path}/hooks/{hook['id']}")
+                    break
+        except (ClientError, gidgethub.GitHubException):
+            _LOGGER.exception("Error deleting GitHub webhook for %s", path)
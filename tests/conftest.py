@@ -1,4 +1,7 @@
 """pytest fixtures."""
+from collections import Counter
+from unittest.mock import MagicMock
+
 import pytest
 
 
@@ -6,3 +9,61 @@ import pytest
 def auto_enable_custom_integrations(enable_custom_integrations):
     """Enable custom integrations defined in the test dir."""
     yield
+
+
+@pytest.fixture
+def mock_client():
+    """Return a factory of mocked GitHubClients that haven't made a request yet."""
+
+    def factory(mock_class=MagicMock):
+        github = mock_class()
+        github.rate_limits = {}
+        github.requests_charged = Counter()
+        github.retry_after = None
+        github.poll_intervals = {}
+        return github
+
+    return factory
+
+
+@pytest.fixture
+def repository_result():
+    """Return a factory of GraphQL results selecting every group of a repo."""
+
+    def factory(
+        *,
+        name="Home Assistant",
+        permission="WRITE",
+        forks=1000,
+        stars=9000,
+        sha="e751664d95917dbdb856c382bfe2f4655e2a83c1",
+        message="Did a thing.",
+        issues=4655,
+        pull_requests=345,
+    ):
+        url = "https://github.com/homeassistant/core"
+        return {
+            "name": name,
+            "forkCount": forks,
+            "stargazerCount": stars,
+            "viewerPermission": permission,
+            "defaultBranchRef": {"target": {"oid": sha, "message": message}},
+            "issues": {
+                "totalCount": issues,
+                "nodes": [{"url": f"{url}/issues/1"}],
+            },
+            "pullRequests": {
+                "totalCount": pull_requests,
+                "nodes": [{"url": f"{url}/pull/1347"}],
+            },
+            "releases": {
+                "nodes": [
+                    {
+                        "tagName": "v0.1.112",
+                        "url": f"{url}/releases/v0.1.112",
+                    }
+                ]
+            },
+        }
+
+    return factory
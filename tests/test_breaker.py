@@ -0,0 +1,115 @@
+"""Tests for the breaker module."""
+import asyncio
+from datetime import timedelta
+from http import HTTPStatus
+from unittest.mock import patch
+
+import aiohttp
+import gidgethub
+import homeassistant.util.dt as dt_util
+
+from custom_components.github_custom.breaker import (
+    BASE_BACKOFF,
+    MAX_BACKOFF,
+    PROBE_TIMEOUT,
+    STATE_CLOSED,
+    STATE_HALF_OPEN,
+    STATE_OPEN,
+    CircuitBreaker,
+    is_host_error,
+    is_rate_limit_error,
+)
+
+
+def test_is_host_error():
+    """Test connection and server errors are blamed on the host."""
+    assert is_host_error(aiohttp.ClientConnectionError())
+    assert is_host_error(asyncio.TimeoutError())
+    assert is_host_error(gidgethub.BadRequest(HTTPStatus.BAD_GATEWAY))
+    assert not is_host_error(gidgethub.BadRequest(HTTPStatus.NOT_FOUND))
+    assert not is_host_error(gidgethub.GitHubException())
+
+
+def test_is_rate_limit_error():
+    """Test primary and secondary rate limits are told apart from other errors."""
+    assert is_rate_limit_error(gidgethub.RateLimitExceeded(None))
+    assert is_rate_limit_error(
+        gidgethub.BadRequest(
+            HTTPStatus.FORBIDDEN, "You have exceeded a secondary rate limit."
+        )
+    )
+    assert is_rate_limit_error(
+        gidgethub.BadRequest(HTTPStatus.TOO_MANY_REQUESTS, "API rate limit exceeded")
+    )
+    assert not is_rate_limit_error(
+        gidgethub.BadRequest(HTTPStatus.FORBIDDEN, "Must have push access")
+    )
+    assert not is_rate_limit_error(gidgethub.BadRequest(HTTPStatus.NOT_FOUND))
+    # Secondary limits of the GraphQL API are 4XX, primary limits are errors.
+    assert is_rate_limit_error(
+        gidgethub.BadGraphQLRequest(
+            HTTPStatus.FORBIDDEN,
+            {"message": "You have exceeded a secondary rate limit."},
+        )
+    )
+    assert is_rate_limit_error(
+        gidgethub.QueryError(
+            {"data": None, "errors": [{"type": "RATE_LIMITED", "message": "Out"}]}
+        )
+    )
+    assert not is_rate_limit_error(
+        gidgethub.QueryError(
+            {"data": {}, "errors": [{"type": "NOT_FOUND", "message": "Missing"}]}
+        )
+    )
+
+
+def test_circuit_breaker_opens_and_backs_off():
+    """Test the breaker opens after consecutive failures, backing off longer."""
+    now = dt_util.utcnow()
+    breaker = CircuitBreaker(threshold=2)
+    with patch("random.random", return_value=0):
+        assert breaker.record_failure(now, "Not found")
+        assert STATE_CLOSED == breaker.state(now)
+        assert breaker.allow(now)
+        # The same error again is not worth logging.
+        assert not breaker.record_failure(now, "Not found")
+        assert 2 == breaker.repeated
+        assert STATE_OPEN == breaker.state(now)
+        assert now + BASE_BACKOFF == breaker.opened_until
+        assert not breaker.allow(now)
+
+        # Once the backoff is over a single probe is let through.
+        now += BASE_BACKOFF
+        assert STATE_HALF_OPEN == breaker.state(now)
+        assert breaker.allow(now)
+        assert not breaker.allow(now)
+        # A probe that never reported back doesn't block the next one forever.
+        assert breaker.allow(now + PROBE_TIMEOUT)
+
+        assert breaker.record_failure(now, "Forbidden")
+        assert now + 2 * BASE_BACKOFF == breaker.opened_until
+        for _ in range(20):
+            breaker.record_failure(now, "Forbidden")
+        assert now + MAX_BACKOFF == breaker.opened_until
+
+    assert {
+        "state": STATE_OPEN,
+        "failures": 23,
+        "opened_until": (now + MAX_BACKOFF).isoformat(),
+        "last_error": "Forbidden",
+        "repeated": 21,
+    } == breaker.as_dict(now)
+    assert 23 == breaker.record_success()
+    assert STATE_CLOSED == breaker.state(now)
+    assert 0 == breaker.record_success()
+
+
+def test_circuit_breaker_jitter():
+    """Test up to a fifth of the backoff is added at random."""
+    now = dt_util.utcnow()
+    breaker = CircuitBreaker(threshold=1)
+    with patch("random.random", return_value=1):
+        breaker.record_failure(now, "error")
+    assert now + BASE_BACKOFF * 1.2 == breaker.opened_until
+    assert timedelta(0) < breaker.opened_until - now
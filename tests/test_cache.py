@@ -0,0 +1,63 @@
+"""Tests for the cache module."""
+from custom_components.github_custom.cache import GitHubCache, async_get_cache
+
+
+def test_cache_counts_hits_and_misses():
+    """Test lookups are counted and a changed response counts as a miss."""
+    cache = GitHubCache()
+    try:
+        cache["/repos/a/b"]
+    except KeyError:
+        pass
+    cache["/repos/a/b"] = ('"etag"', None, {"id": 1}, None)
+    assert ('"etag"', None, {"id": 1}, None) == cache["/repos/a/b"]
+    assert (1, 1) == (cache.hits, cache.misses)
+    assert 0.5 == cache.hit_ratio
+
+    # The lookup sent an ETag but GitHub returned a new body.
+    cache["/repos/a/b"]
+    cache["/repos/a/b"] = ('"etag2"', None, {"id": 2}, None)
+    assert (1, 2) == (cache.hits, cache.misses)
+    assert "/repos/a/b" in cache
+    assert (1, 2) == (cache.hits, cache.misses)
+
+
+def test_cache_evicts_least_recently_used():
+    """Test the least recently used URL is evicted once the cache is full."""
+    cache = GitHubCache(maxsize=2)
+    cache["a"] = (None, None, 1, None)
+    cache["b"] = (None, None, 2, None)
+    cache["a"]
+    cache["c"] = (None, None, 3, None)
+    assert ["a", "c"] == list(cache)
+    assert 2 == len(cache)
+    del cache["a"]
+    assert ["c"] == list(cache)
+    assert 0.0 == GitHubCache().hit_ratio
+
+
+def test_cache_sized_by_reservations():
+    """Test the cache grows with the URLs reserved by its users."""
+    cache = GitHubCache(maxsize=1)
+    cache.reserve("entry", 2)
+    cache.reserve("other", 1)
+    for url in "abcd":
+        cache[url] = (None, None, url, None)
+    assert ["a", "b", "c", "d"] == list(cache)
+
+    cache.reserve("entry", 0)
+    assert 2 == cache.maxsize
+    assert ["c", "d"] == list(cache)
+    assert {
+        "size": 2,
+        "maxsize": 2,
+        "hits": 0,
+        "misses": 0,
+        "hit_ratio": 0.0,
+    } == cache.as_dict()
+
+
+def test_async_get_cache_shared_per_token(hass):
+    """Test clients using the same token share a cache."""
+    assert async_get_cache(hass, "token") is async_get_cache(hass, "token")
+    assert async_get_cache(hass, "token") is not async_get_cache(hass, "other")
@@ -0,0 +1,398 @@
+"""Tests for the client module."""
+import asyncio
+from datetime import timedelta
+import time
+from unittest.mock import patch
+
+import aiohttp
+import homeassistant.util.dt as dt_util
+import pytest
+
+from custom_components.github_custom.breaker import FAILURE_THRESHOLD
+from custom_components.github_custom.client import (
+    DATA_MAX_CONCURRENT_REQUESTS,
+    GitHubClient,
+    HostUnavailableError,
+    api_url,
+    async_create_client,
+    async_get_queue,
+    async_get_session,
+    is_read_only,
+    resource_for,
+    token_label,
+)
+from custom_components.github_custom.stats import async_get_stats
+
+ENTERPRISE_URL = "https://ghe.example.com/api/v3"
+
+
+@pytest.mark.asyncio
+async def test_client_limits_requests_in_flight(hass):
+    """Test requests wait for the shared request queue."""
+    in_flight = 0
+    peak = 0
+
+    async def request(self, method, url, headers, body=b""):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0)
+        in_flight -= 1
+        return 200, {}, b""
+
+    hass.data[DATA_MAX_CONCURRENT_REQUESTS] = 2
+    client = async_create_client(hass, "token")
+    with patch("gidgethub.aiohttp.GitHubAPI._request", request):
+        await asyncio.gather(
+            *(client._request("GET", f"/repos/a/{i}", {}) for i in range(5))
+        )
+    assert 2 == peak
+    assert isinstance(client, GitHubClient)
+    assert "token" == client.oauth_token
+
+
+@pytest.mark.asyncio
+async def test_async_get_queue_per_host(hass):
+    """Test each host has a request queue of its own."""
+    queue = async_get_queue(hass)
+    assert queue is async_get_queue(hass, "https://api.github.com")
+    assert queue is not async_get_queue(hass, ENTERPRISE_URL)
+
+
+@pytest.mark.asyncio
+async def test_async_get_session_per_host(hass):
+    """Test each host has a session and connection pool of its own."""
+    hass.data[DATA_MAX_CONCURRENT_REQUESTS] = 4
+    session = async_get_session(hass)
+    assert session is async_get_session(hass)
+    assert session is not async_get_session(hass, ENTERPRISE_URL)
+    assert 4 == session.connector.limit
+    assert not session.closed
+
+    # The sessions are closed with Home Assistant.
+    await hass.async_stop(force=True)
+    assert session.closed
+
+
+@pytest.mark.parametrize(
+    "url,expected",
+    [
+        (None, "https://api.github.com"),
+        ("https://github.com", "https://api.github.com"),
+        ("https://api.github.com/", "https://api.github.com"),
+        ("https://ghe.example.com", ENTERPRISE_URL),
+        ("https://ghe.example.com/api/v3/", ENTERPRISE_URL),
+    ],
+)
+def test_api_url(url, expected):
+    """Test the API URL of github.com and GitHub Enterprise hosts."""
+    assert expected == api_url(url)
+
+
+@pytest.mark.asyncio
+async def test_client_queries_graphql_of_host(hass):
+    """Test GraphQL queries are sent to the endpoint of the host."""
+    urls = []
+
+    async def request(self, method, url, headers, body=b""):
+        urls.append(url)
+        return 200, {"content-type": "application/json"}, b'{"data": {}}'
+
+    with patch("gidgethub.aiohttp.GitHubAPI._request", request):
+        await async_create_client(hass, "token").graphql("query { viewer }")
+        await async_create_client(hass, "token", base_url=ENTERPRISE_URL).graphql(
+            "query { viewer }"
+        )
+    assert [
+        "https://api.github.com/graphql",
+        "https://ghe.example.com/api/graphql",
+    ] == urls
+
+
+@pytest.mark.asyncio
+async def test_client_records_rate_limits(hass):
+    """Test rate limits are recorded per resource and 304s are not charged."""
+    responses = [
+        (
+            200,
+            {
+                "x-ratelimit-limit": "5000",
+                "x-ratelimit-remaining": "4999",
+                "x-ratelimit-reset": "1700000000",
+                "x-ratelimit-resource": "graphql",
+            },
+            b"",
+        ),
+        (304, {}, b""),
+    ]
+
+    async def request(self, method, url, headers, body=b""):
+        return responses.pop(0)
+
+    client = async_create_client(hass, "token")
+    with patch("gidgethub.aiohttp.GitHubAPI._request", request):
+        await client._request("POST", "/graphql", {})
+        await client._request("GET", "/repos/a/b", {})
+    assert 4999 == client.rate_limits["graphql"].remaining
+    assert {"graphql": 1} == client.requests_charged
+    assert client.retry_after is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "status,headers,body,delay",
+    [
+        (429, {"retry-after": "30"}, b"", timedelta(seconds=30)),
+        (403, {}, b"You have exceeded a secondary rate limit", timedelta(minutes=1)),
+        (
+            403,
+            {
+                "x-ratelimit-limit": "5000",
+                "x-ratelimit-remaining": "0",
+                "x-ratelimit-reset": str(int(time.time()) + 600),
+            },
+            b"",
+            timedelta(minutes=10),
+        ),
+        (403, {}, b"Resource not accessible by integration", None),
+    ],
+)
+async def test_client_records_retry_after(hass, status, headers, body, delay):
+    """Test the client records until when GitHub asked to back off."""
+
+    async def request(self, method, url, headers_, body_=b""):
+        return status, headers, body
+
+    client = async_create_client(hass, "token")
+    with patch("gidgethub.aiohttp.GitHubAPI._request", request):
+        await client._request("GET", "/repos/a/b", {})
+    if delay is None:
+        assert client.retry_after is None
+    elif "x-ratelimit-reset" in headers:
+        # Blocked until the reset GitHub sent, however long ago it was computed.
+        assert int(headers["x-ratelimit-reset"]) == client.retry_after.timestamp()
+    else:
+        expected = dt_util.utcnow() + delay
+        assert abs((expected - client.retry_after).total_seconds()) < 2
+
+
+@pytest.mark.asyncio
+async def test_client_records_stats(hass):
+    """Test requests are recorded to the shared stats, failed ones included."""
+    responses = [(200, {}, b"{}"), aiohttp.ClientError()]
+
+    async def request(self, method, url, headers, body=b""):
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    client = async_create_client(hass, "token")
+    assert client.stats is async_get_stats(hass)
+    with patch("gidgethub.aiohttp.GitHubAPI._request", request):
+        await client._request("GET", "/repos/a/b", {})
+        with pytest.raises(aiohttp.ClientError):
+            await client._request("GET", "/repos/c/d", {})
+    stats = client.stats.as_dict()["GET /repos/{owner}/{repo}"]
+    assert 2 == stats["requests"]
+    assert 1 == stats["errors"]
+    assert 2 == stats["bytes_received"]
+
+
+def rate_limit_headers(remaining, reset=None):
+    """Return the rate limit headers of a GraphQL response."""
+    return {
+        "x-ratelimit-limit": "5000",
+        "x-ratelimit-remaining": str(remaining),
+        "x-ratelimit-reset": str(reset or int(time.time()) + 600),
+        "x-ratelimit-resource": "graphql",
+    }
+
+
+@pytest.mark.asyncio
+async def test_client_spreads_requests_over_tokens(hass):
+    """Test requests are sent with the token that has the most budget left."""
+    remaining = {"token-a": 10, "token-b": 20}
+    sent = []
+
+    async def request(self, method, url, headers, body=b""):
+        token = headers["authorization"].removeprefix("token ")
+        sent.append(token)
+        remaining[token] -= 1
+        return 200, rate_limit_headers(remaining[token]), b""
+
+    client = async_create_client(hass, "token-a", ["token-b", "token-a"])
+    assert ["token-a", "token-b"] == client.tokens
+    with patch("gidgethub.aiohttp.GitHubAPI._request", request):
+        for _ in range(14):
+            await client._request("POST", "/graphql", {"authorization": "x"})
+    # Both tokens are tried once, then token-b is used until it catches up.
+    assert ["token-a", "token-b"] + ["token-b"] * 10 == sent[:12]
+    assert {"token-a": 8, "token-b": 8} == remaining
+    assert 16 == client.rate_limits["graphql"].remaining
+    assert 10000 == client.rate_limits["graphql"].limit
+    assert 8 == client.token_rate_limits["token-a"]["graphql"].remaining
+
+
+@pytest.mark.asyncio
+async def test_client_rotates_exhausted_tokens(hass):
+    """Test a token out of budget is left out until every token is."""
+    reset = int(time.time()) + 600
+    sent = []
+
+    async def request(self, method, url, headers, body=b""):
+        sent.append(headers["authorization"])
+        return 403, rate_limit_headers(0, reset), b""
+
+    client = async_create_client(hass, "token-a", ["token-b"])
+    with patch("gidgethub.aiohttp.GitHubAPI._request", request):
+        await client._request("POST", "/graphql", {})
+        assert client.retry_after is None
+        await client._request("POST", "/graphql", {})
+    assert ["token token-a", "token token-b"] == sent
+    assert reset == client.retry_after.timestamp()
+    # Other resources are not affected.
+    assert "token-a" == client._pick_token("core")
+
+
+def test_resource_for():
+    """Test requests are charged against the budget of their API."""
+    assert "graphql" == resource_for("https://api.github.com/graphql")
+    assert "search" == resource_for("/search/issues?q=repo:a/b")
+    assert "core" == resource_for("/repos/a/b")
+
+
+def test_token_label():
+    """Test tokens are labelled by their last characters."""
+    assert "…1234" == token_label("ghp_abcd1234")
+
+
+@pytest.mark.asyncio
+async def test_async_create_client_shares_clients(hass):
+    """Test the same tokens get the same client."""
+    client = async_create_client(hass, "token")
+    assert client is async_create_client(hass, "token", ["token"])
+    assert client is not async_create_client(hass, "token", ["other"])
+    enterprise = async_create_client(hass, "token", base_url=ENTERPRISE_URL)
+    assert client is not enterprise
+    # Hosts don't share their stats and rate limits.
+    assert client.stats is not enterprise.stats
+    assert enterprise.stats is async_get_stats(hass, ENTERPRISE_URL)
+
+
+@pytest.mark.asyncio
+async def test_client_with_cache(hass):
+    """Test a client with its own cache shares the rest with the original."""
+    client = async_create_client(hass, "token")
+    other = client.with_cache({})
+    assert {} == other._cache
+    assert client.cache is not None
+    assert other.cache is None
+    assert other.queue is client.queue
+    assert other.requests_charged is client.requests_charged
+    assert other.token_rate_limits is client.token_rate_limits
+
+
+@pytest.mark.asyncio
+async def test_client_coalesces_identical_requests(hass):
+    """Test identical requests in flight share a single round-trip."""
+    sent = []
+    release = asyncio.Event()
+
+    async def request(self, method, url, headers, body=b""):
+        sent.append((method, url))
+        await release.wait()
+        return 200, {}, b"{}"
+
+    client = async_create_client(hass, "token")
+    query = b'{"query": "query { viewer { login } }"}'
+    with patch("gidgethub.aiohttp.GitHubAPI._request", request):
+        requests = asyncio.gather(
+            client._request("GET", "/repos/a/b", {}),
+            client._request("GET", "/repos/a/b", {}),
+            client._request("GET", "/repos/a/b", {"if-none-match": "etag"}),
+            client._request("POST", "/graphql", {}, query),
+            client._request("POST", "/graphql", {}, query),
+            client._request("POST", "/repos/a/b/hooks", {}, b"{}"),
+            client._request("POST", "/repos/a/b/hooks", {}, b"{}"),
+        )
+        await asyncio.sleep(0)
+        release.set()
+        responses = await requests
+    assert 5 == len(sent)
+    assert all(response[0] == 200 for response in responses)
+    stats = client.stats.as_dict()
+    assert 2 == stats["GET /repos/{owner}/{repo}"]["requests"]
+    assert 1 == stats["GET /repos/{owner}/{repo}"]["coalesced"]
+    assert 1 == stats["POST /graphql"]["coalesced"]
+    assert 0 == stats["POST /repos/{owner}/{repo}/hooks"]["coalesced"]
+
+    # Once answered, the same request is sent again.
+    with patch("gidgethub.aiohttp.GitHubAPI._request", request):
+        await client._request("GET", "/repos/a/b", {})
+    assert 6 == len(sent)
+
+
+@pytest.mark.parametrize(
+    "method,url,body,expected",
+    [
+        ("GET", "/repos/a/b", b"", True),
+        ("POST", "/graphql", b'{"query": "query { viewer { login } }"}', True),
+        ("POST", "/graphql", b'{"query": " mutation { addStar }"}', False),
+        ("POST", "/repos/a/b/hooks", b"{}", False),
+        ("PATCH", "/repos/a/b", b"{}", False),
+    ],
+)
+def test_is_read_only(method, url, body, expected):
+    """Test only requests without side effects are coalesced."""
+    assert expected == is_read_only(method, url, body)
+
+
+@pytest.mark.asyncio
+async def test_client_records_poll_interval(hass):
+    """Test the poll interval GitHub asks for is kept per path of the host."""
+
+    async def request(self, method, url, headers, body=b""):
+        return 200, {"x-poll-interval": "90"}, b""
+
+    with patch("gidgethub.aiohttp.GitHubAPI._request", request):
+        client = async_create_client(hass, "token", base_url=ENTERPRISE_URL)
+        await client._request(
+            "GET", f"{ENTERPRISE_URL}/repos/a/b/events?per_page=30", {}
+        )
+    assert {"/repos/a/b/events": 90} == client.poll_intervals
+
+
+@pytest.mark.asyncio
+async def test_client_breaker_fails_fast(hass, caplog):
+    """Test requests fail fast once the host keeps failing, errors logged once."""
+    statuses = [502] * FAILURE_THRESHOLD
+
+    async def request(self, method, url, headers, body=b""):
+        if not statuses:
+            raise aiohttp.ClientConnectionError
+        return statuses.pop(), {}, b""
+
+    client = async_create_client(hass, "token")
+    with patch("gidgethub.aiohttp.GitHubAPI._request", request):
+        for index in range(FAILURE_THRESHOLD):
+            await client._request("GET", f"/repos/a/{index}", {})
+        with pytest.raises(HostUnavailableError):
+            await client._request("GET", "/repos/a/b", {})
+    assert 1 == caplog.text.count("Error requesting https://api.github.com: 502")
+    assert client.breaker is async_create_client(hass, "other").breaker
+
+    # Once the backoff is over a probe is let through.
+    client.breaker.opened_until = dt_util.utcnow()
+    with patch("gidgethub.aiohttp.GitHubAPI._request", request):
+        with pytest.raises(aiohttp.ClientConnectionError):
+            await client._request("GET", "/repos/a/b", {})
+        with pytest.raises(HostUnavailableError):
+            await client._request("GET", "/repos/a/b", {})
+
+    client.breaker.opened_until = dt_util.utcnow()
+    statuses.append(200)
+    with patch("gidgethub.aiohttp.GitHubAPI._request", request):
+        await client._request("GET", "/repos/a/b", {})
+    assert client.breaker.failures == 0
+    assert "available again after 4 failures" in caplog.text
@@ -1,18 +1,24 @@
 """Tests for the config flow."""
+from http import HTTPStatus
 from unittest import mock
 from unittest.mock import AsyncMock, patch
 
-from gidgethub import BadRequest
+from gidgethub import BadRequest, QueryError
 from homeassistant.const import CONF_ACCESS_TOKEN, CONF_NAME, CONF_PATH
+from homeassistant.helpers import entity_registry as er
 import pytest
 from pytest_homeassistant_custom_component.common import MockConfigEntry
 
 from custom_components.github_custom import config_flow
 from custom_components.github_custom.const import CONF_REPOS, DOMAIN
+from custom_components.github_custom.coordinator import (
+    DATA_SEEDS,
+    GitHubDataUpdateCoordinator,
+)
 
 
 @pytest.mark.asyncio
-@patch("custom_components.github_custom.config_flow.GitHubAPI")
+@patch("custom_components.github_custom.config_flow.async_create_client")
 async def test_validate_path_valid(m_github, hass):
     """Test no exception is raised for a valid path."""
     m_instance = AsyncMock()
@@ -30,7 +36,7 @@ async def test_validate_path_invalid(hass):
 
 
 @pytest.mark.asyncio
-@patch("custom_components.github_custom.config_flow.GitHubAPI")
+@patch("custom_components.github_custom.config_flow.async_create_client")
 async def test_validate_auth_valid(m_github, hass):
     """Test no exception is raised for valid auth."""
     m_instance = AsyncMock()
@@ -40,7 +46,19 @@ async def test_validate_auth_valid(m_github, hass):
 
 
 @pytest.mark.asyncio
-@patch("custom_components.github_custom.config_flow.GitHubAPI")
+@patch("custom_components.github_custom.config_flow.async_create_client")
+async def test_validate_auth_enterprise(m_github, hass):
+    """Test tokens of GitHub Enterprise hosts are validated against their API."""
+    m_instance = AsyncMock(base_url="https://ghe.example.com/api/v3")
+    m_instance.getitem = AsyncMock()
+    m_github.return_value = m_instance
+    await config_flow.validate_auth("token", hass, "https://ghe.example.com")
+    assert "https://ghe.example.com/api/v3" == m_github.call_args.kwargs["base_url"]
+    m_instance.getitem.assert_awaited_once_with("user")
+
+
+@pytest.mark.asyncio
+@patch("custom_components.github_custom.config_flow.async_create_client")
 async def test_validate_auth_invalid(m_github, hass):
     """Test ValueError is raised when auth is invalid."""
     m_instance = AsyncMock()
@@ -93,8 +111,9 @@ async def test_flow_user_init_data_valid(m_validate_auth, hass):
     result = await hass.config_entries.flow.async_configure(
         _result["flow_id"], user_input={CONF_ACCESS_TOKEN: "bad"}
     )
-    assert "repo" == result["step_id"]
-    assert "form" == result["type"]
+    assert "repos" == result["step_id"]
+    assert "menu" == result["type"]
+    assert ["repo", "bulk"] == result["menu_options"]
 
 
 @pytest.mark.asyncio
@@ -132,7 +151,7 @@ async def test_flow_repo_path_invalid(hass):
 
 
 @pytest.mark.asyncio
-@patch("custom_components.github_custom.config_flow.GitHubAPI")
+@patch("custom_components.github_custom.config_flow.async_create_client")
 async def test_flow_repo_add_another(github, hass):
     """Test we show the repo flow again if the add_another box was checked."""
     instance = AsyncMock()
@@ -155,7 +174,7 @@ async def test_flow_repo_add_another(github, hass):
 
 
 @pytest.mark.asyncio
-@patch("custom_components.github_custom.config_flow.GitHubAPI")
+@patch("custom_components.github_custom.config_flow.async_create_client")
 async def test_flow_repo_creates_config_entry(m_github, hass):
     """Test the config entry is successfully created."""
     m_instance = AsyncMock()
@@ -171,10 +190,10 @@ async def test_flow_repo_creates_config_entry(m_github, hass):
         )
         await hass.async_block_till_done()
 
-    result = await hass.config_entries.flow.async_configure(
-        _result["flow_id"],
-        user_input={CONF_PATH: "home-assistant/core"},
-    )
+        result = await hass.config_entries.flow.async_configure(
+            _result["flow_id"],
+            user_input={CONF_PATH: "home-assistant/core"},
+        )
     expected = {
         "context": {"source": "repo"},
         "version": 1,
@@ -196,12 +215,130 @@ async def test_flow_repo_creates_config_entry(m_github, hass):
     assert expected == result
 
 
+def test_parse_list():
+    """Test a pasted list of paths is split and deduplicated."""
+    text = "home-assistant/core\n home-assistant/frontend, esphome/*\n\nesphome/*"
+    assert ["home-assistant/core", "home-assistant/frontend", "esphome/*"] == (
+        config_flow.parse_list(text)
+    )
+
+
+@pytest.fixture
+def bulk_client(mock_client, repository_result):
+    """Return a mocked GitHub client for validating a list of repos.
+
+    The `esphome` organization has two repos, `missing/repo` doesn't exist.
+    """
+
+    async def getiter(url):
+        if not url.startswith("/orgs/esphome/"):
+            raise BadRequest(HTTPStatus.NOT_FOUND)
+        for name in ("esphome", "esphome-docs"):
+            yield {"name": name, "full_name": f"esphome/{name}"}
+
+    async def graphql(query, **variables):
+        result = {
+            f"repo{index}": repository_result(
+                name=variables[f"name{index}"], permission="READ"
+            )
+            for index in range(len(variables) // 2)
+            if variables[f"owner{index}"] != "missing"
+        }
+        if len(result) < len(variables) // 2:
+            raise QueryError({"data": result, "errors": [{"message": "Not found"}]})
+        return result
+
+    github = mock_client()
+    github.getiter = getiter
+    github.graphql = AsyncMock(side_effect=graphql)
+    return github
+
+
+@pytest.mark.asyncio
+async def test_validate_paths(hass, bulk_client):
+    """Test globs are expanded and invalid paths and globs reported in one pass."""
+    coordinator = GitHubDataUpdateCoordinator(hass, bulk_client, [])
+    valid, invalid = await config_flow.validate_paths(
+        [
+            "home-assistant",
+            "home-assistant/core",
+            "esphome/esphome*",
+            "nobody/*",
+            "missing/repo",
+            "esphome/esphome",
+        ],
+        coordinator,
+    )
+    assert ["home-assistant/core", "esphome/esphome", "esphome/esphome-docs"] == valid
+    assert ["home-assistant", "nobody/*", "missing/repo"] == invalid
+    assert set(valid) == set(coordinator.stored_data()["groups"])
+
+
 @pytest.mark.asyncio
-@patch("custom_components.github_custom.sensor.GitHubAPI")
-async def test_options_flow_init(m_github, hass):
+async def test_flow_bulk_invalid_paths(hass, bulk_client):
+    """Test errors list every invalid path."""
+    config_flow.GithubCustomConfigFlow.data = {
+        CONF_ACCESS_TOKEN: "token",
+        CONF_REPOS: [],
+    }
+    with patch(
+        "custom_components.github_custom.config_flow.async_create_client",
+        return_value=bulk_client,
+    ):
+        _result = await hass.config_entries.flow.async_init(
+            config_flow.DOMAIN, context={"source": "bulk"}
+        )
+        result = await hass.config_entries.flow.async_configure(
+            _result["flow_id"],
+            user_input={CONF_REPOS: "home-assistant/core\nmissing/repo\nnobody/*"},
+        )
+    assert "form" == result["type"]
+    assert {"base": "invalid_paths"} == result["errors"]
+    assert "nobody/*, missing/repo" == result["description_placeholders"]["paths"]
+
+
+@pytest.mark.asyncio
+async def test_flow_bulk_creates_config_entry(hass, bulk_client):
+    """Test the config entry is created and set up from the validated repos."""
+    config_flow.GithubCustomConfigFlow.data = {
+        CONF_ACCESS_TOKEN: "token",
+        CONF_REPOS: [],
+    }
+    with patch(
+        "custom_components.github_custom.config_flow.async_create_client",
+        return_value=bulk_client,
+    ), patch(
+        "custom_components.github_custom.async_create_client", return_value=bulk_client
+    ):
+        _result = await hass.config_entries.flow.async_init(
+            config_flow.DOMAIN, context={"source": "bulk"}
+        )
+        result = await hass.config_entries.flow.async_configure(
+            _result["flow_id"],
+            user_input={CONF_REPOS: "home-assistant/core, esphome/*"},
+        )
+        await hass.async_block_till_done()
+    assert "create_entry" == result["type"]
+    assert [
+        {"path": "home-assistant/core", "name": "home-assistant/core"},
+        {"path": "esphome/esphome", "name": "esphome/esphome"},
+        {"path": "esphome/esphome-docs", "name": "esphome/esphome-docs"},
+    ] == result["data"][CONF_REPOS]
+    # The sensors are set up from the validation without querying again.
+    assert 1 == bulk_client.graphql.await_count
+    assert "core" == hass.states.get("sensor.home_assistant_core").attributes["name"]
+    assert {} == hass.data[DATA_SEEDS]
+    assert await hass.config_entries.async_unload(result["result"].entry_id)
+
+
+@pytest.mark.asyncio
+@patch("custom_components.github_custom.async_create_client")
+async def test_options_flow_init(m_github, hass, mock_client, repository_result):
     """Test config flow options."""
-    m_instance = AsyncMock()
-    m_instance.getitem = AsyncMock()
+    m_instance = mock_client(AsyncMock)
+    m_instance.graphql = AsyncMock(
+        return_value={"repo0": repository_result(name="core", permission="READ")}
+    )
     m_github.return_value = m_instance
 
     config_entry = MockConfigEntry(
@@ -225,3 +362,263 @@ async def test_options_flow_init(m_github, hass):
     assert {"sensor.ha_core": "HA Core"} == result["data_schema"].schema[
         "repos"
     ].options
+    # Repos can be pinned to the hot tier by path.
+    assert {"home-assistant/core": "HA Core"} == result["data_schema"].schema[
+        "hot_repositories"
+    ].options
+
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"],
+        user_input={
+            "repos": ["sensor.ha_core"],
+            "hot_repositories": ["home-assistant/core"],
+        },
+    )
+    await hass.async_block_till_done()
+    assert ["home-assistant/core"] == config_entry.options["hot_repositories"]
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
+    assert {"home-assistant/core"} == coordinator.hot_paths
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+@pytest.mark.asyncio
+@patch("custom_components.github_custom.async_create_client")
+async def test_options_flow_pins_discovered_repos(
+    m_github, hass, mock_client, repository_result
+):
+    """Test discovered repos can be pinned to the hot tier, removed repos not."""
+    m_instance = mock_client(AsyncMock)
+    m_instance.graphql = AsyncMock(
+        return_value={"repo0": repository_result(name="core", permission="READ")}
+    )
+    m_github.return_value = m_instance
+
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            CONF_ACCESS_TOKEN: "access-token",
+            CONF_REPOS: [{"path": "home-assistant/core", "name": "HA Core"}],
+        },
+    )
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    # The sensor of a repo that was discovered rather than configured.
+    er.async_get(hass).async_get_or_create(
+        "sensor",
+        DOMAIN,
+        "esphome/esphome",
+        config_entry=config_entry,
+        suggested_object_id="esphome",
+        original_name="esphome/esphome",
+    )
+
+    result = await hass.config_entries.options.async_init(config_entry.entry_id)
+    assert {
+        "home-assistant/core": "HA Core",
+        "esphome/esphome": "esphome/esphome",
+    } == result["data_schema"].schema["hot_repositories"].options
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"],
+        user_input={
+            "repos": ["sensor.esphome"],
+            "hot_repositories": ["home-assistant/core", "esphome/esphome"],
+        },
+    )
+    await hass.async_block_till_done()
+    assert "create_entry" == result["type"]
+    assert [] == config_entry.options[CONF_REPOS]
+    assert ["esphome/esphome"] == config_entry.options["hot_repositories"]
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+@pytest.mark.asyncio
+@patch("custom_components.github_custom.async_create_client")
+async def test_options_flow_saves_options(m_github, hass, mock_client):
+    """Test the refresh intervals, events and webhook are saved with the options."""
+    m_instance = mock_client(AsyncMock)
+    m_instance.graphql = AsyncMock(return_value={})
+    m_github.return_value = m_instance
+
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={CONF_ACCESS_TOKEN: "access-token", CONF_REPOS: []},
+    )
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    result = await hass.config_entries.options.async_init(config_entry.entry_id)
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"],
+        user_input={
+            "repos": [],
+            "ttl_traffic": 1440,
+            "poll_events": True,
+            "webhook": True,
+        },
+    )
+    await hass.async_block_till_done()
+    assert "create_entry" == result["type"]
+    assert 1440 == config_entry.options["ttl_traffic"]
+    assert config_entry.options["poll_events"] is True
+    assert 10 == config_entry.options["ttl_commits"]
+    # A webhook id and secret are generated when enabling the webhook.
+    assert config_entry.options["webhook"] is True
+    assert 64 == len(config_entry.options["webhook_secret"])
+    webhook_id = config_entry.options["webhook_id"]
+
+    result = await hass.config_entries.options.async_init(config_entry.entry_id)
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"], user_input={"repos": [], "webhook": True}
+    )
+    await hass.async_block_till_done()
+    assert webhook_id == config_entry.options["webhook_id"]
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+@pytest.mark.asyncio
+@patch("custom_components.github_custom.async_create_client")
+async def test_options_flow_invalid_owners(m_github, hass, mock_client):
+    """Test owners to discover must be prefixed by their kind."""
+    m_instance = mock_client(AsyncMock)
+    m_instance.graphql = AsyncMock(return_value={})
+    m_github.return_value = m_instance
+
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={CONF_ACCESS_TOKEN: "access-token", CONF_REPOS: []},
+    )
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    result = await hass.config_entries.options.async_init(config_entry.entry_id)
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"], user_input={"repos": [], "discover": "esphome"}
+    )
+    assert {"base": "invalid_owners"} == result["errors"]
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+@pytest.mark.asyncio
+@patch("custom_components.github_custom.config_flow.validate_auth")
+@patch("custom_components.github_custom.async_create_client")
+async def test_options_flow_access_tokens(m_github, m_validate_auth, hass, mock_client):
+    """Test additional tokens are validated and saved as a list."""
+    m_instance = mock_client(AsyncMock)
+    m_instance.graphql = AsyncMock(return_value={})
+    m_github.return_value = m_instance
+
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={CONF_ACCESS_TOKEN: "access-token", CONF_REPOS: []},
+    )
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    m_validate_auth.side_effect = [None, ValueError]
+    result = await hass.config_entries.options.async_init(config_entry.entry_id)
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"], user_input={"repos": [], "access_tokens": "good\nbad"}
+    )
+    assert {"base": "auth"} == result["errors"]
+
+    m_validate_auth.side_effect = None
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"], user_input={"repos": [], "access_tokens": "a, b"}
+    )
+    await hass.async_block_till_done()
+    assert "create_entry" == result["type"]
+    assert ["a", "b"] == config_entry.options["access_tokens"]
+    # The entry is reloaded with a client spreading requests over the tokens.
+    assert ("access-token", ["a", "b"]) == m_github.call_args.args[1:3]
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+@pytest.mark.asyncio
+@patch("custom_components.github_custom.config_flow.validate_path")
+@patch("custom_components.github_custom.async_create_client")
+async def test_options_applied_without_reload(
+    m_github, m_validate_path, hass, mock_client, repository_result
+):
+    """Test repos are added and removed without reloading the entry."""
+
+    async def graphql(query, **variables):
+        return {
+            f"repo{index}": repository_result(
+                name=variables[f"name{index}"], permission="READ"
+            )
+            for index in range(len(variables) // 2)
+        }
+
+    m_instance = mock_client(AsyncMock)
+    m_instance.graphql = AsyncMock(side_effect=graphql)
+    m_github.return_value = m_instance
+
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            CONF_ACCESS_TOKEN: "access-token",
+            CONF_REPOS: [{"path": "home-assistant/core", "name": "HA Core"}],
+        },
+    )
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
+
+    result = await hass.config_entries.options.async_init(config_entry.entry_id)
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"],
+        user_input={
+            "repos": ["sensor.ha_core"],
+            "path": "home-assistant/frontend",
+            "name": "HA Frontend",
+            "ttl_commits": 5,
+            "max_staleness": 120,
+        },
+    )
+    await hass.async_block_till_done()
+    assert coordinator is hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
+    assert ["home-assistant/core", "home-assistant/frontend"] == coordinator.paths
+    assert 300 == coordinator.ttls["commits"].total_seconds()
+    assert 7200 == coordinator.max_staleness.total_seconds()
+    assert "frontend" == hass.states.get("sensor.ha_frontend").attributes["name"]
+    assert "core" == hass.states.get("sensor.ha_core").attributes["name"]
+
+    # Nothing is removed when the options don't validate.
+    m_validate_path.side_effect = ValueError
+    result = await hass.config_entries.options.async_init(config_entry.entry_id)
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"],
+        user_input={"repos": ["sensor.ha_frontend"], "path": "invalid"},
+    )
+    await hass.async_block_till_done()
+    assert {"base": "invalid_path"} == result["errors"]
+    assert hass.states.get("sensor.ha_core") is not None
+    assert er.async_get(hass).async_get("sensor.ha_core") is not None
+    m_validate_path.side_effect = None
+
+    # The repos are read from the options that were last saved.
+    result = await hass.config_entries.options.async_init(config_entry.entry_id)
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"], user_input={"repos": ["sensor.ha_frontend"]}
+    )
+    await hass.async_block_till_done()
+    assert coordinator is hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
+    assert ["home-assistant/frontend"] == coordinator.paths
+    assert [{"path": "home-assistant/frontend", "name": "HA Frontend"}] == (
+        config_entry.options["repositories"]
+    )
+    assert hass.states.get("sensor.ha_core") is None
+
+    # Other options reload the entry.
+    result = await hass.config_entries.options.async_init(config_entry.entry_id)
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"], user_input={"repos": ["sensor.ha_frontend"], "webhook": True}
+    )
+    await hass.async_block_till_done()
+    assert coordinator is not hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
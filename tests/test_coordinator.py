@@ -0,0 +1,850 @@
+"""Tests for the coordinator module."""
+import asyncio
+from datetime import timedelta
+from http import HTTPStatus
+import json
+import re
+import time
+from unittest.mock import AsyncMock, patch
+
+import aiohttp
+from gidgethub import BadRequest, GitHubException, QueryError
+from gidgethub.sansio import RateLimit
+from homeassistant.helpers.storage import Store
+import homeassistant.util.dt as dt_util
+import pytest
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.github_custom.breaker import FAILURE_THRESHOLD
+from custom_components.github_custom.cache import GitHubCache
+from custom_components.github_custom.client import async_create_client
+from custom_components.github_custom.coordinator import (
+    GROUPS,
+    SHARED_GROUPS_TTL,
+    SOURCE_GRAPHQL,
+    SOURCE_TRAFFIC,
+    URLS_PER_REPO,
+    GitHubDataUpdateCoordinator,
+    build_repositories_query,
+    chunk_size,
+    parse_repository,
+    ttls_from_config,
+)
+from custom_components.github_custom.request_queue import (
+    _PRIORITY,
+    PRIORITY_POLL,
+    PRIORITY_REFRESH,
+)
+
+
+def test_build_repositories_query():
+    """Test every repo is aliased and passed as variables."""
+    query, variables = build_repositories_query(["a/b", "c/d"])
+    assert {"owner0": "a", "name0": "b", "owner1": "c", "name1": "d"} == variables
+    assert "repo0: repository(owner: $owner0, name: $name0)" in query
+    assert "repo1: repository(owner: $owner1, name: $name1)" in query
+    assert "fragment RepositoryFields on Repository" in query
+
+
+def test_build_repositories_query_selects_groups():
+    """Test only the fields of the requested groups are selected."""
+    query, _ = build_repositories_query(["a/b"], frozenset({"releases"}))
+    assert "releases(" in query
+    assert "forkCount" not in query
+    assert "defaultBranchRef" not in query
+
+
+def test_build_repositories_query_counts_without_search():
+    """Test counts come from totalCount and connections select a single node.
+
+    The query costs one point of the GraphQL budget per chunk of repos and
+    nothing of the 30 requests per minute of the search API.
+    """
+    query, _ = build_repositories_query(["a/b"])
+    assert "search" not in query
+    assert 2 == query.count("totalCount")
+    assert 3 == query.count("first: 1")
+    connections = re.findall(r"\w+\(([^)]*)\)", query.split("fragment")[1])
+    assert 3 == len(connections)
+    assert all("first: 1," in arguments for arguments in connections)
+
+
+def test_parse_repository_empty_repo(repository_result):
+    """Test optional attributes are omitted for an empty repository."""
+    repository = repository_result()
+    repository["defaultBranchRef"] = None
+    repository["issues"]["nodes"] = []
+    repository["pullRequests"]["nodes"] = []
+    repository["releases"]["nodes"] = []
+    expected = {
+        "repo": {"forks": 1000, "name": "Home Assistant", "stargazers": 9000},
+        "commits": {},
+        "issues": {"open_issues": 4655, "open_pull_requests": 345},
+        "releases": {},
+    }
+    assert expected == parse_repository(repository)
+
+
+def test_chunk_size():
+    """Test cheaper selections pack more repos per query."""
+    assert 50 == chunk_size(frozenset(GROUPS))
+    assert 100 == chunk_size(frozenset({"commits"}))
+    assert 100 == chunk_size(frozenset({"repo", "traffic"}))
+    assert 66 == chunk_size(frozenset({"issues", "releases"}))
+
+
+def test_ttls_from_config():
+    """Test the time to live of every group is read from the options."""
+    ttls = ttls_from_config({"ttl_commits": 1})
+    assert timedelta(minutes=1) == ttls["commits"]
+    assert timedelta(hours=6) == ttls["traffic"]
+
+
+@pytest.mark.asyncio
+async def test_async_update_data_success(hass, mock_client, repository_result):
+    """Tests a fully successful update, including traffic for pushable repos."""
+    github = mock_client()
+    github.graphql = AsyncMock(
+        return_value={
+            "repo0": repository_result(),
+            "repo1": repository_result(permission="READ"),
+        }
+    )
+    github.getitem = AsyncMock(
+        side_effect=[{"count": 100, "uniques": 50}, {"count": 10000, "uniques": 5000}]
+    )
+    coordinator = GitHubDataUpdateCoordinator(
+        hass,
+        github,
+        [{"path": "homeassistant/core"}, {"path": "homeassistant/frontend"}],
+    )
+    data = await coordinator._async_update_data()
+
+    assert 1 == github.graphql.await_count
+    assert {
+        "clones": 100,
+        "clones_unique": 50,
+        "forks": 1000,
+        "latest_commit_message": "Did a thing.",
+        "latest_commit_sha": "e751664d95917dbdb856c382bfe2f4655e2a83c1",
+        "latest_open_issue_url": "https://github.com/homeassistant/core/issues/1",
+        "latest_open_pull_request_url": "https://github.com/homeassistant/core/pull/1347",
+        "latest_release_tag": "v0.1.112",
+        "latest_release_url": "https://github.com/homeassistant/core/releases/v0.1.112",
+        "name": "Home Assistant",
+        "open_issues": 4655,
+        "open_pull_requests": 345,
+        "path": "homeassistant/core",
+        "stargazers": 9000,
+        "views": 10000,
+        "views_unique": 5000,
+    } == data["homeassistant/core"].as_dict()
+    assert data["homeassistant/frontend"].clones is None
+
+
+@pytest.mark.asyncio
+@patch("custom_components.github_custom.coordinator.GRAPHQL_MAX_REPOS", 1)
+async def test_async_update_data_chunks(hass, mock_client, repository_result):
+    """Tests repos are requested in chunks."""
+    github = mock_client()
+    github.graphql = AsyncMock(
+        return_value={"repo0": repository_result(permission="READ")}
+    )
+    coordinator = GitHubDataUpdateCoordinator(
+        hass, github, [{"path": "a/b"}, {"path": "c/d"}]
+    )
+    data = await coordinator._async_update_data()
+
+    assert 2 == github.graphql.await_count
+    assert ["a/b", "c/d"] == list(data)
+
+
+@pytest.mark.asyncio
+async def test_async_update_data_partial_errors(hass, mock_client, repository_result):
+    """Tests repos that could not be resolved are missing from the data."""
+    github = mock_client()
+    github.graphql = AsyncMock(
+        side_effect=QueryError(
+            {
+                "data": {"repo0": None, "repo1": repository_result(permission="READ")},
+                "errors": [{"message": "Could not resolve to a Repository"}],
+            }
+        )
+    )
+    coordinator = GitHubDataUpdateCoordinator(
+        hass, github, [{"path": "a/missing"}, {"path": "c/d"}]
+    )
+    data = await coordinator._async_update_data()
+
+    assert ["c/d"] == list(data)
+
+
+@pytest.mark.asyncio
+async def test_async_update_data_traffic_failed(
+    hass, freezer, mock_client, repository_result
+):
+    """Tests a group that fails keeps its last value until it is too stale."""
+    github = mock_client()
+    github.graphql = AsyncMock(
+        return_value={
+            "repo0": repository_result(),
+            "repo1": repository_result(permission="READ"),
+        }
+    )
+    github.getitem = AsyncMock(side_effect=GitHubException)
+    coordinator = GitHubDataUpdateCoordinator(
+        hass, github, [{"path": "a/b"}, {"path": "c/d"}]
+    )
+    data = await coordinator._async_update_data()
+    # The rest of the snapshot is served without the traffic.
+    assert ["a/b", "c/d"] == list(data)
+    assert data["a/b"].views is None
+
+    # Only the group that failed is retried.
+    github.getitem = AsyncMock(return_value={"count": 5, "uniques": 1})
+    freezer.tick(timedelta(minutes=1))
+    data = await coordinator._async_update_data()
+    assert 1 == github.graphql.call_count
+    assert 5 == data["a/b"].views
+    assert data["a/b"].stale_groups is None
+
+    # The last good value is served, flagged with when it was fetched.
+    fetched = dt_util.utcnow().isoformat()
+    github.getitem = AsyncMock(side_effect=GitHubException)
+    freezer.tick(timedelta(hours=6))
+    data = await coordinator._async_update_data()
+    assert 5 == data["a/b"].views
+    assert {"traffic": fetched} == data["a/b"].stale_groups
+    assert timedelta(minutes=1) == coordinator.update_interval
+
+    # Until it failed for longer than the staleness limit, the rest of the
+    # snapshot is still served.
+    freezer.tick(coordinator.max_staleness + timedelta(minutes=1))
+    data = await coordinator._async_update_data()
+    assert ["a/b", "c/d"] == list(data)
+    assert data["a/b"].views is None
+    assert data["a/b"].stale_groups is None
+    assert 9000 == data["a/b"].stargazers
+
+
+@pytest.mark.asyncio
+async def test_async_update_data_traffic_always_fails(
+    hass, freezer, mock_client, repository_result
+):
+    """Tests a group that never succeeds doesn't hold up the other groups."""
+    github = mock_client()
+    github.graphql = AsyncMock(return_value={"repo0": repository_result()})
+    github.getitem = AsyncMock(side_effect=BadRequest(HTTPStatus.FORBIDDEN))
+    coordinator = GitHubDataUpdateCoordinator(
+        hass, github, [{"path": "a/b"}], ttls={group: timedelta() for group in GROUPS}
+    )
+    for _ in range(100):
+        await coordinator.async_refresh()
+        freezer.tick(timedelta(minutes=1))
+
+    assert coordinator.last_update_success is True
+    assert 100 == github.graphql.call_count
+    assert coordinator.data["a/b"].views is None
+    assert coordinator.data["a/b"].stale_groups is None
+    assert coordinator._stale["a/b"] == {}
+
+
+@pytest.mark.asyncio
+async def test_async_update_data_failed(hass, mock_client):
+    """Tests the update fails when no repo could be retrieved."""
+    github = mock_client()
+    github.graphql = AsyncMock(side_effect=GitHubException)
+    coordinator = GitHubDataUpdateCoordinator(hass, github, [{"path": "a/b"}])
+    await coordinator.async_refresh()
+
+    assert coordinator.last_update_success is False
+
+
+@pytest.mark.asyncio
+async def test_async_update_data_adapts_interval(hass, mock_client, repository_result):
+    """Tests the update interval is picked from the cost of the update."""
+    github = mock_client()
+
+    async def graphql(query, **variables):
+        github.requests_charged["graphql"] += 1
+        github.rate_limits["graphql"] = RateLimit(
+            limit=5000, remaining=500, reset_epoch=time.time() + 3600
+        )
+        return {"repo0": repository_result(permission="READ")}
+
+    github.graphql = graphql
+    coordinator = GitHubDataUpdateCoordinator(hass, github, [{"path": "a/b"}])
+    assert timedelta(minutes=10) == coordinator.update_interval
+    await coordinator._async_update_data()
+
+    # 500 remaining minus a 500 reserve leaves no room for another update.
+    assert timedelta(minutes=59) < coordinator.update_interval
+
+
+@pytest.mark.asyncio
+async def test_async_update_data_refetches_expired_groups(
+    hass, freezer, mock_client, repository_result
+):
+    """Tests only the expired groups are refetched."""
+    github = mock_client()
+    github.graphql = AsyncMock(return_value={"repo0": repository_result()})
+    github.getitem = AsyncMock(return_value={"count": 1, "uniques": 1})
+    coordinator = GitHubDataUpdateCoordinator(
+        hass, github, [{"path": "a/b"}], ttls_from_config({})
+    )
+    await coordinator._async_update_data()
+    assert 1 == github.graphql.await_count
+    assert 2 == github.getitem.await_count
+    assert timedelta(minutes=10) == coordinator.update_interval
+
+    # Nothing expired yet.
+    freezer.tick(timedelta(minutes=5))
+    data = await coordinator._async_update_data()
+    assert 1 == github.graphql.await_count
+    assert "Did a thing." == data["a/b"].latest_commit_message
+
+    # Commits and issues expired, repo stats, traffic and releases didn't.
+    freezer.tick(timedelta(minutes=5))
+    github.graphql.return_value = {
+        "repo0": {
+            "defaultBranchRef": {"target": {"oid": "abc", "message": "Next."}},
+            "issues": {"totalCount": 1, "nodes": []},
+            "pullRequests": {"totalCount": 0, "nodes": []},
+        }
+    }
+    data = await coordinator._async_update_data()
+    query = github.graphql.await_args.args[0]
+    assert "defaultBranchRef" in query
+    assert "releases(" not in query
+    assert "forkCount" not in query
+    assert 2 == github.getitem.await_count
+    assert "Next." == data["a/b"].latest_commit_message
+    assert 1000 == data["a/b"].forks
+    assert 1 == data["a/b"].clones
+    assert "v0.1.112" == data["a/b"].latest_release_tag
+
+
+@pytest.mark.asyncio
+async def test_async_update_data_tiers_by_activity(
+    hass, freezer, mock_client, repository_result
+):
+    """Tests busy repos are polled every minute and dormant ones hourly."""
+    github = mock_client()
+    github.graphql = AsyncMock(
+        return_value={
+            "repo0": repository_result(permission="READ"),
+            "repo1": repository_result(permission="READ"),
+        }
+    )
+    coordinator = GitHubDataUpdateCoordinator(
+        hass, github, [{"path": "a/busy"}, {"path": "a/dormant"}]
+    )
+    await coordinator._async_update_data()
+    assert {"a/busy": "warm", "a/dormant": "warm"} == coordinator.tiers
+
+    # The busy repo changes on every poll, the dormant one never does.
+    for sha in range(12):
+        freezer.tick(timedelta(minutes=10))
+        busy = repository_result(permission="READ")
+        busy["defaultBranchRef"]["target"]["oid"] = str(sha)
+        github.graphql.return_value = {
+            "repo0": busy,
+            "repo1": repository_result(permission="READ"),
+        }
+        await coordinator._async_update_data()
+    assert {"a/busy": "hot", "a/dormant": "warm"} == coordinator.tiers
+    assert timedelta(minutes=1) == coordinator.update_interval
+
+    # Nothing changes for days, the dormant repo only expires after an hour.
+    freezer.tick(timedelta(days=3))
+    github.graphql.return_value = {
+        "repo0": busy,
+        "repo1": repository_result(permission="READ"),
+    }
+    await coordinator._async_update_data()
+    assert {"a/busy": "warm", "a/dormant": "cold"} == coordinator.tiers
+    freezer.tick(timedelta(days=3))
+    await coordinator._async_update_data()
+    assert {"a/busy": "cold", "a/dormant": "cold"} == coordinator.tiers
+    assert timedelta(hours=1) == coordinator.update_interval
+
+
+@pytest.mark.asyncio
+async def test_hot_paths_are_pinned(hass, freezer, mock_client, repository_result):
+    """Tests repos pinned as hot are polled every minute whatever their activity."""
+    github = mock_client()
+    github.graphql = AsyncMock(
+        return_value={"repo0": repository_result(permission="READ")}
+    )
+    coordinator = GitHubDataUpdateCoordinator(
+        hass, github, [{"path": "a/b"}], hot_paths=["a/b"]
+    )
+    await coordinator._async_update_data()
+    freezer.tick(timedelta(minutes=1))
+    await coordinator._async_update_data()
+    assert {"a/b": "hot"} == coordinator.tiers
+    assert 2 == github.graphql.await_count
+
+
+@pytest.mark.asyncio
+async def test_async_update_data_saves_snapshot(
+    hass, hass_storage, mock_client, repository_result
+):
+    """Tests the snapshot is saved to the store."""
+    github = mock_client()
+    github.graphql = AsyncMock(
+        return_value={"repo0": repository_result(permission="READ")}
+    )
+    store = Store(hass, 1, "github_custom.test")
+    coordinator = GitHubDataUpdateCoordinator(
+        hass, github, [{"path": "a/b"}], store=store
+    )
+    await coordinator._async_update_data()
+    await coordinator.async_save()
+
+    stored = hass_storage["github_custom.test"]["data"]
+    assert {"a/b": "READ"} == stored["permissions"]
+    assert [] == stored["pushed_paths"]
+    fetched, attrs = stored["groups"]["a/b"]["commits"]
+    assert "Did a thing." == attrs["latest_commit_message"]
+    assert dt_util.parse_datetime(fetched) is not None
+    assert [1.0, fetched] == stored["activity"]["a/b"]
+
+    # The activity of the repos is restored with the snapshot.
+    restored = GitHubDataUpdateCoordinator(hass, github, [{"path": "a/b"}], store=store)
+    assert await restored.async_restore()
+    assert coordinator.activity == restored.activity
+
+
+@pytest.mark.asyncio
+async def test_async_restore(hass, hass_storage, mock_client):
+    """Tests a snapshot is restored and expired groups are refetched with jitter."""
+    now = dt_util.utcnow()
+    fresh = now.isoformat()
+    expired = (now - timedelta(days=1)).isoformat()
+    hass_storage["github_custom.test"] = {
+        "version": 1,
+        "key": "github_custom.test",
+        "data": {
+            "groups": {
+                "a/b": {
+                    "repo": [fresh, {"forks": 1, "name": "b", "stargazers": 2}],
+                    "commits": [expired, {"latest_commit_sha": "abcdefghij"}],
+                    "issues": [fresh, {"open_issues": 1}],
+                    "releases": [fresh, {}],
+                },
+                "c/removed": {"repo": [fresh, {"forks": 1}]},
+            },
+            "permissions": {"a/b": "READ"},
+            "pushed_paths": [],
+        },
+    }
+    coordinator = GitHubDataUpdateCoordinator(
+        hass,
+        mock_client(),
+        [{"path": "a/b"}, {"path": "d/new"}],
+        store=Store(hass, 1, "github_custom.test"),
+    )
+    assert await coordinator.async_restore() is True
+
+    assert ["a/b"] == list(coordinator.data)
+    assert "abcdefghij" == coordinator.data["a/b"].latest_commit_sha
+    # The new repo and the expired commits are refetched within the jitter window.
+    assert coordinator._expires("a/b", "commits") > now
+    assert coordinator._expires("a/b", "commits") <= now + timedelta(minutes=6)
+    assert timedelta(minutes=1) == coordinator.update_interval
+    # Without new repos the update waits for the jittered commits to expire.
+    coordinator.paths.remove("d/new")
+    with patch(
+        "custom_components.github_custom.coordinator.random.random", return_value=0.5
+    ):
+        assert await coordinator.async_restore() is True
+    assert timedelta(minutes=2) < coordinator.update_interval <= timedelta(minutes=3)
+
+
+@pytest.mark.asyncio
+async def test_async_update_group_notifies_its_repo(
+    hass, mock_client, repository_result
+):
+    """Tests an event pushed to a repo only notifies the listener of that repo."""
+    github = mock_client()
+    github.graphql = AsyncMock(
+        return_value={
+            "repo0": repository_result(permission="READ"),
+            "repo1": repository_result(permission="READ"),
+        }
+    )
+    coordinator = GitHubDataUpdateCoordinator(
+        hass, github, [{"path": "a/b"}, {"path": "c/d"}]
+    )
+    await coordinator.async_refresh()
+    notified = []
+    remove_listener = coordinator.async_add_path_listener(
+        "a/b", lambda: notified.append("a/b")
+    )
+    coordinator.async_add_path_listener("c/d", lambda: notified.append("c/d"))
+
+    coordinator.async_update_group("a/b", "repo", {"stargazers": 1})
+    assert ["a/b"] == notified
+    assert 1 == coordinator.data["a/b"].stargazers
+
+    remove_listener()
+    coordinator.async_update_group("a/b", "repo", {"stargazers": 2})
+    assert ["a/b"] == notified
+    assert 2 == coordinator.data["a/b"].stargazers
+
+
+@pytest.mark.asyncio
+async def test_async_restore_pushed_paths(hass, hass_storage, mock_client):
+    """Tests repos only keep pushing their events while the webhook is on.
+
+    Repos that are no longer watched keep neither their permission nor their
+    webhook.
+    """
+    hass_storage["github_custom.test"] = {
+        "version": 1,
+        "key": "github_custom.test",
+        "data": {
+            "groups": {},
+            "permissions": {"a/b": "ADMIN", "c/removed": "ADMIN"},
+            "pushed_paths": ["a/b", "c/removed"],
+        },
+    }
+    for webhook, pushed_paths in ((True, {"a/b"}), (False, set())):
+        coordinator = GitHubDataUpdateCoordinator(
+            hass,
+            mock_client(),
+            [{"path": "a/b"}],
+            store=Store(hass, 1, "github_custom.test"),
+            webhook=webhook,
+        )
+        await coordinator.async_restore()
+        assert pushed_paths == coordinator.pushed_paths
+        assert {"a/b": "ADMIN"} == coordinator.permissions
+
+
+def test_cache_reserved_for_paths(hass, mock_client):
+    """Tests the cache of the client keeps room for the URLs of the repos."""
+    github = mock_client()
+    github.cache = GitHubCache(maxsize=0)
+    coordinator = GitHubDataUpdateCoordinator(hass, github, [{"path": "a/b"}])
+    assert URLS_PER_REPO == github.cache.maxsize
+    coordinator.async_add_paths(["c/d", "e/f"])
+    assert 3 * URLS_PER_REPO == github.cache.maxsize
+    coordinator.async_remove_paths(["a/b"])
+    assert 2 * URLS_PER_REPO == github.cache.maxsize
+    coordinator.async_release_cache()
+    assert 0 == github.cache.maxsize
+
+
+@pytest.mark.asyncio
+async def test_async_restore_nothing_stored(hass, hass_storage, mock_client):
+    """Tests nothing is restored without a store or a saved snapshot."""
+    coordinator = GitHubDataUpdateCoordinator(hass, mock_client(), [{"path": "a/b"}])
+    assert await coordinator.async_restore() is False
+    coordinator = GitHubDataUpdateCoordinator(
+        hass,
+        mock_client(),
+        [{"path": "a/b"}],
+        store=Store(hass, 1, "github_custom.test"),
+    )
+    assert await coordinator.async_restore() is False
+
+
+@pytest.mark.asyncio
+async def test_async_fetch_repos(hass, mock_client, repository_result):
+    """Tests repos are fetched without traffic and the failed ones returned."""
+    github = mock_client()
+    github.graphql = AsyncMock(
+        return_value={"repo0": repository_result(permission="ADMIN"), "repo1": None}
+    )
+    coordinator = GitHubDataUpdateCoordinator(hass, github, [])
+    assert {"a/missing"} == await coordinator.async_fetch_repos(["a/b", "a/missing"])
+    github.getitem.assert_not_called()
+
+    stored = coordinator.stored_data()
+    assert ["a/b"] == list(stored["groups"])
+    assert "traffic" not in stored["groups"]["a/b"]
+    assert {"a/b": "ADMIN"} == stored["permissions"]
+
+
+@pytest.mark.asyncio
+async def test_async_restore_seed(hass, hass_storage, mock_client, repository_result):
+    """Tests a seed is restored instead of the store, missing groups are fetched."""
+    github = mock_client()
+    github.graphql = AsyncMock(
+        return_value={"repo0": repository_result(permission="ADMIN")}
+    )
+    seeder = GitHubDataUpdateCoordinator(hass, github, [])
+    await seeder.async_fetch_repos(["a/b"])
+
+    coordinator = GitHubDataUpdateCoordinator(
+        hass, github, [{"path": "a/b"}], store=Store(hass, 1, "github_custom.test")
+    )
+    assert await coordinator.async_restore(seeder.stored_data()) is True
+    assert 9000 == coordinator.data["a/b"].stargazers
+    # The traffic wasn't fetched to validate the repo.
+    assert timedelta(minutes=1) == coordinator.update_interval
+
+
+@pytest.mark.asyncio
+async def test_discovered_paths(hass, hass_storage, mock_client, repository_result):
+    """Tests discovered repos are watched, forgotten and restored."""
+    github = mock_client()
+    github.graphql = AsyncMock(
+        return_value={
+            "repo0": repository_result(permission="READ"),
+            "repo1": repository_result(permission="READ"),
+            "repo2": repository_result(permission="READ"),
+        }
+    )
+    store = Store(hass, 1, "github_custom.test")
+    coordinator = GitHubDataUpdateCoordinator(
+        hass, github, [{"path": "a/b"}], store=store, discover=True
+    )
+    coordinator.async_add_paths(["A/B", "a/c", "a/d"])
+    assert ["a/b", "a/c", "a/d"] == coordinator.paths
+    assert {"a/c", "a/d"} == coordinator.discovered_paths
+    await coordinator.async_refresh()
+    assert ["a/b", "a/c", "a/d"] == list(coordinator.data)
+
+    coordinator.async_remove_paths(["a/d"])
+    assert ["a/b", "a/c"] == coordinator.paths
+    assert coordinator.path_for("a/d") is None
+    assert ["a/b", "a/c"] == list(coordinator.data)
+    await coordinator.async_save()
+
+    restored = GitHubDataUpdateCoordinator(
+        hass, github, [{"path": "a/b"}], store=store, discover=True
+    )
+    assert await restored.async_restore() is True
+    assert ["a/b", "a/c"] == list(restored.data)
+    # Discovered repos aren't restored once discovery is turned off.
+    restored = GitHubDataUpdateCoordinator(hass, github, [{"path": "a/b"}], store=store)
+    assert await restored.async_restore() is True
+    assert ["a/b"] == list(restored.data)
+
+
+@pytest.mark.asyncio
+async def test_async_update_data_backs_off_failing_repos(
+    hass, caplog, mock_client, repository_result
+):
+    """Tests repos that keep failing are backed off from, errors logged once."""
+    github = mock_client()
+    missing = {"a"}
+    owners = []
+
+    async def graphql(query, **variables):
+        owners.extend(variables[f"owner{i}"] for i in range(len(variables) // 2))
+        data = {
+            f"repo{i}": None
+            if variables[f"owner{i}"] in missing
+            else repository_result(permission="READ")
+            for i in range(len(variables) // 2)
+        }
+        if errors := [
+            {"path": [alias], "message": "Could not resolve"}
+            for alias, repository in data.items()
+            if repository is None
+        ]:
+            raise QueryError({"data": data, "errors": errors})
+        return data
+
+    github.graphql = graphql
+    coordinator = GitHubDataUpdateCoordinator(
+        hass, github, [{"path": "a/missing"}, {"path": "c/d"}]
+    )
+    for _ in range(FAILURE_THRESHOLD):
+        await coordinator._async_update_data()
+    assert 1 == caplog.text.count("Error retrieving a/missing from GitHub")
+    breaker = coordinator.breakers["a/missing", SOURCE_GRAPHQL]
+    assert "Could not resolve" == breaker.last_error
+    assert FAILURE_THRESHOLD == breaker.repeated
+
+    # The breaker is open, the repo is no longer requested.
+    owners.clear()
+    data = await coordinator._async_update_data()
+    assert ["c/d"] == list(data)
+    assert "a" not in owners
+
+    # Once the backoff is over the repo is probed and comes back.
+    breaker.opened_until = dt_util.utcnow()
+    missing.clear()
+    data = await coordinator._async_update_data()
+    assert {"a/missing", "c/d"} == set(data)
+    assert {} == coordinator.breakers
+    assert "Retrieved graphql of a/missing again after 3 failures" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_async_update_data_backs_off_each_source(
+    hass, freezer, caplog, mock_client, repository_result
+):
+    """Tests failures of the traffic only back off from the traffic."""
+    github = mock_client()
+    github.graphql = AsyncMock(return_value={"repo0": repository_result()})
+    github.getitem = AsyncMock(side_effect=BadRequest(HTTPStatus.FORBIDDEN))
+    coordinator = GitHubDataUpdateCoordinator(
+        hass, github, [{"path": "a/b"}], ttls={group: timedelta() for group in GROUPS}
+    )
+    for _ in range(FAILURE_THRESHOLD):
+        await coordinator._async_update_data()
+        freezer.tick(timedelta(minutes=1))
+    assert FAILURE_THRESHOLD == github.graphql.call_count
+    assert [("a/b", SOURCE_TRAFFIC)] == list(coordinator.breakers)
+    assert 1 == caplog.text.count("Error retrieving a/b from GitHub")
+
+    # The GraphQL groups keep being fetched while the traffic is backed off from,
+    # their success doesn't close the breaker of the traffic.
+    github.getitem.reset_mock()
+    await coordinator._async_update_data()
+    assert FAILURE_THRESHOLD + 1 == github.graphql.call_count
+    github.getitem.assert_not_called()
+    assert [("a/b", SOURCE_TRAFFIC)] == list(coordinator.breakers)
+
+
+@pytest.mark.asyncio
+async def test_async_refresh_ahead(hass, freezer, mock_client, repository_result):
+    """Tests the priority of a refresh doesn't leak into the scheduled polls."""
+    github = mock_client()
+    priorities = []
+
+    async def graphql(query, **variables):
+        priorities.append(_PRIORITY.get())
+        return {"repo0": repository_result(permission="READ")}
+
+    github.graphql = graphql
+    coordinator = GitHubDataUpdateCoordinator(
+        hass, github, [{"path": "a/b"}], ttls={group: timedelta() for group in GROUPS}
+    )
+    unsub = coordinator.async_add_listener(lambda: None)
+    await coordinator.async_refresh_ahead()
+    freezer.tick(coordinator.update_interval)
+    async_fire_time_changed(hass)
+    await hass.async_block_till_done()
+    unsub()
+
+    assert [PRIORITY_REFRESH, PRIORITY_POLL] == priorities
+
+
+@pytest.mark.asyncio
+async def test_async_update_data_reuses_shared_groups(
+    hass, freezer, mock_client, repository_result
+):
+    """Tests groups fetched by another coordinator of the host are reused."""
+    github = mock_client()
+    github.graphql = AsyncMock(
+        return_value={"repo0": repository_result(permission="READ")}
+    )
+    ttls = {group: timedelta() for group in GROUPS}
+    entry = GitHubDataUpdateCoordinator(hass, github, [{"path": "a/b"}], ttls=ttls)
+    yaml = GitHubDataUpdateCoordinator(hass, github, [{"path": "a/b"}], ttls=ttls)
+    await yaml._async_update_data()
+    freezer.tick(timedelta(minutes=1))
+    # Repos are retrieved once by each coordinator before their groups are reused.
+    await entry._async_update_data()
+    assert 2 == github.graphql.call_count
+
+    freezer.tick(timedelta(minutes=1))
+    data = await yaml._async_update_data()
+    assert 2 == github.graphql.call_count
+    assert 9000 == data["a/b"].stargazers
+
+    # Groups the user asked to refresh are requested, the others reused.
+    freezer.tick(timedelta(minutes=1))
+    await entry._async_update_data()
+    yaml._invalidated["a/b"].add("issues")
+    await yaml._async_update_data()
+    assert 4 == github.graphql.call_count
+    query = github.graphql.call_args.args[0]
+    assert "issues(" in query
+    assert "stargazerCount" not in query
+    assert "releases(" not in query
+
+    # Until they are too old to be reused.
+    freezer.tick(SHARED_GROUPS_TTL)
+    await yaml._async_update_data()
+    assert 5 == github.graphql.call_count
+
+
+@pytest.mark.asyncio
+async def test_async_update_data_one_at_a_time(hass, mock_client, repository_result):
+    """Tests an update started while another one runs waits for it."""
+    github = mock_client()
+    started = asyncio.Event()
+    release = asyncio.Event()
+    running = []
+
+    async def graphql(query, **variables):
+        running.append(query)
+        started.set()
+        await release.wait()
+        assert 1 == len(running)
+        running.pop()
+        return {"repo0": repository_result(permission="READ")}
+
+    github.graphql = graphql
+    coordinator = GitHubDataUpdateCoordinator(
+        hass, github, [{"path": "a/b"}], ttls={group: timedelta() for group in GROUPS}
+    )
+    first = asyncio.create_task(coordinator._async_update_data())
+    await started.wait()
+    second = asyncio.create_task(coordinator._async_update_data())
+    await asyncio.sleep(0)
+    release.set()
+    assert ["a/b"] == list(await first)
+    assert ["a/b"] == list(await second)
+
+
+@pytest.mark.asyncio
+async def test_async_update_data_rate_limits_skip_breakers(hass):
+    """Tests rate limits of the GraphQL API are not held against the repos."""
+    headers = {"content-type": "application/json", "x-ratelimit-resource": "graphql"}
+    reset = {"x-ratelimit-limit": "5000", "x-ratelimit-reset": "1700000000"}
+    responses = [
+        # Secondary rate limit.
+        (
+            403,
+            headers,
+            {"message": "You have exceeded a secondary rate limit."},
+        ),
+        # Primary rate limit.
+        (
+            200,
+            {**headers, **reset, "x-ratelimit-remaining": "0"},
+            {"data": None, "errors": [{"type": "RATE_LIMITED", "message": "Out"}]},
+        ),
+        # Errors of a query that used up the budget.
+        (
+            200,
+            {**headers, **reset, "x-ratelimit-remaining": "0"},
+            {"data": {"repo0": None}, "errors": [{"message": "Not returned"}]},
+        ),
+    ]
+
+    async def request(self, method, url, headers, body=b""):
+        status, response_headers, data = responses.pop(0)
+        return status, response_headers, json.dumps(data).encode()
+
+    coordinator = GitHubDataUpdateCoordinator(
+        hass, async_create_client(hass, "token"), [{"path": "a/b"}]
+    )
+    with patch("gidgethub.aiohttp.GitHubAPI._request", request):
+        for _ in range(FAILURE_THRESHOLD):
+            await coordinator.async_refresh()
+            assert coordinator.last_update_success is False
+
+    assert [] == responses
+    assert {} == coordinator.breakers
+
+
+@pytest.mark.asyncio
+async def test_async_update_data_host_errors_skip_breakers(hass, mock_client):
+    """Tests errors of the host are left to the breaker of the client."""
+    github = mock_client()
+    github.graphql = AsyncMock(side_effect=aiohttp.ClientConnectionError)
+    coordinator = GitHubDataUpdateCoordinator(hass, github, [{"path": "a/b"}])
+    await coordinator.async_refresh()
+
+    assert coordinator.last_update_success is False
+    assert {} == coordinator.breakers
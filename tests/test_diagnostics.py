@@ -0,0 +1,70 @@
+"""Tests for the diagnostics module."""
+from unittest.mock import AsyncMock, patch
+
+from gidgethub.sansio import RateLimit
+from homeassistant.const import CONF_ACCESS_TOKEN
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.github_custom.breaker import CircuitBreaker
+from custom_components.github_custom.cache import DEFAULT_CACHE_SIZE, GitHubCache
+from custom_components.github_custom.const import CONF_REPOS, DOMAIN
+from custom_components.github_custom.diagnostics import (
+    async_get_config_entry_diagnostics,
+)
+from custom_components.github_custom.request_queue import RequestQueue
+from custom_components.github_custom.stats import RequestStats
+
+
+@pytest.mark.asyncio
+async def test_config_entry_diagnostics(hass, mock_client):
+    """Test the diagnostics include the rate limits and request stats."""
+    github = mock_client()
+    github.rate_limits = {
+        "graphql": RateLimit(limit=5000, remaining=4000, reset_epoch=1700000000)
+    }
+    github.token_rate_limits = {
+        "access-token": {
+            "graphql": RateLimit(limit=5000, remaining=4000, reset_epoch=1700000000)
+        }
+    }
+    github.stats = RequestStats()
+    github.breaker = CircuitBreaker()
+    github.queue = RequestQueue(10)
+    github.cache = GitHubCache()
+    github.stats.record("POST", "https://api.github.com/graphql", 200, 0.2, 0, 10)
+    github.graphql = AsyncMock(return_value={})
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={CONF_ACCESS_TOKEN: "access-token", CONF_REPOS: []},
+        options={"webhook_secret": "secret", "access_tokens": ["other-token"]},
+    )
+    config_entry.add_to_hass(hass)
+    with patch(
+        "custom_components.github_custom.async_create_client", return_value=github
+    ):
+        assert await hass.config_entries.async_setup(config_entry.entry_id)
+        await hass.async_block_till_done()
+
+    diagnostics = await async_get_config_entry_diagnostics(hass, config_entry)
+    assert "**REDACTED**" == diagnostics["entry"]["data"][CONF_ACCESS_TOKEN]
+    assert "**REDACTED**" == diagnostics["entry"]["options"]["webhook_secret"]
+    assert 0 == diagnostics["coordinator"]["repos"]
+    assert DEFAULT_CACHE_SIZE == diagnostics["cache"]["maxsize"]
+    assert 0.0 == diagnostics["cache"]["hit_ratio"]
+    assert {
+        "limit": 5000,
+        "remaining": 4000,
+        "reset": "2023-11-14T22:13:20+00:00",
+    } == diagnostics["rate_limits"]["graphql"]
+    assert "**REDACTED**" == diagnostics["entry"]["options"]["access_tokens"]
+    assert {"…oken": {"graphql": diagnostics["rate_limits"]["graphql"]}} == (
+        diagnostics["tokens"]
+    )
+    assert diagnostics["retry_after"] is None
+    assert "closed" == diagnostics["host_breaker"]["state"]
+    assert {} == diagnostics["coordinator"]["breakers"]
+    assert {} == diagnostics["coordinator"]["stale_groups"]
+    assert 10 == diagnostics["queue"]["limit"]
+    assert 1 == diagnostics["requests"]["POST /graphql"]["requests"]
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
@@ -0,0 +1,162 @@
+"""Tests for the discovery module."""
+from http import HTTPStatus
+import json
+from unittest.mock import AsyncMock, patch
+
+from gidgethub import BadRequest
+from homeassistant.const import CONF_ACCESS_TOKEN
+from homeassistant.helpers import entity_registry as er
+import homeassistant.util.dt as dt_util
+import pytest
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_fire_time_changed,
+)
+
+from custom_components.github_custom.client import async_create_client
+from custom_components.github_custom.const import CONF_DISCOVER, CONF_REPOS, DOMAIN
+from custom_components.github_custom.discovery import (
+    DISCOVERY_INTERVAL,
+    RepoPagesCache,
+    async_iter_owner_repos,
+    parse_owners,
+)
+
+
+class FakeOwnerRepos:
+    """Lists the repos of the `esphome` organization page by page."""
+
+    def __init__(self, names):
+        self.names = names
+        self.pages_requested = 0
+        self.error = None
+
+    async def getiter(self, url):
+        assert "/orgs/esphome/repos?per_page=100" == url
+        if self.error is not None:
+            raise self.error
+        for start in range(0, len(self.names), 100):
+            self.pages_requested += 1
+            for name in self.names[start : start + 100]:
+                yield {"name": name, "full_name": f"esphome/{name}"}
+
+
+def test_parse_owners():
+    """Test owners are parsed and must be prefixed by their kind."""
+    assert [("org", "esphome"), ("user", "octocat")] == parse_owners(
+        "org:esphome, user:octocat\n"
+    )
+    assert [] == parse_owners("")
+    for bad in ("esphome", "team:esphome", "org:"):
+        with pytest.raises(ValueError):
+            parse_owners(bad)
+
+
+@pytest.mark.asyncio
+async def test_async_iter_owner_repos_streams_pages():
+    """Test pages are only requested as the paths are consumed."""
+    github = FakeOwnerRepos([f"repo-{index}" for index in range(10_000)])
+    paths = async_iter_owner_repos(github, "org", "esphome")
+    assert "esphome/repo-0" == await paths.__anext__()
+    assert 1 == github.pages_requested
+    assert 9_999 == len([path async for path in paths])
+    assert 100 == github.pages_requested
+
+
+@pytest.mark.asyncio
+async def test_async_iter_owner_repos_caches_paths(hass):
+    """Test pages are requested with their ETag and only their paths are kept."""
+    page = [{"full_name": "esphome/esphome", "description": "ESPHome"}]
+    responses = [
+        (
+            200,
+            {"etag": '"page"', "content-type": "application/json"},
+            json.dumps(page).encode(),
+        ),
+        (304, {}, b""),
+    ]
+    etags = []
+
+    async def request(self, method, url, headers, body=b""):
+        etags.append(headers.get("if-none-match"))
+        return responses.pop(0)
+
+    client = async_create_client(hass, "token")
+    github = client.with_cache(RepoPagesCache())
+    with patch("gidgethub.aiohttp.GitHubAPI._request", request):
+        for _ in range(2):
+            assert ["esphome/esphome"] == [
+                path async for path in async_iter_owner_repos(github, "org", "esphome")
+            ]
+    assert [None, '"page"'] == etags
+    assert [('"page"', None, [{"full_name": "esphome/esphome"}], None)] == list(
+        github._cache.values()
+    )
+    # The pages stay out of the cache shared with the coordinators.
+    assert 0 == len(client.cache)
+
+
+@pytest.mark.asyncio
+async def test_discovery_adds_and_removes_sensors(hass, mock_client, repository_result):
+    """Test sensors of discovered repos are added and removed incrementally."""
+
+    async def graphql(query, **variables):
+        """Return a result for every repo requested."""
+        return {
+            f"repo{index}": repository_result(
+                name=variables[f"name{index}"], permission="READ"
+            )
+            for index in range(len(variables) // 2)
+        }
+
+    owner = FakeOwnerRepos(["esphome", "esphome-docs"])
+    github = mock_client()
+    github.getiter = owner.getiter
+    github.with_cache.return_value = github
+    github.graphql = AsyncMock(side_effect=graphql)
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            CONF_ACCESS_TOKEN: "access-token",
+            CONF_REPOS: [{"path": "esphome/esphome", "name": "ESPHome"}],
+        },
+        options={
+            CONF_REPOS: [{"path": "esphome/esphome", "name": "ESPHome"}],
+            CONF_DISCOVER: "org:esphome",
+        },
+    )
+    config_entry.add_to_hass(hass)
+    with patch(
+        "custom_components.github_custom.async_create_client", return_value=github
+    ):
+        assert await hass.config_entries.async_setup(config_entry.entry_id)
+        await hass.async_block_till_done()
+
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
+    # The configured repo isn't discovered a second time.
+    assert ["esphome/esphome", "esphome/esphome-docs"] == coordinator.paths
+    assert {"esphome/esphome-docs"} == coordinator.discovered_paths
+    assert "ESPHome" == hass.states.get("sensor.esphome").name
+    assert "esphome-docs" == (
+        hass.states.get("sensor.esphome_esphome_docs").attributes["name"]
+    )
+
+    owner.names = ["esphome"]
+    owner.error = BadRequest(HTTPStatus.INTERNAL_SERVER_ERROR)
+    async_fire_time_changed(hass, dt_util.utcnow() + DISCOVERY_INTERVAL)
+    await hass.async_block_till_done()
+    # Nothing is removed when the repos couldn't be listed.
+    assert hass.states.get("sensor.esphome_esphome_docs") is not None
+
+    owner.error = None
+    async_fire_time_changed(hass, dt_util.utcnow() + DISCOVERY_INTERVAL * 2)
+    await hass.async_block_till_done()
+    assert ["esphome/esphome"] == coordinator.paths
+    assert hass.states.get("sensor.esphome_esphome_docs") is None
+    assert (
+        er.async_get(hass).async_get_entity_id("sensor", DOMAIN, "esphome/esphome-docs")
+        is None
+    )
+    assert hass.states.get("sensor.esphome") is not None
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
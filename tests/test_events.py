@@ -0,0 +1,122 @@
+"""Tests for the events module."""
+from datetime import timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+import gidgethub
+import homeassistant.util.dt as dt_util
+import pytest
+
+from custom_components.github_custom.const import (
+    GROUP_COMMITS,
+    GROUP_ISSUES,
+    GROUP_RELEASES,
+    GROUP_REPO,
+    GROUP_TRAFFIC,
+)
+from custom_components.github_custom.coordinator import (
+    PUSHED_GROUPS_TTL,
+    GitHubDataUpdateCoordinator,
+)
+from custom_components.github_custom.events import (
+    DEFAULT_POLL_INTERVAL,
+    EVENTS_PER_PAGE,
+    EventFeeds,
+    groups_for,
+)
+
+
+def event(event_id, event_type):
+    """Return an event of a repo feed."""
+    return {"id": str(event_id), "type": event_type}
+
+
+def test_groups_for():
+    """Test only the groups changed by the new events are returned."""
+    events = [event(3, "PushEvent"), event(2, "WatchEvent"), event(1, "IssuesEvent")]
+    assert {GROUP_COMMITS, GROUP_REPO} == groups_for(events, 1)
+    assert set() == groups_for(events, 3)
+    assert set() == groups_for([event(4, "GollumEvent")], 3)
+    # A full page of new events may hide older ones, everything is refetched.
+    full_page = [event(100 + i, "PushEvent") for i in range(EVENTS_PER_PAGE)]
+    assert {GROUP_COMMITS, GROUP_ISSUES, GROUP_RELEASES, GROUP_REPO} == groups_for(
+        full_page, 1
+    )
+
+
+@pytest.mark.asyncio
+async def test_event_feeds_poll(hass, mock_client):
+    """Test feeds are polled at the interval GitHub asks for."""
+    now = dt_util.utcnow()
+    github = mock_client()
+    github.getitem = AsyncMock(return_value=[event(2, "PushEvent")])
+    github.poll_intervals["/repos/a/b/events"] = 300
+    feeds = EventFeeds(github)
+
+    # The first poll only records the newest event.
+    assert {} == await feeds.async_poll(["a/b", "c/d"], now)
+    assert {"a/b": 2, "c/d": 2} == feeds.last_ids
+    assert now + DEFAULT_POLL_INTERVAL == feeds.next_poll(["a/b", "c/d"], now)
+    assert now + timedelta(seconds=300) == feeds.next_poll(["a/b"], now)
+
+    github.getitem.return_value = [event(3, "ReleaseEvent"), event(2, "PushEvent")]
+    # Feeds are left alone until they are due.
+    assert {} == await feeds.async_poll(["a/b", "c/d"], now)
+    later = now + DEFAULT_POLL_INTERVAL
+    assert {"c/d": {GROUP_RELEASES}} == await feeds.async_poll(["a/b", "c/d"], later)
+    assert 3 == github.getitem.call_count
+    github.getitem.assert_called_with("/repos/c/d/events?per_page=30")
+
+    # Feeds that fail are retried later.
+    github.getitem.side_effect = gidgethub.BadRequest(MagicMock(status_code=404))
+    assert {} == await feeds.async_poll(["c/d"], later + DEFAULT_POLL_INTERVAL)
+    assert 3 == feeds.last_ids["c/d"]
+
+    feeds.forget("c/d")
+    assert {"a/b": 2} == feeds.last_ids
+
+
+@pytest.mark.asyncio
+async def test_coordinator_refetches_groups_changed_by_events(
+    hass, mock_client, repository_result
+):
+    """Test only the groups changed by new events are refetched."""
+    github = mock_client()
+    github.getitem = AsyncMock(return_value=[event(1, "WatchEvent")])
+    github.graphql = AsyncMock(
+        return_value={"repo0": repository_result(permission="READ", stars=1)}
+    )
+    coordinator = GitHubDataUpdateCoordinator(
+        hass, github, [{"path": "a/b"}], events=True
+    )
+    await coordinator._async_update_data()
+    assert 1 == github.graphql.call_count
+    assert {"a/b": 1} == coordinator.stored_data()["events"]
+    # Polled groups are only refetched as a consistency check.
+    fetched = coordinator._groups["a/b"][GROUP_REPO][0]
+    assert fetched + PUSHED_GROUPS_TTL == coordinator._expires("a/b", GROUP_REPO)
+    assert DEFAULT_POLL_INTERVAL >= coordinator.update_interval
+
+    # No new events, nothing but the feed is requested.
+    coordinator.event_feeds._due.clear()
+    await coordinator._async_update_data()
+    assert 1 == github.graphql.call_count
+
+    github.getitem.return_value = [event(2, "WatchEvent"), event(1, "WatchEvent")]
+    github.graphql.return_value = {
+        "repo0": repository_result(permission="READ", stars=2)
+    }
+    coordinator.event_feeds._due.clear()
+    await coordinator._async_poll_events(dt_util.utcnow())
+    # The group keeps when it was fetched until it is refetched.
+    assert {"a/b": [GROUP_REPO]} == coordinator.stored_data()["invalidated"]
+    assert fetched == coordinator._expires("a/b", GROUP_REPO)
+    data = await coordinator._async_update_data()
+    assert {} == coordinator.stored_data()["invalidated"]
+    assert 2 == data["a/b"].stargazers
+    query = github.graphql.call_args.args[0]
+    assert "stargazerCount" in query
+    assert "defaultBranchRef" not in query
+    assert GROUP_TRAFFIC not in coordinator._expired_groups("a/b", dt_util.utcnow())
+
+    coordinator.async_remove_paths(["a/b"])
+    assert {} == coordinator.event_feeds.last_ids
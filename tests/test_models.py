@@ -0,0 +1,23 @@
+"""Tests for the models module."""
+from custom_components.github_custom.models import (
+    MAX_COMMIT_MESSAGE_LENGTH,
+    RepoSnapshot,
+)
+
+
+def test_repo_snapshot():
+    """Test snapshots only expose known attributes and compare by value."""
+    snapshot = RepoSnapshot("a/b", forks=1, latest_commit_sha="abc", unknown=1)
+    assert {"path": "a/b", "forks": 1, "latest_commit_sha": "abc"} == (
+        snapshot.as_dict()
+    )
+    assert not hasattr(snapshot, "__dict__")
+    assert RepoSnapshot("a/b", forks=1, latest_commit_sha="abc") == snapshot
+    assert RepoSnapshot("a/b", forks=2, latest_commit_sha="abc") != snapshot
+    assert snapshot != snapshot.as_dict()
+
+
+def test_repo_snapshot_truncates_commit_message():
+    """Test only the start of long commit messages is kept."""
+    snapshot = RepoSnapshot("a/b", latest_commit_message="x" * 10_000)
+    assert MAX_COMMIT_MESSAGE_LENGTH == len(snapshot.latest_commit_message)
@@ -0,0 +1,16 @@
+"""Tests for the recorder module."""
+import pytest
+
+from custom_components.github_custom.recorder import exclude_attributes
+
+
+@pytest.mark.asyncio
+async def test_exclude_attributes(hass):
+    """Test the commit message and the traffic totals are not recorded."""
+    assert {
+        "clones",
+        "clones_unique",
+        "latest_commit_message",
+        "views",
+        "views_unique",
+    } == exclude_attributes(hass)
@@ -0,0 +1,87 @@
+"""Tests for the request_queue module."""
+import asyncio
+
+import pytest
+
+from custom_components.github_custom.request_queue import (
+    PRIORITY_INTERACTIVE,
+    PRIORITY_REFRESH,
+    RequestQueue,
+    request_context,
+)
+
+
+async def request(queue, served, name, priority=None, owner=None):
+    """Make a request through the queue, recording when it was served."""
+    with request_context(priority, owner):
+        async with queue:
+            served.append(name)
+            await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_request_queue_serves_by_priority():
+    """Test waiting requests are served by priority, then in order."""
+    queue = RequestQueue(1)
+    served = []
+    await queue.acquire()
+    tasks = [
+        asyncio.create_task(request(queue, served, "poll")),
+        asyncio.create_task(request(queue, served, "refresh", PRIORITY_REFRESH)),
+        asyncio.create_task(request(queue, served, "flow", PRIORITY_INTERACTIVE)),
+        asyncio.create_task(request(queue, served, "poll 2")),
+    ]
+    await asyncio.sleep(0)
+    assert 4 == queue.depth
+    queue.release()
+    await asyncio.gather(*tasks)
+
+    assert ["flow", "refresh", "poll", "poll 2"] == served
+    assert 0 == queue.in_flight
+    assert {
+        "limit": 1,
+        "in_flight": 0,
+        "depth": 0,
+        "max_depth": 4,
+    } == {key: value for key, value in queue.as_dict().items() if key != "priorities"}
+    assert 3 == queue.as_dict()["priorities"]["poll"]["requests"]
+
+
+@pytest.mark.asyncio
+async def test_request_queue_is_fair_between_owners():
+    """Test owners with the same priority take turns."""
+    queue = RequestQueue(1)
+    served = []
+    await queue.acquire()
+    tasks = [
+        asyncio.create_task(request(queue, served, f"a{index}", owner="a"))
+        for index in range(3)
+    ]
+    tasks.append(asyncio.create_task(request(queue, served, "b0", owner="b")))
+    await asyncio.sleep(0)
+    queue.release()
+    await asyncio.gather(*tasks)
+
+    assert ["a0", "b0", "a1", "a2"] == served
+
+
+@pytest.mark.asyncio
+async def test_request_queue_cancelled_waiters():
+    """Test cancelled waiters leave the queue without holding a slot."""
+    queue = RequestQueue(1)
+    await queue.acquire()
+    waiter = asyncio.create_task(queue.acquire())
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert 0 == queue.depth
+
+    # A waiter cancelled after it was handed the slot gives it back.
+    waiter = asyncio.create_task(queue.acquire())
+    await asyncio.sleep(0)
+    queue.release()
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert 0 == queue.in_flight
@@ -0,0 +1,114 @@
+"""Tests for the scheduler module."""
+from datetime import timedelta
+
+from gidgethub.sansio import RateLimit
+import homeassistant.util.dt as dt_util
+import pytest
+
+from custom_components.github_custom.scheduler import (
+    TIER_COLD,
+    TIER_HOT,
+    TIER_WARM,
+    assign_tiers,
+    compute_update_interval,
+    decayed_activity,
+    tier_ttl,
+)
+
+DEFAULT = timedelta(minutes=10)
+
+
+def rate_limit(remaining, reset_in, limit=5000):
+    """Return a rate limit resetting in `reset_in` seconds."""
+    return RateLimit(
+        limit=limit,
+        remaining=remaining,
+        reset_epoch=dt_util.utcnow().timestamp() + reset_in,
+    )
+
+
+def test_compute_update_interval_unknown_cost():
+    """Test the default interval is used before the cost of an update is known."""
+    now = dt_util.utcnow()
+    assert DEFAULT == compute_update_interval({}, {}, None, now, DEFAULT)
+
+
+def test_compute_update_interval_spreads_budget():
+    """Test the remaining budget is spread over the reset window."""
+    now = dt_util.utcnow()
+    # 2000 usable after the 500 reserve, 200 per update: 10 updates in 3000s.
+    interval = compute_update_interval(
+        {"core": rate_limit(2500, 3000)}, {"core": 200}, None, now, DEFAULT
+    )
+    assert pytest.approx(300, abs=1) == interval.total_seconds()
+
+
+def test_compute_update_interval_speeds_up_with_headroom():
+    """Test polling speeds up to the minimum interval when there is headroom."""
+    now = dt_util.utcnow()
+    interval = compute_update_interval(
+        {"graphql": rate_limit(5000, 3600), "core": rate_limit(5000, 3600)},
+        {"graphql": 2, "search": 1},
+        None,
+        now,
+        DEFAULT,
+    )
+    assert timedelta(minutes=1) == interval
+
+
+def test_compute_update_interval_waits_for_reset():
+    """Test the update waits for the reset when the budget is used up."""
+    now = dt_util.utcnow()
+    interval = compute_update_interval(
+        {"core": rate_limit(400, 1800)}, {"core": 10}, None, now, DEFAULT
+    )
+    assert pytest.approx(1800, abs=1) == interval.total_seconds()
+
+
+def test_compute_update_interval_honours_retry_after():
+    """Test a Retry-After from GitHub is honoured."""
+    now = dt_util.utcnow()
+    interval = compute_update_interval(
+        {"core": rate_limit(5000, 3600)},
+        {"core": 1},
+        now + timedelta(minutes=5),
+        now,
+        DEFAULT,
+    )
+    assert timedelta(minutes=5) == interval
+
+
+def test_decayed_activity():
+    """Test the activity decays with time."""
+    now = dt_util.utcnow()
+    assert 12 == decayed_activity(12, now, now)
+    assert pytest.approx(12 / 2.718, rel=0.01) == decayed_activity(
+        12, now - timedelta(days=1), now
+    )
+
+
+def test_assign_tiers():
+    """Test repos are tiered by activity, with a cap on automatic hot repos."""
+    activity = {"a/busy": 50, "a/busier": 80, "a/some": 2, "a/dormant": 0.01}
+    assert {
+        "a/busy": TIER_HOT,
+        "a/busier": TIER_HOT,
+        "a/some": TIER_WARM,
+        "a/dormant": TIER_COLD,
+    } == assign_tiers(activity, [])
+    # Only the most active repos are promoted, pinned repos are always hot.
+    assert {
+        "a/busy": TIER_WARM,
+        "a/busier": TIER_HOT,
+        "a/some": TIER_WARM,
+        "a/dormant": TIER_HOT,
+    } == assign_tiers(activity, ["a/dormant", "a/unknown"], max_hot=1)
+
+
+def test_tier_ttl():
+    """Test hot repos are polled every minute and cold ones hourly."""
+    ttl = timedelta(minutes=10)
+    assert timedelta(minutes=1) == tier_ttl(TIER_HOT, ttl)
+    assert ttl == tier_ttl(TIER_WARM, ttl)
+    assert timedelta(hours=1) == tier_ttl(TIER_COLD, ttl)
+    assert timedelta(hours=6) == tier_ttl(TIER_COLD, timedelta(hours=6))
@@ -1,55 +1,42 @@
 """Tests for the sensor module."""
-from unittest.mock import AsyncMock, MagicMock
+from collections import Counter
+from unittest.mock import MagicMock, patch
 
 from gidgethub import GitHubException
+from gidgethub.sansio import RateLimit
+from homeassistant.const import CONF_ACCESS_TOKEN, CONF_PLATFORM
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.entity import Entity
+from homeassistant.setup import async_setup_component
+import homeassistant.util.dt as dt_util
 import pytest
+import voluptuous as vol
 
-from custom_components.github_custom.sensor import GitHubRepoSensor
+from custom_components.github_custom.const import CONF_REPOS, DOMAIN
+from custom_components.github_custom.models import RepoSnapshot
+from custom_components.github_custom.sensor import (
+    PLATFORM_SCHEMA,
+    GitHubRateLimitResetSensor,
+    GitHubRateLimitSensor,
+    GitHubRepoSensor,
+    GitHubRequestsPerCycleSensor,
+    _async_get_yaml_store,
+)
 
 
-@pytest.mark.asyncio
-async def test_async_update_success(hass, aioclient_mock):
-    """Tests a fully successful async_update."""
-    github = MagicMock()
-    github.getitem = AsyncMock(
-        side_effect=[
-            # repos response
-            {
-                "forks_count": 1000,
-                "name": "Home Assistant",
-                "permissions": {"admin": False, "push": True, "pull": False},
-                "stargazers_count": 9000,
-                "open_issues_count": 5000,
-            },
-            # clones response
-            {"count": 100, "uniques": 50},
-            # views response
-            {"count": 10000, "uniques": 5000},
-            # commits response
-            [
-                {
-                    "commit": {"message": "Did a thing."},
-                    "sha": "e751664d95917dbdb856c382bfe2f4655e2a83c1",
-                }
-            ],
-            # pulls response
-            {
-                "incomplete_results": False,
-                "total_count": 345,
-                "items": [
-                    {"html_url": "https://github.com/homeassistant/core/pull/1347"}
-                ],
-            },
-            # issues response
-            [{"html_url": "https://github.com/homeassistant/core/issues/1"}],
-            # releases response
-            [{"html_url": "https://github.com/homeassistant/core/releases/v0.1.112"}],
-        ]
-    )
-    sensor = GitHubRepoSensor(github, {"path": "homeassistant/core"})
-    await sensor.async_update()
+def test_platform_schema_requires_owner_and_name():
+    """Test YAML repos are rejected unless their path is `owner/name`."""
+    config = {CONF_PLATFORM: DOMAIN, CONF_ACCESS_TOKEN: "token"}
+    assert PLATFORM_SCHEMA({**config, CONF_REPOS: [{"path": "a/b"}]})
+    for path in ("a", "a/b/c", "a/", "/b", "a /b"):
+        with pytest.raises(vol.Invalid):
+            PLATFORM_SCHEMA({**config, CONF_REPOS: [{"path": path}]})
 
-    expected = {
+
+@pytest.mark.asyncio
+async def test_sensor_reads_coordinator_data(hass):
+    """Tests the sensor exposes the slice of coordinator data for its repo."""
+    attrs = {
         "clones": 100,
         "clones_unique": 50,
         "forks": 1000,
@@ -67,19 +54,137 @@ async def test_async_update_success(hass, aioclient_mock):
         "views": 10000,
         "views_unique": 5000,
     }
-    assert expected == sensor.attrs
-    assert expected == sensor.extra_state_attributes
+    coordinator = MagicMock(last_update_success=True)
+    coordinator.data = {"homeassistant/core": RepoSnapshot(**attrs)}
+    sensor = GitHubRepoSensor(coordinator, {"path": "homeassistant/core"})
+
+    assert attrs == sensor.extra_state_attributes
+    assert "e751664" == sensor.state
+    assert "homeassistant/core" == sensor.name
+    assert "homeassistant/core" == sensor.unique_id
     assert sensor.available is True
 
 
 @pytest.mark.asyncio
-async def test_async_update_failed():
-    """Tests a failed async_update."""
-    github = MagicMock()
-    github.getitem = AsyncMock(side_effect=GitHubException)
-
-    sensor = GitHubRepoSensor(github, {"path": "homeassistant/core"})
-    await sensor.async_update()
+async def test_sensor_repo_missing_from_coordinator_data(hass):
+    """Tests the sensor is unavailable when its repo could not be retrieved."""
+    coordinator = MagicMock(last_update_success=True)
+    coordinator.data = {}
+    sensor = GitHubRepoSensor(coordinator, {"path": "homeassistant/core"})
 
     assert sensor.available is False
-    assert {"path": "homeassistant/core"} == sensor.attrs
+    assert sensor.state is None
+    assert {"path": "homeassistant/core"} == sensor.extra_state_attributes
+
+
+@pytest.mark.asyncio
+async def test_integration_sensors(hass):
+    """Tests the rate limit and requests per cycle sensors."""
+    coordinator = MagicMock(last_update_success=True)
+    coordinator.github.rate_limits = {
+        "graphql": RateLimit(limit=5000, remaining=4000, reset_epoch=1700000000)
+    }
+    coordinator.github.token_rate_limits = {
+        "token-1234": {
+            "graphql": RateLimit(limit=5000, remaining=4000, reset_epoch=1700000000)
+        },
+        "token-5678": {},
+    }
+    coordinator.cycle_cost = Counter({"graphql": 3, "core": 10})
+    config_entry = MagicMock(entry_id="entry-id", title="GitHub Custom")
+
+    remaining = GitHubRateLimitSensor(coordinator, config_entry, "graphql")
+    assert 4000 == remaining.native_value
+    assert {
+        "limit": 5000,
+        "tokens": {"…1234": 4000},
+    } == remaining.extra_state_attributes
+    assert "entry-id_rate_limit_graphql_remaining" == remaining.unique_id
+    assert "GitHub Custom graphql rate limit remaining" == remaining.name
+    reset = GitHubRateLimitResetSensor(coordinator, config_entry, "graphql")
+    assert 1700000000 == reset.native_value.timestamp()
+    requests = GitHubRequestsPerCycleSensor(coordinator, config_entry)
+    assert 13 == requests.native_value
+    assert {"graphql": 3, "core": 10} == requests.extra_state_attributes
+
+    # Nothing is known about a resource before its first request.
+    assert GitHubRateLimitSensor(coordinator, config_entry, "core").native_value is None
+    assert (
+        {}
+        == GitHubRateLimitSensor(
+            coordinator, config_entry, "core"
+        ).extra_state_attributes
+    )
+    assert (
+        GitHubRateLimitResetSensor(coordinator, config_entry, "core").native_value
+        is None
+    )
+
+
+@pytest.mark.asyncio
+async def test_sensor_only_writes_changed_state(hass):
+    """Tests the state is not written again when the snapshot didn't change."""
+    coordinator = MagicMock(last_update_success=True)
+    coordinator.data = {"a/b": RepoSnapshot("a/b", latest_commit_sha="abcdefghij")}
+    sensor = GitHubRepoSensor(coordinator, {"path": "a/b"})
+    with patch.object(Entity, "async_write_ha_state") as write:
+        sensor.async_write_ha_state()
+        # Every update builds new snapshots.
+        coordinator.data = {"a/b": RepoSnapshot("a/b", latest_commit_sha="abcdefghij")}
+        sensor._handle_coordinator_update()
+        assert 1 == write.call_count
+
+        coordinator.data = {"a/b": RepoSnapshot("a/b", latest_commit_sha="bcdefghij")}
+        sensor._handle_coordinator_update()
+        assert 2 == write.call_count
+
+        coordinator.last_update_success = False
+        sensor._handle_coordinator_update()
+        assert 3 == write.call_count
+
+
+@pytest.mark.asyncio
+async def test_yaml_platform_restores_snapshot(hass, hass_storage, mock_client):
+    """Tests yaml sensors come up from their last snapshot before refreshing."""
+    config = {
+        CONF_PLATFORM: DOMAIN,
+        CONF_ACCESS_TOKEN: "access-token",
+        CONF_REPOS: [{"path": "a/b"}],
+    }
+    store = _async_get_yaml_store(hass, config)
+    fetched = dt_util.utcnow().isoformat()
+    hass_storage[store.key] = {
+        "version": store.version,
+        "key": store.key,
+        "data": {
+            "groups": {
+                "a/b": {
+                    "repo": [fetched, {"name": "b"}],
+                    "commits": [fetched, {"latest_commit_sha": "abcdefghij"}],
+                }
+            },
+            "permissions": {"a/b": "READ"},
+            "pushed_paths": [],
+        },
+    }
+    states = []
+
+    async def graphql(query, **variables):
+        states.extend(state.state for state in hass.states.async_all("sensor"))
+        raise GitHubException
+
+    github = mock_client()
+    github.graphql = graphql
+    with patch(
+        "custom_components.github_custom.sensor.async_create_client",
+        return_value=github,
+    ):
+        assert await async_setup_component(hass, "sensor", {"sensor": [config]})
+        await hass.async_block_till_done()
+
+    # The sensor was added from the snapshot before GitHub was requested.
+    assert ["abcdefg"] == states
+    # Removing the sensor stops the updates of the coordinator.
+    registry = er.async_get(hass)
+    registry.async_remove(registry.async_get_entity_id("sensor", DOMAIN, "a/b"))
+    await hass.async_block_till_done()
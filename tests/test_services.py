@@ -0,0 +1,129 @@
+"""Tests for the services module."""
+import asyncio
+from datetime import timedelta
+from unittest.mock import AsyncMock, patch
+
+from homeassistant.const import CONF_ACCESS_TOKEN
+from homeassistant.exceptions import HomeAssistantError
+import homeassistant.util.dt as dt_util
+import pytest
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_fire_time_changed,
+)
+
+from custom_components.github_custom.const import CONF_REPOS, DOMAIN, SERVICE_REFRESH
+from custom_components.github_custom.coordinator import REFRESH_BATCH_DELAY
+
+
+@pytest.fixture
+def github(mock_client, repository_result):
+    """Return a client whose queries return the repos they select."""
+    github = mock_client()
+    github.sha = "abc"
+
+    async def graphql(query, **variables):
+        return {
+            f"repo{index}": repository_result(
+                name="core", permission="READ", sha=github.sha
+            )
+            for index in range(len(variables) // 2)
+        }
+
+    github.graphql = AsyncMock(side_effect=graphql)
+    return github
+
+
+async def setup_entry(hass, github):
+    """Set up a config entry watching two repos."""
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            CONF_ACCESS_TOKEN: "access-token",
+            CONF_REPOS: [
+                {"path": "home-assistant/core", "name": "HA Core"},
+                {"path": "home-assistant/frontend", "name": "HA Frontend"},
+            ],
+        },
+    )
+    config_entry.add_to_hass(hass)
+    with patch(
+        "custom_components.github_custom.async_create_client", return_value=github
+    ):
+        assert await hass.config_entries.async_setup(config_entry.entry_id)
+        await hass.async_block_till_done()
+    return config_entry
+
+
+async def call_refresh(hass, *service_data):
+    """Call the refresh service concurrently and fire the batch."""
+    calls = [
+        asyncio.create_task(
+            hass.services.async_call(DOMAIN, SERVICE_REFRESH, data, blocking=True)
+        )
+        for data in service_data
+    ]
+    await asyncio.sleep(0.01)
+    async_fire_time_changed(hass, dt_util.utcnow() + REFRESH_BATCH_DELAY)
+    await asyncio.gather(*calls)
+
+
+@pytest.mark.asyncio
+async def test_refresh_batches_calls(hass, github):
+    """Test calls made together are merged into a single refresh."""
+    config_entry = await setup_entry(hass, github)
+    assert 1 == github.graphql.call_count
+
+    github.sha = "def"
+    await call_refresh(
+        hass,
+        {"entity_id": "sensor.ha_core", "groups": "commits"},
+        {"repositories": ["Home-Assistant/Frontend"], "groups": ["commits"]},
+        {"entity_id": "sensor.ha_core", "groups": "commits"},
+    )
+    assert 2 == github.graphql.call_count
+    query, variables = github.graphql.call_args.args[0], github.graphql.call_args.kwargs
+    # Only the groups asked for are refetched, for both repos at once.
+    assert "defaultBranchRef" in query
+    assert "stargazerCount" not in query
+    assert {"core", "frontend"} == {variables["name0"], variables["name1"]}
+    assert "def" == hass.states.get("sensor.ha_core").state
+    assert "def" == hass.states.get("sensor.ha_frontend").state
+
+    # Every group of every repo by default.
+    await call_refresh(hass, {})
+    assert 3 == github.graphql.call_count
+    assert "stargazerCount" in github.graphql.call_args.args[0]
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+@pytest.mark.asyncio
+async def test_refresh_unknown_targets(hass, github):
+    """Test repos that are not watched are rejected."""
+    config_entry = await setup_entry(hass, github)
+    with pytest.raises(HomeAssistantError):
+        await hass.services.async_call(
+            DOMAIN, SERVICE_REFRESH, {"repositories": "a/b"}, blocking=True
+        )
+    with pytest.raises(HomeAssistantError):
+        await hass.services.async_call(
+            DOMAIN, SERVICE_REFRESH, {"entity_id": "sensor.unknown"}, blocking=True
+        )
+    assert 1 == github.graphql.call_count
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+@pytest.mark.asyncio
+async def test_unload_releases_pending_refresh(hass, github):
+    """Test callers waiting for a refresh return when the entry is unloaded."""
+    config_entry = await setup_entry(hass, github)
+    call = asyncio.create_task(
+        hass.services.async_call(DOMAIN, SERVICE_REFRESH, {}, blocking=True)
+    )
+    await asyncio.sleep(0.01)
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+    await call
+    assert 1 == github.graphql.call_count
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=5))
+    await hass.async_block_till_done()
+    assert 1 == github.graphql.call_count
@@ -0,0 +1,71 @@
+"""Tests for the stats module."""
+import pytest
+
+from custom_components.github_custom.stats import (
+    RequestStats,
+    async_get_stats,
+    endpoint_for,
+)
+
+
+@pytest.mark.parametrize(
+    "method,url,expected",
+    [
+        ("POST", "https://api.github.com/graphql", "POST /graphql"),
+        (
+            "GET",
+            "https://api.github.com/repos/home-assistant/core/traffic/views",
+            "GET /repos/{owner}/{repo}/traffic/views",
+        ),
+        ("GET", "/repos/home-assistant/core", "GET /repos/{owner}/{repo}"),
+        (
+            "GET",
+            "https://api.github.com/orgs/esphome/repos?per_page=100&page=2",
+            "GET /orgs/{org}/repos",
+        ),
+        ("GET", "/users/octocat/repos", "GET /users/{user}/repos"),
+        (
+            "GET",
+            "https://ghe.example.com/api/v3/repos/a/b/traffic/clones",
+            "GET /repos/{owner}/{repo}/traffic/clones",
+        ),
+        ("POST", "https://ghe.example.com/api/graphql", "POST /graphql"),
+    ],
+)
+def test_endpoint_for(method, url, expected):
+    """Test requests of every repo and page are counted against one endpoint."""
+    assert expected == endpoint_for(method, url)
+
+
+def test_request_stats():
+    """Test requests are counted and their latency put in a histogram."""
+    stats = RequestStats()
+    stats.record("GET", "/repos/a/b", 200, 0.04, 0.5, 100)
+    stats.record("GET", "/repos/c/d", 304, 0.3, 0.0, 0)
+    stats.record("GET", "/repos/c/d", 502, 20.0)
+    stats.record("GET", "/repos/c/d", None, 0.1)
+    stats.record_coalesced("GET", "/repos/c/d")
+
+    result = stats.as_dict()["GET /repos/{owner}/{repo}"]
+    assert 4 == result["requests"]
+    assert 1 == result["coalesced"]
+    assert 1 == result["not_modified"]
+    assert 2 == result["errors"]
+    assert 100 == result["bytes_received"]
+    assert 0.5 == result["wait_sum"]
+    assert 20.44 == result["latency_sum"]
+    histogram = result["latency_histogram"]
+    assert 1 == histogram["le_0.05"]
+    assert 1 == histogram["le_0.1"]
+    assert 1 == histogram["le_0.5"]
+    assert 1 == histogram["le_inf"]
+    assert 4 == sum(histogram.values())
+
+
+@pytest.mark.asyncio
+async def test_async_get_stats(hass):
+    """Test every client shares the same stats."""
+    assert async_get_stats(hass) is async_get_stats(hass)
+    assert async_get_stats(hass) is not async_get_stats(
+        hass, "https://ghe.example.com/api/v3"
+    )
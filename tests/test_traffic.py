@@ -0,0 +1,142 @@
+"""Tests for the traffic module."""
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, patch
+
+from homeassistant.components.recorder.statistics import valid_statistic_id
+import pytest
+
+from custom_components.github_custom.coordinator import GitHubDataUpdateCoordinator
+from custom_components.github_custom.traffic import (
+    SECONDS_PER_DAY,
+    TRAFFIC_DAYS,
+    TrafficHistory,
+    async_import_traffic,
+    day_of,
+    statistic_id,
+)
+
+# 2023-01-10T00:00:00Z
+DAY = 19367
+
+
+def timestamp(day):
+    """Return the timestamp GitHub gives the bucket of a day."""
+    return datetime.fromtimestamp(day * SECONDS_PER_DAY, timezone.utc).strftime(
+        "%Y-%m-%dT%H:%M:%SZ"
+    )
+
+
+def traffic(key, days):
+    """Return a traffic response with a bucket for each of `days`."""
+    return {
+        "count": sum(days.values()),
+        "uniques": len(days),
+        key: [
+            {"timestamp": timestamp(day), "count": count, "uniques": 1}
+            for day, count in days.items()
+        ],
+    }
+
+
+def test_day_of():
+    """Test bucket timestamps are converted to days since the epoch."""
+    assert DAY == day_of("2023-01-10T00:00:00Z")
+    assert "github_custom:home_assistant_core_0bfb6d02_views" == statistic_id(
+        "home-assistant/core", "views"
+    )
+
+
+def test_statistic_id_unique_per_repo():
+    """Test repos whose slugs collide get their own statistics."""
+    assert statistic_id("a/b-c", "views") != statistic_id("a-b/c", "views")
+    assert statistic_id("a/b", "views") == statistic_id("A/B", "views")
+    assert valid_statistic_id(statistic_id("_/.github", "clones_unique"))
+
+
+def test_traffic_history_ring_buffer():
+    """Test days older than the buffer are dropped as new ones come in."""
+    history = TrafficHistory()
+    assert [] == list(history.days())
+    history.add(traffic("clones", {DAY: 3}), traffic("views", {DAY - 1: 5, DAY: 7}))
+    days = dict(history.days())
+    assert TRAFFIC_DAYS == len(days)
+    assert (5, 1, 0, 0) == days[DAY - 1]
+    assert (7, 1, 3, 1) == days[DAY]
+
+    # A week later the oldest days wrapped around and the skipped days are empty.
+    history.add({}, traffic("views", {DAY + 7: 2}))
+    days = dict(history.days())
+    assert DAY + 7 == max(days)
+    assert (7, 1, 3, 1) == days[DAY]
+    assert (0, 0, 0, 0) == days[DAY + 6]
+    assert (2, 1, 0, 0) == days[DAY + 7]
+    # Days that already left the buffer are ignored.
+    history.record(DAY - 20, "views", 100)
+    assert 100 not in [counts[0] for counts in days.values()]
+
+    restored = TrafficHistory.from_dict(history.as_dict())
+    assert list(history.days()) == list(restored.days())
+
+
+def test_traffic_history_pop_completed():
+    """Test each completed day is only returned once, today never."""
+    history = TrafficHistory()
+    history.add({}, traffic("views", {DAY - 1: 5, DAY: 7}))
+    completed = history.pop_completed(DAY)
+    assert TRAFFIC_DAYS - 1 == len(completed)
+    assert (DAY - 1, (5, 1, 0, 0), (5, 1, 0, 0)) == completed[-1]
+    assert [] == history.pop_completed(DAY)
+
+    history.add({}, traffic("views", {DAY: 8, DAY + 1: 1}))
+    assert [(DAY, (8, 1, 0, 0), (13, 2, 0, 0))] == history.pop_completed(DAY + 1)
+    assert DAY == history.imported
+
+
+@pytest.mark.asyncio
+async def test_async_import_traffic(hass):
+    """Test the completed days are written as statistics once."""
+    history = TrafficHistory()
+    history.add(traffic("clones", {DAY - 1: 2}), traffic("views", {DAY - 1: 5}))
+    now = datetime.fromtimestamp(DAY * SECONDS_PER_DAY + 3600, timezone.utc)
+    with patch(
+        "custom_components.github_custom.traffic.async_add_external_statistics"
+    ) as add_statistics:
+        # Nothing is written, nor marked as written, without the recorder.
+        async_import_traffic(hass, "a/b", history, now)
+        assert not add_statistics.called
+        assert history.imported is None
+
+        hass.config.components.add("recorder")
+        async_import_traffic(hass, "a/b", history, now)
+        assert 4 == add_statistics.call_count
+        metadata, statistics = add_statistics.call_args_list[0].args[1:]
+        assert statistic_id("a/b", "views") == metadata["statistic_id"]
+        assert "github_custom" == metadata["source"]
+        assert metadata["has_sum"]
+        assert TRAFFIC_DAYS == len(statistics)
+        assert {
+            "start": datetime.fromtimestamp((DAY - 1) * SECONDS_PER_DAY, timezone.utc),
+            "state": 5,
+            "sum": 5,
+        } == statistics[-1]
+
+        async_import_traffic(hass, "a/b", history, now)
+        assert 4 == add_statistics.call_count
+
+
+@pytest.mark.asyncio
+async def test_coordinator_keeps_traffic_history(hass, mock_client, repository_result):
+    """Test the daily traffic of the repos is kept and saved."""
+    github = mock_client()
+    github.graphql = AsyncMock(return_value={"repo0": repository_result()})
+    github.getitem = AsyncMock(
+        side_effect=[traffic("clones", {DAY: 2}), traffic("views", {DAY: 5})]
+    )
+    coordinator = GitHubDataUpdateCoordinator(hass, github, [{"path": "a/b"}])
+    data = await coordinator._async_update_data()
+    assert 5 == data["a/b"].views
+    assert (5, 1, 2, 1) == dict(coordinator.traffic_history["a/b"].days())[DAY]
+    assert DAY == coordinator.stored_data()["traffic"]["a/b"]["newest"]
+
+    coordinator.async_remove_paths(["a/b"])
+    assert {} == coordinator.traffic_history
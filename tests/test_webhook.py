@@ -0,0 +1,276 @@
+"""Tests for the webhook module."""
+import hashlib
+import hmac
+import json
+from unittest.mock import AsyncMock, patch
+
+from homeassistant.const import CONF_ACCESS_TOKEN, CONF_WEBHOOK_ID
+import pytest
+import pytest_asyncio
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.github_custom.const import (
+    CONF_REPOS,
+    CONF_WEBHOOK,
+    CONF_WEBHOOK_SECRET,
+    DOMAIN,
+)
+
+WEBHOOK_ID = "webhook-id"
+SECRET = "secret"
+
+
+async def no_hooks(url):
+    """Return no existing webhooks, listed in a single page."""
+    assert url.endswith("/hooks?per_page=100")
+    for hook in []:
+        yield hook  # pragma: no cover
+
+
+async def our_hook(url):
+    """Return the webhook created for the config entry."""
+    yield {"id": 1, "config": {"url": "https://example.org/other"}}
+    yield {"id": 2, "config": {"url": f"https://example.com/api/webhook/{WEBHOOK_ID}"}}
+
+
+class FakeGitHubSender:
+    """Posts signed events the way GitHub delivers them."""
+
+    def __init__(self, client, secret=SECRET):
+        self.client = client
+        self.secret = secret
+
+    async def send(self, event, payload, repo="home-assistant/core"):
+        """Send an event for `repo`, returning the HTTP status."""
+        payload = {"repository": {"full_name": repo}, **payload}
+        body = json.dumps(payload).encode()
+        signature = hmac.new(self.secret.encode(), body, hashlib.sha256).hexdigest()
+        response = await self.client.post(
+            f"/api/webhook/{WEBHOOK_ID}",
+            data=body,
+            headers={
+                "content-type": "application/json",
+                "x-github-event": event,
+                "x-github-delivery": "1",
+                "x-hub-signature-256": f"sha256={signature}",
+            },
+        )
+        return response.status
+
+
+@pytest_asyncio.fixture
+async def github(hass, mock_client, repository_result):
+    """Set up a config entry in webhook mode with a mocked GitHub client."""
+    hass.config.external_url = "https://example.com"
+    github = mock_client()
+    github.graphql = AsyncMock(
+        return_value={
+            "repo0": repository_result(
+                name="core",
+                permission="ADMIN",
+                forks=10,
+                stars=100,
+                sha="aaaaaaaaaa",
+                message="First.",
+                issues=5,
+                pull_requests=2,
+            )
+        }
+    )
+    github.getitem = AsyncMock(return_value={"count": 1, "uniques": 1})
+    github.getiter = no_hooks
+    github.post = AsyncMock()
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            CONF_ACCESS_TOKEN: "access-token",
+            CONF_REPOS: [{"path": "home-assistant/core", "name": "HA Core"}],
+        },
+        options={
+            CONF_REPOS: [{"path": "home-assistant/core", "name": "HA Core"}],
+            CONF_WEBHOOK: True,
+            CONF_WEBHOOK_ID: WEBHOOK_ID,
+            CONF_WEBHOOK_SECRET: SECRET,
+        },
+    )
+    config_entry.add_to_hass(hass)
+    with patch(
+        "custom_components.github_custom.async_create_client", return_value=github
+    ):
+        assert await hass.config_entries.async_setup(config_entry.entry_id)
+        await hass.async_block_till_done()
+    with patch(
+        "custom_components.github_custom.async_create_client", return_value=github
+    ):
+        yield github
+    if hass.config_entries.async_get_entry(config_entry.entry_id) is not None:
+        assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+@pytest.mark.asyncio
+async def test_webhook_created_on_github(hass, github):
+    """Test a webhook is created on repos the token is an admin of."""
+    github.post.assert_awaited_once()
+    url, kwargs = github.post.await_args.args[0], github.post.await_args.kwargs
+    assert "/repos/home-assistant/core/hooks" == url
+    assert f"https://example.com/api/webhook/{WEBHOOK_ID}" == (
+        kwargs["data"]["config"]["url"]
+    )
+    assert SECRET == kwargs["data"]["config"]["secret"]
+
+
+@pytest.mark.asyncio
+async def test_webhook_created_on_added_repos(hass, github):
+    """Test a webhook is created on repos added in the options without a reload."""
+    config_entry = hass.config_entries.async_entries(DOMAIN)[0]
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
+    hass.config_entries.async_update_entry(
+        config_entry,
+        options={
+            **config_entry.options,
+            CONF_REPOS: [
+                {"path": "home-assistant/core", "name": "HA Core"},
+                {"path": "home-assistant/frontend", "name": "HA Frontend"},
+            ],
+        },
+    )
+    await hass.async_block_till_done()
+
+    assert coordinator is hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
+    assert [
+        "/repos/home-assistant/core/hooks",
+        "/repos/home-assistant/frontend/hooks",
+    ] == [call.args[0] for call in github.post.await_args_list]
+    assert {"home-assistant/core", "home-assistant/frontend"} == (
+        coordinator.pushed_paths
+    )
+
+
+@pytest.mark.asyncio
+async def test_webhook_deleted_when_disabled(hass, github):
+    """Test the webhook is deleted from GitHub when push mode is turned off."""
+    github.getiter = our_hook
+    github.delete = AsyncMock()
+    config_entry = hass.config_entries.async_entries(DOMAIN)[0]
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
+    await coordinator.async_save()
+    hass.config_entries.async_update_entry(
+        config_entry,
+        options={CONF_REPOS: [{"path": "home-assistant/core", "name": "HA Core"}]},
+    )
+    await hass.async_block_till_done()
+
+    github.delete.assert_awaited_once_with("/repos/home-assistant/core/hooks/2")
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
+    assert set() == coordinator.pushed_paths
+
+
+@pytest.mark.asyncio
+async def test_webhook_deleted_with_entry(hass, github):
+    """Test the webhook is deleted from GitHub when the entry is removed."""
+    github.getiter = our_hook
+    github.delete = AsyncMock()
+    config_entry = hass.config_entries.async_entries(DOMAIN)[0]
+    await hass.config_entries.async_remove(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    github.delete.assert_awaited_once_with("/repos/home-assistant/core/hooks/2")
+
+
+@pytest.mark.asyncio
+async def test_webhook_applies_events(hass, github, hass_client_no_auth):
+    """Test signed events update the sensor without polling."""
+    sender = FakeGitHubSender(await hass_client_no_auth())
+    graphql_calls = github.graphql.await_count
+
+    assert 200 == await sender.send(
+        "push",
+        {
+            "ref": "refs/heads/dev",
+            "repository": {
+                "full_name": "home-assistant/core",
+                "default_branch": "main",
+            },
+            "head_commit": {"id": "cccccccccc", "message": "Not main."},
+        },
+    )
+    assert 200 == await sender.send(
+        "push",
+        {
+            "ref": "refs/heads/main",
+            "repository": {
+                "full_name": "home-assistant/core",
+                "default_branch": "main",
+            },
+            "head_commit": {"id": "bbbbbbbbbb", "message": "Second."},
+        },
+    )
+    assert 200 == await sender.send(
+        "pull_request",
+        {"action": "opened", "pull_request": {"html_url": "https://github.com/pr/3"}},
+    )
+    assert 200 == await sender.send(
+        "issues",
+        {"action": "opened", "issue": {"html_url": "https://github.com/issues/6"}},
+    )
+    assert 200 == await sender.send("issues", {"action": "closed", "issue": {}})
+    assert 200 == await sender.send("issues", {"action": "closed", "issue": {}})
+    assert 200 == await sender.send(
+        "pull_request", {"action": "reopened", "pull_request": {}}
+    )
+    assert 200 == await sender.send(
+        "release",
+        {
+            "action": "published",
+            "release": {"html_url": "https://github.com/r/v2", "tag_name": "v2"},
+        },
+    )
+    assert 200 == await sender.send(
+        "star",
+        {
+            "action": "created",
+            "repository": {
+                "full_name": "home-assistant/core",
+                "name": "core",
+                "forks_count": 10,
+                "stargazers_count": 101,
+            },
+        },
+    )
+    await hass.async_block_till_done()
+
+    state = hass.states.get("sensor.ha_core")
+    assert "bbbbbbb" == state.state
+    assert "Second." == state.attributes["latest_commit_message"]
+    assert 4 == state.attributes["open_pull_requests"]
+    assert "https://github.com/pr/3" == (
+        state.attributes["latest_open_pull_request_url"]
+    )
+    assert 4 == state.attributes["open_issues"]
+    assert "https://github.com/issues/6" == state.attributes["latest_open_issue_url"]
+    assert "v2" == state.attributes["latest_release_tag"]
+    assert 101 == state.attributes["stargazers"]
+    assert graphql_calls == github.graphql.await_count
+
+
+@pytest.mark.asyncio
+async def test_webhook_rejects_invalid_signature(hass, github, hass_client_no_auth):
+    """Test events that aren't signed with the secret are rejected."""
+    sender = FakeGitHubSender(await hass_client_no_auth(), secret="wrong")
+    assert 401 == await sender.send(
+        "release",
+        {
+            "action": "published",
+            "release": {"html_url": "https://github.com/r/v2", "tag_name": "v2"},
+        },
+    )
+    await hass.async_block_till_done()
+    state = hass.states.get("sensor.ha_core")
+    assert "v0.1.112" == state.attributes["latest_release_tag"]
+
+
+@pytest.mark.asyncio
+async def test_webhook_ignores_unwatched_repos(hass, github, hass_client_no_auth):
+    """Test events of repos that aren't watched are acknowledged and ignored."""
+    sender = FakeGitHubSender(await hass_client_no_auth())
+    assert 200 == await sender.send("ping", {}, repo="home-assistant/frontend")